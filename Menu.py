@@ -11,6 +11,7 @@ if src_path not in sys.path:
     sys.path.append(src_path)
 
 import data_loader 
+import cache_manager
 
 # --- 2. Configuración de la Página (Debe ser lo primero) ---
 st.set_page_config(
@@ -20,8 +21,8 @@ st.set_page_config(
 )
 
 # --- 3. Carga de Datos en Session State ---
-# Esto se ejecuta primero. data_loader.py se encarga del cache
-# y de guardar todo en st.session_state.
+# Inicia la carga en segundo plano (no espera): el Menú se dibuja de inmediato y
+# data_loader.py guarda los datos en st.session_state cuando están listos.
 data_loader.load_data_into_session()
 
 # --- 4. Lógica de la Página del Menú Principal ---
@@ -56,6 +57,7 @@ with st.expander("👋 ¡Bienvenido! Haz clic aquí para ver cómo usar la app",
 
 # --- (NUEVO) Estado de los Datos ---
 st.header("Estado de la Aplicación")
+data_store = data_loader.get_data_store()
 if 'data_loaded' in st.session_state and st.session_state.data_loaded:
     st.success(
         """
@@ -65,7 +67,35 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
         La aplicación está lista para ser usada.
         """
     )
+
+    # Recarga sin reiniciar la app: se lee en segundo plano y cada sesión
+    # toma la nueva versión en su siguiente acción.
+    col_estado, col_recarga = st.columns([4, 1])
+    with col_recarga:
+        if st.button("🔄 Recargar datos", disabled=data_store.is_loading(),
+                     help="Vuelve a leer los archivos de 'data/' en segundo plano, sin interrumpir a los usuarios conectados."):
+            cache_manager.clear('datos') # Fuerza la lectura aunque los archivos no hayan cambiado
+            data_store.reload_async()
+    with col_estado:
+        estado = data_store.status()
+        st.caption(f"Versión de datos: `{st.session_state.data_version}`")
+        if estado['loading']:
+            st.info("Recargando datos en segundo plano... Puede seguir trabajando: la nueva versión se usará en su próxima acción.")
+        elif estado['last_error']:
+            st.warning(f"La última recarga falló; se mantiene la versión anterior. ({estado['last_error']})")
+elif data_store.is_loading():
+    # Avance por archivo, actualizado cada segundo sin redibujar el resto del Menú
+    @st.fragment(run_every=1)
+    def mostrar_avance_carga():
+        if not data_store.is_loading():
+            st.rerun() # Terminó (o falló): se redibuja el Menú completo con el estado final
+        st.info("Cargando datos en segundo plano. Puede navegar: cada herramienta se abre apenas sus archivos estén listos.")
+        data_loader.show_load_progress()
+
+    mostrar_avance_carga()
 else:
+    if data_store.current() is not None:
+        st.rerun() # La carga terminó recién: la próxima ejecución ya toma los datos
     st.error(
         """
         Error en la carga de datos.
@@ -74,6 +104,10 @@ else:
         existan en la carpeta `data/`.
         """
     )
+    data_loader.show_load_progress()
+    if st.button("🔁 Reintentar carga"):
+        data_store.reload_async()
+        st.rerun()
 
 st.markdown("---")
 
@@ -0,0 +1,196 @@
+# --- ARCHIVO: benchmarks/run_benchmarks.py ---
+# (NUEVO ARCHIVO: benchmarks de carga, radar y simulador sobre datos sintéticos)
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/run_benchmarks.py --scale small
+#   python benchmarks/run_benchmarks.py --scale large --only simulator
+#   python benchmarks/run_benchmarks.py --scale medium --with-loader --repeat 5
+#
+# Reporta, por escenario: filas procesadas, throughput (elementos/s), latencia
+# p50/p90/p99 de las repeticiones y memoria máxima (tracemalloc, corrida aparte
+# para que la medición no infle los tiempos).
+#
+# El radar y el simulador corren sobre los datos tal como quedan en la app:
+# limpiados y compactados por 'data_loader', con una versión de datos fija
+# (el índice de predicados se arma en la corrida de calentamiento).
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)                      # 'from src import config' (radar_engine)
+sys.path.insert(0, os.path.join(ROOT, 'src'))  # 'import config' (resto de módulos)
+
+# Sin contexto de Streamlit (modo "bare") los avisos de cache/ScriptRunContext son ruido
+logging.disable(logging.WARNING)
+
+import config  # noqa: E402
+import data_loader  # noqa: E402
+import predicate_index  # noqa: E402
+import simulator  # noqa: E402
+import synthetic_data  # noqa: E402
+from src import radar_engine  # noqa: E402
+
+# Escalas predefinidas: (SKUs, líneas de consumo, líneas de OC, proyectos residenciales)
+SCALES = {
+    'small': dict(n_skus=2_000, n_consumption_lines=50_000, n_oc_lines=10_000, n_residential=3_000),
+    'medium': dict(n_skus=10_000, n_consumption_lines=300_000, n_oc_lines=50_000, n_residential=10_000),
+    'large': dict(n_skus=50_000, n_consumption_lines=2_000_000, n_oc_lines=200_000, n_residential=20_000),
+}
+BENCHMARKS = ('loader', 'radar', 'simulator')
+
+# Versión de datos de los benchmarks (clave del índice de predicados en el espacio 'derivados')
+DATA_VERSION = 'benchmark'
+
+
+def _percentiles(timings: list) -> dict:
+    t = np.asarray(timings) * 1000
+    return {'p50_ms': float(np.percentile(t, 50)), 'p90_ms': float(np.percentile(t, 90)), 'p99_ms': float(np.percentile(t, 99))}
+
+
+def _peak_memory_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 ** 2
+
+
+def measure(name: str, fn, items: int, repeat: int, track_memory: bool = True) -> dict:
+    """Ejecuta 'fn' 'repeat' veces (más una de calentamiento) y resume tiempos y memoria."""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    result = {
+        'benchmark': name,
+        'items': items,
+        'repeat': repeat,
+        'throughput_per_s': items / np.median(timings) if np.median(timings) > 0 else float('inf'),
+        **_percentiles(timings),
+        'peak_mb': _peak_memory_mb(fn) if track_memory else float('nan'),
+    }
+    print(
+        f"{name:<32} {items:>10,} elem  {result['throughput_per_s']:>12,.0f}/s  "
+        f"p50 {result['p50_ms']:>9.1f} ms  p90 {result['p90_ms']:>9.1f} ms  "
+        f"p99 {result['p99_ms']:>9.1f} ms  pico {result['peak_mb']:>8.1f} MB",
+        flush=True
+    )
+    return result
+
+
+def prepare_frames(frames: tuple) -> tuple:
+    """Limpieza y compactación de 'data_loader' sobre los DataFrames generados (sin pasar por Excel)."""
+    prepared = []
+    for name, df in zip(data_loader.DATASETS, frames):
+        if name in data_loader._CLEANERS:
+            df = data_loader._CLEANERS[name](df)
+        prepared.append(data_loader._compact_dataset(name, df)[0])
+    return tuple(prepared)
+
+
+def bench_loader(scale: dict, args) -> list:
+    """Lectura + limpieza de los Excel ('_read_all_data', sin cache)."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            filas = synthetic_data.write_synthetic_data(data_dir, seed=args.seed, blank_fraction=args.blank_fraction, **scale)
+        except ValueError as e:
+            print(f"loader: omitido ({e})")
+            return []
+        total = sum(filas.values())
+        return [measure('loader/_read_all_data', lambda: data_loader._read_all_data(data_dir), total, args.repeat)]
+
+
+def bench_radar(frames: tuple, args) -> list:
+    """Radar completo de una familia (o 'Todas') en BF0001 / Bodega de Proyectos RE."""
+    df_stock, df_oc, df_consumo, _ = frames
+    radar = radar_engine.compute_radar.uncached
+
+    def run():
+        return radar(
+            df_stock, df_consumo, df_oc, args.radar_family, 'BF0001', 'Bodega de Proyectos RE', 30, config.Z_SCORE_MAP['95%'],
+            data_version=DATA_VERSION
+        )
+
+    if args.radar_family == 'Todas':
+        n_skus = df_stock['CodigoArticulo'].nunique()
+    else:
+        n_skus = df_stock.loc[df_stock['Familia'] == args.radar_family, 'CodigoArticulo'].nunique()
+    return [measure(f'radar/{args.radar_family}', run, n_skus, args.repeat)]
+
+
+def bench_simulator(frames: tuple, args) -> list:
+    """Simulación de 'sim-skus' SKUs (los de mayor consumo) con cada modelo de demanda."""
+    df_stock, df_oc, df_consumo, _ = frames
+    skus = df_consumo['CodigoArticulo'].value_counts().index[:args.sim_skus].tolist()
+    index = predicate_index.get_data_index(df_stock, df_consumo, df_oc, DATA_VERSION)
+    results = []
+    for model in config.DEMAND_MODELS.values():
+        def run(model=model):
+            for sku in skus:
+                simulator.run_inventory_simulation(
+                    sku, ['BF0001'], ['Bodega de Proyectos RE'], df_stock, df_consumo, df_oc,
+                    args.sim_days, 30, config.Z_SCORE_MAP['95%'], demand_model=model, random_seed=args.seed, index=index
+                )
+        results.append(measure(f'simulator/{model} x{len(skus)}', run, len(skus), args.repeat))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, radar y simulador sobre datos sintéticos.")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--skus', type=int, help="Sobrescribe el número de SKUs de la escala.")
+    parser.add_argument('--consumption-lines', type=int, help="Sobrescribe las líneas de consumo (ST_OWTR).")
+    parser.add_argument('--only', choices=BENCHMARKS, action='append', help="Ejecuta solo estos benchmarks (repetible).")
+    parser.add_argument('--with-loader', action='store_true', help="Incluye la carga desde Excel (escribe archivos temporales).")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--blank-fraction', type=float, default=0.02,
+                        help="Fracción de celdas de cantidad vacías en los datos sintéticos (0 = sin vacíos).")
+    parser.add_argument('--radar-family', default='EQUIPOS PRINCIPALES', help="Familia del radar ('Todas' para todo el stock).")
+    parser.add_argument('--sim-skus', type=int, default=20)
+    parser.add_argument('--sim-days', type=int, default=90)
+    parser.add_argument('--json', help="Guarda los resultados en este archivo JSON.")
+    args = parser.parse_args(argv)
+
+    scale = dict(SCALES[args.scale])
+    if args.skus:
+        scale['n_skus'] = args.skus
+    if args.consumption_lines:
+        scale['n_consumption_lines'] = args.consumption_lines
+    selected = args.only or [b for b in BENCHMARKS if b != 'loader' or args.with_loader]
+
+    print(f"Escala '{args.scale}': {scale}")
+    start = time.perf_counter()
+    frames = prepare_frames(synthetic_data.generate_synthetic_data(seed=args.seed, blank_fraction=args.blank_fraction, **scale))
+    print(f"Datos sintéticos generados y compactados en {time.perf_counter() - start:.1f} s "
+          f"(stock {len(frames[0]):,} / OC {len(frames[1]):,} / consumo {len(frames[2]):,} filas)\n")
+
+    results = []
+    if 'loader' in selected:
+        results += bench_loader(scale, args)
+    if 'radar' in selected:
+        results += bench_radar(frames, args)
+    if 'simulator' in selected:
+        results += bench_simulator(frames, args)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'scale': args.scale, 'params': scale, 'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,8 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+import re
 import sys
 from pathlib import Path
 
@@ -20,8 +22,19 @@ except ImportError:
     class DummyUIHelpers:
         def setup_locale(self):
             pass
+        def display_paginated_table(self, df, key, column_config=None, default_sort=None, ascending=False,
+                                    formatters=None, hide_index=True):
+            st.dataframe(df, use_container_width=True, column_config=column_config, hide_index=hide_index)
+        def download_export(self, df, file_stem, key, label="📥 Descargar", **kwargs):
+            st.download_button(label=f"{label} (.csv)", data=lambda: df.to_csv(index=False).encode('utf-8'),
+                               file_name=f"{file_stem}.csv", mime="text/csv", key=f"{key}_descarga")
     ui_helpers = DummyUIHelpers()
 
+import search_index # Índice de trigramas para la búsqueda por nombre/SKU
+import predicate_index # Filas por SKU, bodega y con stock (filtros de la barra lateral)
+import cache_manager # Caches del proceso (índices por versión de datos)
+import data_loader   # Versión vigente de los datos
+
 
 # --- 1. Configuración de Página y Verificación de Datos ---
 st.set_page_config(layout="wide", page_title="Consulta de Stock")
@@ -30,9 +43,7 @@ ui_helpers.setup_locale() # Configura meses en español
 st.title("Consulta de Inventario en Bodega")
 st.markdown("Busque y filtre el stock disponible por SKU, nombre o bodega.")
 
-if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
-    st.error("Los datos no se han cargado. Por favor, vuelva al Menú Principal.")
-    st.stop()
+data_loader.require_datasets('stock')
 
 # --- 2. Acceder y Preparar los Datos ---
 # Columnas que esperamos encontrar. AJUSTA ESTOS NOMBRES SI SON DIFERENTES.
@@ -69,13 +80,22 @@ except Exception as e:
     st.error(f"Error inesperado al cargar datos: {e}")
     st.stop()
 
+# --- Índice de Búsqueda (se construye una vez por versión de datos) ---
+@cache_manager.cached('derivados')
+def get_search_index(_df_stock, data_version):
+    # Las posiciones del índice coinciden con las filas de df_stock (y de su copia df_stock_raw)
+    return search_index.TrigramIndex(_df_stock[COL_NOMBRE], _df_stock[COL_SKU])
+
+stock_index = get_search_index(st.session_state.df_stock, st.session_state.data_version)
+filter_index = predicate_index.get_table_index(st.session_state.df_stock, 'stock', st.session_state.data_version)
+
 # --- 3. Filtros en la Barra Lateral ---
 st.sidebar.header("Filtros de Búsqueda")
 
 # Filtro 1: Búsqueda por Nombre (Texto)
 nombre_search = st.sidebar.text_input(
-    "1. Buscar por Nombre de Artículo:",
-    help="Buscará cualquier coincidencia parcial. Escriba 'panel' para encontrar 'Panel Solar 550W'."
+    "1. Buscar por Nombre de Artículo o SKU:",
+    help="Buscará cualquier coincidencia parcial en el nombre o el código. Escriba 'panel' para encontrar 'Panel Solar 550W'."
 )
 
 # --- (NUEVO) Checkbox para activar Regex ---
@@ -85,6 +105,13 @@ use_regex = st.sidebar.checkbox(
     help="Permite búsquedas complejas. Ej: '^(Panel|Inversor)' para buscar texto que comience con 'Panel' o 'Inversor'."
 )
 
+use_fuzzy = st.sidebar.checkbox(
+    "Búsqueda aproximada (tolera errores de tipeo)",
+    value=False,
+    help="Ordena los resultados por similitud. Ej: 'invresor hibrdo' encuentra 'Inversor Híbrido'.",
+    disabled=use_regex
+)
+
 # Filtro 2: Selección de SKU (Multiselect)
 sku_selected = st.sidebar.multiselect(
     "2. Filtrar por SKU:",
@@ -102,21 +129,36 @@ hide_zero_stock = st.sidebar.checkbox("Ocultar artículos sin stock", value=True
 
 # --- 4. Lógica de Filtrado ---
 
+# Filtros de SKU, Bodega y stock: posiciones del índice, intersectadas (None = sin filtro)
+filas_filtros = filter_index.intersect(
+    filter_index.isin(COL_SKU, sku_selected) if sku_selected else None,
+    filter_index.isin(COL_BODEGA, bodega_selected) if bodega_selected else None,
+    filter_index.flag('con_stock') if hide_zero_stock else None,
+)
+
 # Empezamos con el dataframe completo
-df_filtered = df_stock_raw
+df_filtered = predicate_index.take(df_stock_raw, filas_filtros)
 
 # Aplicar filtro de nombre (case-insensitive)
 if nombre_search:
     try:
         # --- (MODIFICADO) ---
-        # Ahora usamos el parámetro 'regex=use_regex'
-        df_filtered = df_filtered[df_filtered[COL_NOMBRE].str.contains(
-            nombre_search, 
-            case=False, 
-            na=False, 
-            regex=use_regex 
-        )]
-    except pd.errors.FilterError as e:
+        # El índice de trigramas acota los candidatos antes de verificar (texto o regex)
+        relevancia = None
+        if use_fuzzy and not use_regex:
+            filas, relevancia = stock_index.fuzzy_search(nombre_search)
+        else:
+            filas = stock_index.search(nombre_search, regex=use_regex)
+        filas = np.asarray(filas)
+        if filas_filtros is not None:
+            # Se conserva el orden de la búsqueda (relevancia) y solo las filas que pasan los demás filtros
+            keep = np.isin(filas, filas_filtros, assume_unique=True)
+            filas = filas[keep]
+            relevancia = relevancia[keep] if relevancia is not None else None
+        df_filtered = df_stock_raw.iloc[filas]
+        if relevancia is not None:
+            df_filtered = df_filtered.assign(Relevancia=relevancia)
+    except re.error as e:
         # Captura errores si la expresión regular es inválida
         st.sidebar.error(f"Expresión regular inválida. Intente desactivar la casilla o corrija la expresión.")
         df_filtered = df_stock_raw.iloc[0:0] # Devuelve un DF vacío
@@ -124,18 +166,6 @@ if nombre_search:
         st.sidebar.error(f"Error en el filtro de nombre: {e}")
         df_filtered = df_stock_raw.iloc[0:0]
 
-# Aplicar filtro de SKU
-if sku_selected: # if list is not empty
-    df_filtered = df_filtered[df_filtered[COL_SKU].isin(sku_selected)]
-
-# Aplicar filtro de Bodega
-if bodega_selected: # if list is not empty
-    df_filtered = df_filtered[df_filtered[COL_BODEGA].isin(bodega_selected)]
-
-# Aplicar filtro de stock
-if hide_zero_stock:
-    df_filtered = df_filtered[df_filtered[COL_STOCK] > 0]
-
 # --- 5. Mostrar Resultados ---
 total_items = len(df_filtered)
 total_stock = df_filtered[COL_STOCK].sum()
@@ -146,30 +176,28 @@ col1.metric("Líneas de Stock Únicas", f"{total_items}")
 col2.metric("Unidades Totales Disponibles", f"{total_stock:,.0f} Uds.")
 st.markdown("---")
 
-# Tabla de datos
-st.dataframe(
-    df_filtered.sort_values(by=COL_STOCK, ascending=False), # Ordenar por stock descendente
-    use_container_width=True,
+# Tabla de datos (paginada: solo la página visible se ordena y se envía al navegador)
+# Con búsqueda aproximada se ordena por relevancia; si no, por stock descendente
+ui_helpers.display_paginated_table(
+    df_filtered,
+    key="consulta_stock",
+    default_sort='Relevancia' if 'Relevancia' in df_filtered.columns else COL_STOCK,
     column_config={
         COL_SKU: st.column_config.TextColumn("SKU"),
         COL_NOMBRE: st.column_config.TextColumn("Nombre Artículo", width="large"),
         COL_BODEGA: st.column_config.TextColumn("Bodega"),
         COL_STOCK: st.column_config.NumberColumn("Stock Disponible", format="%.0f"),
-    },
-    hide_index=True
+        'Relevancia': st.column_config.ProgressColumn("Relevancia", min_value=0, max_value=1, format="%.2f"),
+    }
 )
 
 # --- Botón de Descarga ---
-@st.cache_data
-def convert_df_to_csv(df):
-    # Función para convertir el DF a CSV en cache
-    return df.to_csv(index=False).encode('utf-8')
-
-csv_data = convert_df_to_csv(df_filtered)
-
-st.download_button(
-     label="📥 Descargar resultados (.csv)",
-     data=csv_data,
-     file_name="consulta_stock.csv",
-     mime="text/csv",
- )
\ No newline at end of file
+# El archivo se genera al hacer clic, por tramos (no en cada búsqueda ni en un cache)
+ui_helpers.download_export(
+    df_filtered,
+    file_stem="consulta_stock",
+    key="consulta_stock_export",
+    label="📥 Descargar resultados",
+    sheet_name="Stock",
+    number_formats={COL_STOCK: '#,##0', 'Relevancia': '0.00'},
+)
\ No newline at end of file
@@ -14,6 +14,9 @@ if src_path not in sys.path:
     sys.path.append(src_path)
     
 # (No es necesario importar data_loader, Menu.py ya cargó los datos)
+import family_dashboard # Motor de KPIs por familia
+import cache_manager    # Cache del proceso por versión de datos
+import data_loader      # Versión vigente de los datos
 
 # --- 2. Configuración de la Página ---
 st.set_page_config(
@@ -24,14 +27,12 @@ st.set_page_config(
 
 # --- 3. Carga y Verificación de Datos ---
 # Verificamos que los datos estén en la sesión
-if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
-    st.error("No se pudieron cargar los datos. Por favor, reinicie desde la página 'Menú'.")
-    st.stop()
+data_loader.require_datasets('stock', 'consumo')
 
-# Accedemos a los datos desde la sesión
+# Accedemos a los datos desde la sesión (solo lectura: los agregados salen del motor de familias)
 try:
-    df_stock = st.session_state.df_stock.copy()
-    df_consumo = st.session_state.df_consumo.copy()
+    df_stock = st.session_state.df_stock
+    df_consumo = st.session_state.df_consumo
     
     # --- Verificación de Columnas Necesarias ---
     # Asumimos que 'CostoUnitario' existe para calcular el valor.
@@ -56,6 +57,18 @@ except Exception as e:
     st.error(f"Ocurrió un error inesperado al preparar los datos: {e}")
     st.stop()
 
+# Agregados de TODAS las familias en una sola pasada, una vez por versión de datos
+@cache_manager.cached('derivados')
+def get_family_dashboard(_df_stock, _df_consumo, data_version):
+    with st.spinner("Calculando KPIs por familia..."):
+        return family_dashboard.FamilyDashboard(_df_stock, _df_consumo)
+
+dashboard = get_family_dashboard(df_stock, df_consumo, st.session_state.data_version)
+
+if not dashboard.families():
+    st.warning("No se encontró ninguna familia de productos en 'Stock.xlsx'.")
+    st.stop()
+
 
 # --- 4. Título y Encabezado ---
 try:
@@ -63,63 +76,39 @@ try:
 except Exception as e:
     st.warning(f"No se pudo cargar el logo: {e}")
 
-st.title("💡 Análisis de Equipos Principales")
-st.markdown("Dashboard con KPIs para la familia 'EQUIPOS PRINCIPALES'.")
-
-# --- 5. Lógica de Filtro y Preparación ---
-
-# Asegurar tipos numéricos antes de filtrar y calcular
-df_stock['DisponibleParaPrometer'] = pd.to_numeric(df_stock['DisponibleParaPrometer'], errors='coerce').fillna(0)
-df_stock['CostoUnitario'] = pd.to_numeric(df_stock['CostoUnitario'], errors='coerce').fillna(0)
-df_consumo['CantidadSolicitada'] = pd.to_numeric(df_consumo['CantidadSolicitada'], errors='coerce').fillna(0)
-
-# --- Filtro Principal (Core Logic) ---
-df_equipos_stock = df_stock[
-    (df_stock['Familia'].str.strip().str.upper() == 'EQUIPOS PRINCIPALES')
-].copy()
-
-if df_equipos_stock.empty:
-    st.warning("No se encontró ningún artículo en la familia 'EQUIPOS PRINCIPALES'.")
-    st.stop()
-
-# Calcular Valor Total de Stock
-df_equipos_stock['ValorTotalStock'] = df_equipos_stock['DisponibleParaPrometer'] * df_equipos_stock['CostoUnitario']
-
-# Filtrar Consumo solo para esos SKUs
-lista_skus_equipos = df_equipos_stock['CodigoArticulo'].unique()
-df_equipos_consumo = df_consumo[df_consumo['CodigoArticulo'].isin(lista_skus_equipos)].copy()
-
-# Agrupar datos de stock (un SKU puede estar en varias líneas)
-df_equipos_stock_agrupado = df_equipos_stock.groupby(['CodigoArticulo', 'NombreArticulo']).agg(
-    Unidades_Stock=('DisponibleParaPrometer', 'sum'),
-    Valor_Stock=('ValorTotalStock', 'sum')
-).reset_index()
+# --- Selector de Familia ---
+familia_seleccionada = st.sidebar.selectbox(
+    "Familia de Productos",
+    options=dashboard.families(),
+    index=dashboard.default_index()
+)
+datos_familia = dashboard.family(familia_seleccionada)
+kpis_familia = datos_familia['kpis']
+df_equipos_stock_agrupado = datos_familia['articulos']
 
+st.title(f"💡 Análisis de {familia_seleccionada.title()}")
+st.markdown(f"Dashboard con KPIs para la familia '{familia_seleccionada}'.")
 
-# --- 6. KPIs Principales (Métricas) ---
-st.header("Métricas Globales (Equipos Principales)")
+# --- 5. KPIs Principales (Métricas) ---
+st.header(f"Métricas Globales ({familia_seleccionada.title()})")
 
 col1, col2, col3, col4 = st.columns(4)
 
 # KPI 1: SKUs Únicos
-total_skus = len(lista_skus_equipos)
-col1.metric("SKUs Únicos (en Stock.xlsx)", f"{total_skus}")
+col1.metric("SKUs Únicos (en Stock.xlsx)", f"{kpis_familia['SKUs_Unicos']:.0f}")
 
 # KPI 2: Unidades Totales
-total_unidades = df_equipos_stock_agrupado['Unidades_Stock'].sum()
-col2.metric("Unidades Totales en Stock", f"{total_unidades:,.0f}")
+col2.metric("Unidades Totales en Stock", f"{kpis_familia['Unidades_Stock']:,.0f}")
 
 # KPI 3: Valor Total Inventario
-valor_total_inventario = df_equipos_stock_agrupado['Valor_Stock'].sum()
-col3.metric("Valor Total del Inventario", f"${valor_total_inventario:,.0f} CLP")
+col3.metric("Valor Total del Inventario", f"${kpis_familia['Valor_Stock']:,.0f} CLP")
 
 # KPI 4: Consumo Reciente
-total_consumo_periodo = df_equipos_consumo['CantidadSolicitada'].sum()
-col4.metric("Consumo Reciente (Últ. 4 Meses)", f"{total_consumo_periodo:,.0f} Uds.")
+col4.metric("Consumo Reciente (Últ. 4 Meses)", f"{kpis_familia['Consumo_Reciente']:,.0f} Uds.")
 
 st.markdown("---")
 
-# --- 7. Análisis Visual (Ranking de Productos) ---
+# --- 6. Análisis Visual (Ranking de Productos) ---
 st.header("Ranking de Productos")
 
 c1, c2 = st.columns(2)
@@ -128,7 +117,7 @@ c1, c2 = st.columns(2)
 with c1.container(border=True):
     st.subheader("Top 10 por Valor de Inventario")
     
-    df_valor = df_equipos_stock_agrupado.nlargest(10, 'Valor_Stock')
+    df_valor = datos_familia['top_valor']
     
     chart_valor = alt.Chart(df_valor).mark_bar().encode(
         x=alt.X('Valor_Stock', title='Valor Total (CLP)', axis=alt.Axis(format='$,.0f')),
@@ -146,7 +135,7 @@ with c1.container(border=True):
 with c2.container(border=True):
     st.subheader("Top 10 por Stock (Unidades)")
     
-    df_stock_qty = df_equipos_stock_agrupado.nlargest(10, 'Unidades_Stock')
+    df_stock_qty = datos_familia['top_unidades']
     
     chart_stock = alt.Chart(df_stock_qty).mark_bar().encode(
         x=alt.X('Unidades_Stock', title='Unidades en Stock'),
@@ -166,19 +155,11 @@ st.markdown("---")
 with st.container(border=True):
     st.subheader("Top 10 por Rotación (Consumo Reciente)")
     
-    if df_equipos_consumo.empty:
+    df_rotacion = datos_familia['top_rotacion'] # Ya agrupado, con nombres y ordenado
+    
+    if df_rotacion.empty:
         st.info("No se encontró historial de consumo reciente para esta familia de productos.")
     else:
-        # Agrupar consumo
-        df_rotacion = df_equipos_consumo.groupby('CodigoArticulo')['CantidadSolicitada'].sum().reset_index()
-        
-        # Merge con nombres (usando los datos de stock agrupado)
-        df_nombres = df_equipos_stock_agrupado[['CodigoArticulo', 'NombreArticulo']]
-        df_rotacion = df_rotacion.merge(df_nombres, on='CodigoArticulo', how='left').nlargest(10, 'CantidadSolicitada')
-        
-        # Llenar N/A si un SKU consumido ya no tiene nombre en stock
-        df_rotacion['NombreArticulo'] = df_rotacion['NombreArticulo'].fillna(df_rotacion['CodigoArticulo'])
-        
         chart_consumo = alt.Chart(df_rotacion).mark_bar().encode(
             x=alt.X('CantidadSolicitada', title='Unidades Consumidas (Últ. 4 Meses)'),
             y=alt.Y('NombreArticulo', title='Producto', sort='-x'),
@@ -191,10 +172,10 @@ with st.container(border=True):
         ).interactive()
         st.altair_chart(chart_consumo, use_container_width=True)
         
-# --- 8. Vista de Datos (Detalle) ---
-with st.expander("Ver tabla de datos completa ('Equipos Principales')"):
+# --- 7. Vista de Datos (Detalle) ---
+with st.expander(f"Ver tabla de datos completa ('{familia_seleccionada.title()}')"):
     st.dataframe(
-        df_equipos_stock_agrupado.sort_values(by='Valor_Stock', ascending=False),
+        df_equipos_stock_agrupado, # Ya ordenada por valor descendente
         column_config={
             "Unidades_Stock": st.column_config.NumberColumn(format="%.0f"),
             "Valor_Stock": st.column_config.NumberColumn(format="$%.0f")
@@ -14,6 +14,8 @@ if src_path not in sys.path:
     sys.path.append(src_path)
 
 import data_loader 
+import ui_helpers # Tabla paginada
+import kpi_cube   # Cubo pre-agregado (fecha, comprador)
 
 # --- 2. Configuración de la Página ---
 st.set_page_config(
@@ -23,20 +25,14 @@ st.set_page_config(
 )
 
 # --- 3. Carga y Verificación de Datos ---
-# Nos aseguramos de que los datos estén cargados en la sesión
-if 'data_loaded' not in st.session_state:
-    st.info("Cargando datos... por favor, espere.")
-    # Intenta cargar los datos si no están (aunque app.py ya deberia haberlo hecho)
-    data_loader.load_data_into_session()
-
-# Si, después de intentar, sigue sin datos, detenemos.
-if 'data_loaded' not in st.session_state:
-    st.error("No se pudieron cargar los datos. Por favor, reinicie desde la página 'Menú'.")
-    st.stop()
+# Nos aseguramos de que los datos estén cargados en la sesión (si la carga sigue en
+# curso, se espera solo por 'OPOR.xlsx'; si falla, la página se detiene con el error)
+data_loader.require_datasets('oc')
 
 # Accedemos a los datos desde la sesión
 try:
-    df_oc = st.session_state.df_oc.copy()
+    # (Solo lectura: las agregaciones salen del cubo y el detalle filtra con .copy())
+    df_oc = st.session_state.df_oc
     
     # --- Verificación de Columnas (Añadido 'Comentarios') ---
     columnas_necesarias = ['Creador', 'Fecha de contabilización', 'Número de documento', 'Total_Linea', 'Comentarios']
@@ -51,6 +47,11 @@ except Exception as e:
     st.error(f"Ocurrió un error inesperado al preparar los datos: {e}")
     st.stop()
 
+# Cubo de KPIs: se construye una vez por versión de datos (normalmente ya precalentado
+# después de la carga) y lo comparten todas las sesiones
+with st.spinner("Pre-agregando KPIs de compradores..."):
+    cubo = kpi_cube.get_kpi_cube(df_oc, st.session_state.data_version)
+
 
 # --- 4. Título y Encabezado de la Página ---
 st.image("assets/COPEC-FLUX.svg", width=150)
@@ -63,7 +64,7 @@ st.markdown("---")
 st.sidebar.header("Filtros del Dashboard")
 
 # Obtener lista de compradores únicos
-lista_compradores = df_oc['Creador'].unique()
+lista_compradores = list(cubo.buyers)
 compradores_seleccionados = st.sidebar.multiselect(
     "Seleccione Comprador(es)",
     options=lista_compradores,
@@ -71,8 +72,8 @@ compradores_seleccionados = st.sidebar.multiselect(
 )
 
 # Filtro de Rango de Fechas
-min_fecha = df_oc['Fecha de contabilización'].min().date()
-max_fecha = df_oc['Fecha de contabilización'].max().date()
+min_fecha = cubo.min_date.date()
+max_fecha = cubo.max_date.date()
 
 fecha_inicio, fecha_fin = st.sidebar.date_input(
     "Seleccione Rango de Fechas",
@@ -91,19 +92,10 @@ if not compradores_seleccionados:
 fecha_inicio_ts = pd.to_datetime(fecha_inicio)
 fecha_fin_ts = pd.to_datetime(fecha_fin)
 
-# Filtrar el DataFrame
-df_filtrado = df_oc[
-    (df_oc['Creador'].isin(compradores_seleccionados)) &
-    (df_oc['Fecha de contabilización'] >= fecha_inicio_ts) &
-    (df_oc['Fecha de contabilización'] <= fecha_fin_ts)
-].copy() # <--- *** CORRECCIÓN 1: Se añade .copy() para evitar SettingWithCopyWarning ***
-
-# --- CORRECCIÓN 2: Forzar 'Comentarios' a string para evitar ArrowTypeError ---
-# Esto convierte todos los valores (incluyendo números) a texto y rellena vacíos.
-df_filtrado['Comentarios'] = df_filtrado['Comentarios'].astype(str).fillna('')
+# Filtrar el cubo (búsqueda binaria por fecha + máscara de compradores; no recorre las líneas)
+tramo = cubo.query(compradores_seleccionados, fecha_inicio_ts, fecha_fin_ts)
 
-
-if df_filtrado.empty:
+if tramo.empty:
     st.warning("No se encontraron datos para los filtros seleccionados.")
     st.stop()
 
@@ -112,16 +104,18 @@ st.header("Métricas Globales (filtradas)")
 
 col1, col2, col3 = st.columns(3)
 
+totales = tramo.totals()
+
 # KPI 1: Monto Total Comprado
-monto_total = df_filtrado['Total_Linea'].sum()
+monto_total = totales['monto_total']
 col1.metric("Monto Total Comprado", f"${monto_total:,.0f} CLP")
 
 # KPI 2: OCs Únicas Generadas
-ocs_unicas = df_filtrado['Número de documento'].nunique()
+ocs_unicas = totales['ocs_unicas']
 col2.metric("Nº OCs Únicas Generadas", f"{ocs_unicas}")
 
 # KPI 3: Compradores Activos
-compradores_activos = df_filtrado['Creador'].nunique()
+compradores_activos = totales['compradores_activos']
 col3.metric("Compradores Activos (en filtro)", f"{compradores_activos}")
 
 st.markdown("---")
@@ -129,12 +123,9 @@ st.markdown("---")
 # --- 8. Visualizaciones ---
 st.header("Análisis Visual")
 
-# Preparar datos para gráficos mensuales
-# (Esto ya no dará el Warning gracias al .copy() de arriba)
-df_filtrado['Año-Mes'] = df_filtrado['Fecha de contabilización'].dt.to_period('M').astype(str)
-
-# Agrupar por mes y comprador para los gráficos mensuales
-df_mensual_monto = df_filtrado.groupby(['Año-Mes', 'Creador'])['Total_Linea'].sum().reset_index()
+# Agregados por mes y comprador (desde el cubo) para los gráficos mensuales
+df_mensual = tramo.monthly()
+df_mensual_monto = df_mensual[['Año-Mes', 'Creador', 'Total_Linea']]
 
 
 # --- Gráfico 1: Compras Mensuales (Monto) - Líneas ---
@@ -180,10 +171,8 @@ with st.container(border=True):
 with st.container(border=True):
     st.subheader("OCs Únicas Mensuales - Barras Apiladas")
     
-    # Agrupar por mes y comprador, contando OCs únicas
-    df_mensual_ocs = df_filtrado.groupby(['Año-Mes', 'Creador']).agg(
-        Conteo_OCs=('Número de documento', 'nunique')
-    ).reset_index()
+    # OCs únicas por mes y comprador (ya contadas en el cubo)
+    df_mensual_ocs = df_mensual[['Año-Mes', 'Creador', 'Conteo_OCs']]
     
     chart_barra_ocs_mensual = alt.Chart(df_mensual_ocs).mark_bar().encode(
         # Ejes X e Y
@@ -206,11 +195,8 @@ with st.container(border=True):
 with st.container(border=True):
     st.subheader("Total OCs Únicas Generadas por Comprador")
     
-    # Agrupar por comprador para KPIs
-    df_kpi_comprador = df_filtrado.groupby('Creador').agg(
-        Monto_Total=('Total_Linea', 'sum'),
-        OCs_Unicas=('Número de documento', 'nunique')
-    ).reset_index().sort_values(by='OCs_Unicas', ascending=False)
+    # Totales por comprador (desde el cubo)
+    df_kpi_comprador = tramo.by_buyer().sort_values(by='OCs_Unicas', ascending=False)
     
     chart_barra_ocs = alt.Chart(df_kpi_comprador).mark_bar().encode(
         x=alt.X('OCs_Unicas', title='Cantidad de OCs Únicas'),
@@ -247,6 +233,24 @@ with st.container(border=True):
     st.altair_chart(chart_barra_monto, use_container_width=True)
 
 # --- 9. Vista de Datos (Detalle) ---
-with st.expander("Ver tabla de datos filtrados"):
-    # Esto ya no dará error gracias a la corrección de 'Comentarios'
-    st.dataframe(df_filtrado)
\ No newline at end of file
+# Fragmento: abrir el detalle o paginarlo no vuelve a dibujar los gráficos de arriba
+@st.fragment
+def mostrar_detalle_filtrado(compradores_seleccionados, fecha_inicio_ts, fecha_fin_ts):
+    with st.expander("Ver tabla de datos filtrados"):
+        if not st.toggle("Mostrar líneas de OC del filtro", key="kpis_ver_detalle"):
+            return
+
+        # Las líneas crudas solo se filtran aquí, para la tabla de detalle
+        df_filtrado = df_oc[
+            (df_oc['Creador'].isin(compradores_seleccionados)) &
+            (df_oc['Fecha de contabilización'] >= fecha_inicio_ts) &
+            (df_oc['Fecha de contabilización'] <= fecha_fin_ts)
+        ].copy() # <--- *** CORRECCIÓN 1: Se añade .copy() para evitar SettingWithCopyWarning ***
+
+        # --- CORRECCIÓN 2: Forzar 'Comentarios' a string para evitar ArrowTypeError ---
+        # Esto convierte todos los valores (incluyendo números) a texto y rellena vacíos.
+        df_filtrado['Comentarios'] = df_filtrado['Comentarios'].astype(str).fillna('')
+
+        ui_helpers.display_paginated_table(df_filtrado, key="kpis_detalle", hide_index=False)
+
+mostrar_detalle_filtrado(compradores_seleccionados, fecha_inicio_ts, fecha_fin_ts)
\ No newline at end of file
@@ -11,14 +11,14 @@ if src_path not in sys.path:
 
 import ui_helpers      # Importa las funciones de gráficos y métricas
 import data_loader     # Importamos esto solo por si acaso, pero los datos ya están cargados
+import arrivals_index  # Tabla de llegadas pre-normalizada e indexada
+import cache_manager   # Cache del proceso por versión de datos
 
 # --- 1. Título de la Página ---
 st.title("Consulta de Próximas Llegadas 📦")
 
 # Verifica si los datos están cargados (deben haber sido cargados por app.py)
-if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
-    st.error("Los datos no se han cargado. Por favor, vuelva al Menú Principal e inténtelo de nuevo.")
-    st.stop()
+data_loader.require_datasets('stock', 'oc', 'consumo')
 
 # --- 2. Acceder a los Datos desde st.session_state ---
 df_stock = st.session_state.df_stock
@@ -27,12 +27,10 @@ df_consumo = st.session_state.df_consumo
 
 # --- 3. Crear Selectores de Filtro ---
 
-# Listas para el selector de SKU
-lista_skus_stock = df_stock['CodigoArticulo'].dropna().unique()
-lista_skus_consumo = df_consumo['CodigoArticulo'].dropna().unique()
-all_skus = sorted(list(set(lista_skus_stock) | set(lista_skus_consumo)))
-
-opciones_selector_sku, mapa_nombres, _ = ui_helpers.create_sku_options(all_skus, df_stock)
+# Listas para el selector de SKU (cacheadas por versión de datos, compartidas con el Simulador)
+opciones = ui_helpers.get_selector_options(df_stock, df_consumo, st.session_state.data_version)
+opciones_selector_sku = opciones["sku_options"]
+mapa_nombres = opciones["mapa_nombres"]
 
 # Añadimos la opción "Todas" al selector de SKU
 opciones_con_todas = ["Todas"] + opciones_selector_sku
@@ -61,7 +59,7 @@ with col2:
 with col3:
     oc_buscada = st.text_input(
         "Filtrar por N° de Orden de Compra (OC):",
-        help="Escriba un número de OC para filtrar los resultados (búsqueda parcial)."
+        help="Escriba el número de OC o parte de él: se busca en cualquier parte del número."
     )
 
 with col4:
@@ -77,69 +75,24 @@ st.markdown("---")
 today = pd.Timestamp.now().floor('D')
 start_date = today - pd.Timedelta(days=10)
 
-# Limpiamos las fechas y cantidades de OC
-df_oc_clean = df_oc.copy()
+# Tabla de llegadas pre-normalizada e indexada (una vez por versión de datos y día)
+@cache_manager.cached('derivados')
+def get_arrivals_table(_df_oc, _mapa_nombres, data_version, start_date):
+    return arrivals_index.ArrivalsTable(_df_oc, _mapa_nombres, start_date)
+
 try:
-    df_oc_clean['Fecha de entrega de la línea'] = pd.to_datetime(df_oc_clean['Fecha de entrega de la línea'], format='%Y-m-%d', errors='coerce')
-    df_oc_clean['Cantidad'] = pd.to_numeric(df_oc_clean['Cantidad'], errors='coerce')
+    tabla_llegadas = get_arrivals_table(df_oc, mapa_nombres, st.session_state.data_version, start_date)
 except Exception as e:
     st.error(f"Error procesando datos de OC: {e}")
     st.stop()
 
-# (MODIFICADO) Validamos y convertimos a string las columnas de filtro ANTES de filtrar
-if 'Comentarios' not in df_oc_clean.columns:
-    df_oc_clean['Comentarios'] = 'N/A'
-
-df_oc_clean['Número de documento'] = df_oc_clean['Número de documento'].astype(str)
-df_oc_clean['Comentarios'] = df_oc_clean['Comentarios'].astype(str)
-
-
-# Empezamos con el filtro base (futuras y con cantidad)
-df_llegadas_detalle = df_oc_clean[
-    (df_oc_clean['Cantidad'] > 0) &
-    (df_oc_clean['Fecha de entrega de la línea'] >= start_date)
-].copy() # Hacemos una copia para evitar SettingWithCopyWarning
-
-# (MODIFICADO) Agregamos el nombre del artículo ANTES de filtrar
-df_llegadas_detalle['Nombre Artículo'] = df_llegadas_detalle['Número de artículo'].map(mapa_nombres).fillna('Nombre no encontrado')
-df_llegadas_detalle['Nombre Artículo'] = df_llegadas_detalle['Nombre Artículo'].astype(str)
-
-
-# Aplicamos el filtro de SKU si no es "Todas"
-if sku_seleccionado != "Todas":
-    df_llegadas_detalle = df_llegadas_detalle[
-        df_llegadas_detalle['Número de artículo'] == sku_seleccionado
-    ]
-
-# Aplicamos el filtro de OC si se escribió algo
-if oc_buscada:
-    df_llegadas_detalle = df_llegadas_detalle[
-        df_llegadas_detalle['Número de documento'].str.contains(
-            oc_buscada,
-            case=False, # Ignora mayúsculas/minúsculas
-            na=False      # Trata los NaN como si no coincidieran
-        )
-    ]
-
-# Aplicamos el filtro de Comentarios si se escribió algo
-if comentarios_buscados:
-    df_llegadas_detalle = df_llegadas_detalle[
-        df_llegadas_detalle['Comentarios'].str.contains(
-            comentarios_buscados,
-            case=False, # Ignora mayúsculas/minúsculas
-            na=False
-        )
-    ]
-
-# (NUEVO) Aplicamos el filtro de Nombre de Producto si se escribió algo
-if nombre_buscado:
-    df_llegadas_detalle = df_llegadas_detalle[
-        df_llegadas_detalle['Nombre Artículo'].str.contains(
-            nombre_buscado,
-            case=False, # Ignora mayúsculas/minúsculas
-            na=False
-        )
-    ]
+# Todos los filtros (SKU, OC, Comentarios, Nombre) en una sola consulta indexada
+df_llegadas_detalle = tabla_llegadas.query(
+    sku=sku_seleccionado if sku_seleccionado != "Todas" else None,
+    oc=oc_buscada,
+    comentario=comentarios_buscados,
+    nombre=nombre_buscado
+)
 
 # --- 5. Mostrar DataFrame ---
 if df_llegadas_detalle.empty:
@@ -174,10 +127,13 @@ else:
         'Comentarios': 'Comentarios'
     }, inplace=True)
 
-    df_display = df_display.sort_values(by='Fecha Llegada')
-
-    # Formateamos para mejor lectura
-    df_display['Fecha Llegada'] = df_display['Fecha Llegada'].dt.strftime('%Y-%m-%d')
-    df_display['Cantidad'] = df_display['Cantidad'].apply(lambda x: f"{x:,.0f}")
+    # (Las filas ya vienen ordenadas por fecha de llegada desde la tabla indexada)
 
-    st.dataframe(df_display, width='stretch', hide_index=True)
\ No newline at end of file
+    # Tabla paginada: se ordena por las columnas tipadas y solo se formatea la página visible
+    ui_helpers.display_paginated_table(
+        df_display,
+        key="proximas_llegadas",
+        default_sort='Fecha Llegada',
+        ascending=True,
+        formatters={'Fecha Llegada': "{:%Y-%m-%d}", 'Cantidad': "{:,.0f}"}
+    )
\ No newline at end of file
@@ -0,0 +1,161 @@
+# --- ARCHIVO: pages/Rendimiento.py ---
+# (NUEVA PÁGINA: tiempos por etapa, caches y memoria de la sesión; solo con instrumentación activa)
+
+import streamlit as st
+import pandas as pd
+import sys
+from pathlib import Path
+
+# --- 1. Configuración del Path ---
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+import perf
+import ui_helpers
+import cache_manager
+import warmup
+import data_loader
+from memo_cache import estimate_size
+
+# --- 2. Configuración de la Página ---
+st.set_page_config(layout="wide", page_title="Rendimiento")
+st.title("Rendimiento ⏱️")
+
+# --- 3. Página Oculta: sin instrumentación no se muestra nada ---
+# (La carpeta 'pages/' siempre lista el archivo en el menú; el contenido queda
+# reservado para diagnóstico.)
+if not perf.is_enabled():
+    st.info(
+        "La instrumentación de rendimiento está desactivada. Para activarla, inicie la app con "
+        "la variable de entorno `FLUX_PERF=1` (o `FLUX_PERF=mem` para medir también memoria) "
+        "o defina `PERF_ENABLED = True` en `src/config.py`."
+    )
+    st.stop()
+
+col_a, col_b = st.columns([1, 1])
+with col_a:
+    if st.button("🧹 Limpiar spans registrados"):
+        perf.clear()
+with col_b:
+    medir_memoria = st.toggle(
+        "Medir memoria por span (tracemalloc)",
+        value=perf.is_tracking_memory(),
+        help="Agrega el pico de memoria de cada etapa. Hace más lentas todas las sesiones mientras esté activo."
+    )
+    if medir_memoria != perf.is_tracking_memory():
+        perf.disable()
+        perf.enable(track_memory=medir_memoria)
+
+# --- 4. Resumen por Etapa ---
+st.header("Tiempos por etapa")
+st.caption("Spans recientes de todo el proceso (todas las sesiones), agrupados por etapa. Ordenado por tiempo total.")
+df_resumen = perf.span_summary()
+if df_resumen.empty:
+    st.info("Aún no hay spans registrados. Ejecute el Radar o el Simulador y vuelva a esta página.")
+else:
+    st.dataframe(
+        df_resumen,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+            "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+            "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+            "max_ms": st.column_config.NumberColumn("Máx. (ms)", format="%.1f"),
+            "mem_peak_mb": st.column_config.NumberColumn("Pico Mem. (MB)", format="%.1f"),
+        }
+    )
+
+    with st.expander("Spans recientes"):
+        df_spans = perf.recent_spans()
+        df_spans['meta'] = df_spans['meta'].map(lambda m: ', '.join(f"{k}={v}" for k, v in m.items()) if m else '')
+        ui_helpers.display_paginated_table(
+            df_spans,
+            key="perf_spans",
+            default_sort='timestamp',
+            column_config={
+                "ms": st.column_config.NumberColumn(format="%.1f"),
+                "mem_peak_mb": st.column_config.NumberColumn(format="%.1f"),
+            }
+        )
+
+# --- 5. Caches ---
+st.header("Caches")
+if st.button("🗑️ Vaciar todos los caches"):
+    cache_manager.clear()
+df_caches = perf.cache_stats()
+if df_caches.empty:
+    st.info("No hay caches registrados.")
+else:
+    df_caches['hit_rate'] = df_caches['hit_rate'] * 100
+    df_caches['MB'] = df_caches['bytes'] / 1024 ** 2
+    df_caches['Máx. MB'] = df_caches['max_bytes'] / 1024 ** 2
+    st.dataframe(
+        df_caches.drop(columns=['bytes', 'max_bytes']),
+        width='stretch',
+        hide_index=True,
+        column_config={
+            "hit_rate": st.column_config.ProgressColumn("Tasa de acierto", format="%.0f%%", min_value=0, max_value=100),
+            "MB": st.column_config.NumberColumn(format="%.1f"),
+            "Máx. MB": st.column_config.NumberColumn(format="%.0f"),
+        }
+    )
+
+st.subheader("Precalentamiento después de la carga")
+if not warmup.is_enabled():
+    st.caption("Desactivado (config.WARMUP_ENABLED o FLUX_WARMUP=0).")
+else:
+    df_warmup = warmup.status()
+    if df_warmup.empty:
+        st.info("Aún no se ha programado ningún precalentamiento.")
+    else:
+        st.dataframe(
+            df_warmup,
+            width='stretch',
+            hide_index=True,
+            column_config={"ms": st.column_config.NumberColumn(format="%.1f")}
+        )
+
+# --- 6. Memoria de los Datos Cargados ---
+st.header("Memoria de los datos cargados")
+df_datos = data_loader.memory_report()
+if df_datos.empty:
+    st.info("Aún no se ha cargado ningún archivo en este proceso.")
+else:
+    col_antes, col_despues = st.columns(2)
+    col_antes.metric("Sin compactar", f"{df_datos['mb_antes'].sum():,.1f} MB")
+    col_despues.metric(
+        "Compactado", f"{df_datos['mb_despues'].sum():,.1f} MB",
+        delta=f"{df_datos['mb_despues'].sum() - df_datos['mb_antes'].sum():,.1f} MB", delta_color="inverse"
+    )
+    st.dataframe(
+        df_datos,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            "mb_antes": st.column_config.NumberColumn("MB antes", format="%.1f"),
+            "mb_despues": st.column_config.NumberColumn("MB después", format="%.1f"),
+            "reduccion_pct": st.column_config.ProgressColumn("Reducción", format="%.0f%%", min_value=0, max_value=100),
+        }
+    )
+
+# --- 7. Memoria de la Sesión ---
+st.header("Memoria de esta sesión")
+df_memoria = pd.DataFrame(
+    [(clave, estimate_size(valor)) for clave, valor in st.session_state.items()],
+    columns=['Clave', 'Bytes']
+)
+df_memoria['MB'] = df_memoria['Bytes'] / 1024 ** 2
+df_memoria = df_memoria.sort_values('Bytes', ascending=False)
+st.metric("Total estimado en st.session_state", f"{df_memoria['MB'].sum():,.1f} MB")
+st.dataframe(
+    df_memoria[['Clave', 'MB']],
+    width='stretch',
+    hide_index=True,
+    column_config={"MB": st.column_config.NumberColumn(format="%.2f")}
+)
+st.caption(
+    "Los DataFrames cargados por el Menú vienen del cache 'datos' y son los mismos objetos en todas "
+    "las sesiones: este total no se multiplica por usuario."
+)
@@ -14,6 +14,8 @@ if src_path not in sys.path:
     sys.path.append(src_path)
 
 import ui_helpers  # Importamos los helpers para la localización
+import residential_agg  # Series mensuales e histogramas agregados en el servidor
+import data_loader  # Versión vigente de los datos
 
 # --- 1. Configuración de Página y Verificación de Datos ---
 st.set_page_config(layout="wide", page_title="Análisis Residencial")
@@ -22,48 +24,18 @@ ui_helpers.setup_locale() # Configura meses en español
 st.title("Análisis de Proyectos Residenciales 🏡")
 st.markdown("KPIs sobre ventas, potencia instalada y tiempos de ciclo.")
 
-if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
-    st.error("Los datos no se han cargado. Por favor, vuelva al Menú Principal.")
-    st.stop()
+data_loader.require_datasets('residencial')
 
 # --- 2. Acceder y Preparar los Datos ---
+# La limpieza (tipos, dropna, días de ciclo) y la tabla de KPIs por año se calculan
+# UNA vez por versión de datos (normalmente ya precalentadas después de la carga)
+# y se comparten entre sesiones (solo lectura).
 try:
     # Usamos los datos cargados en la sesión
-    df_residencial = st.session_state.df_residencial.copy()
-
-    # --- Limpieza y Transformación de Datos ---
-    # Convertimos las columnas a los tipos correctos
-    df_residencial['kWp'] = pd.to_numeric(df_residencial['kWp'], errors='coerce')
-    df_residencial['Fecha de ganado'] = pd.to_datetime(df_residencial['Fecha de ganado'], errors='coerce')
-    df_residencial['Fecha de inicio de instalación real'] = pd.to_datetime(df_residencial['Fecha de inicio de instalación real'], errors='coerce')
-    df_residencial['Fecha de término de instalación real'] = pd.to_datetime(df_residencial['Fecha de término de instalación real'], errors='coerce')
-
-    # --- (CORRECCIÓN IMPORTANTE) ---
-    # CREAMOS TRES DATAFRAMES SEPARADOS:
-    
-    # 1. df_ventas: Para KPIs de ventas. Solo requiere datos de venta.
-    df_ventas = df_residencial.dropna(subset=['Fecha de ganado', 'kWp', 'CeCo']).copy()
-    df_ventas['Mes Fecha de ganado'] = df_ventas['Fecha de ganado'].dt.to_period('M').astype(str)
-
-    # 2. df_iniciados: Para KPIs de ciclo e instalación INICIADA.
-    df_iniciados = df_residencial.dropna(subset=['Fecha de ganado', 'Fecha de inicio de instalación real', 'kWp', 'CeCo']).copy()
-    
-    # 3. df_terminados: Para KPIs de instalación TERMINADA.
-    df_terminados = df_residencial.dropna(subset=['Fecha de ganado', 'Fecha de inicio de instalación real', 'Fecha de término de instalación real', 'kWp', 'CeCo']).copy()
-    
-    # --- Cálculo de Métricas Clave (en sus DFs correspondientes) ---
-    if not df_iniciados.empty:
-        # Días desde la venta hasta el inicio de la instalación
-        df_iniciados['Dias (Venta a Inicio)'] = (df_iniciados['Fecha de inicio de instalación real'] - df_iniciados['Fecha de ganado']).dt.days
-        # Filtramos datos ilógicos
-        df_iniciados = df_iniciados[df_iniciados['Dias (Venta a Inicio)'] >= 0].copy()
-
-    if not df_terminados.empty:
-        # Días de ejecución (inicio a fin)
-        df_terminados['Dias (Ejecución Inicio a Fin)'] = (df_terminados['Fecha de término de instalación real'] - df_terminados['Fecha de inicio de instalación real']).dt.days
-        # Filtramos datos ilógicos
-        df_terminados = df_terminados[df_terminados['Dias (Ejecución Inicio a Fin)'] >= 0].copy()
-
+    with st.spinner("Preparando datos residenciales..."):
+        df_ventas, df_iniciados, df_terminados, kpis_por_ano = residential_agg.get_residential_data(
+            st.session_state.df_residencial, st.session_state.data_version
+        )
 
 except Exception as e:
     st.error(f"Error al procesar los datos residenciales: {e}")
@@ -78,84 +50,81 @@ if df_ventas.empty:
     st.warning("No hay datos de ventas suficientes para mostrar KPIs.")
     st.stop()
     
-anos_disponibles = sorted(df_ventas['Fecha de ganado'].dt.year.unique(), reverse=True)
+anos_disponibles = kpis_por_ano.index.tolist() # Ya ordenados de más reciente a más antiguo
 if not anos_disponibles:
     st.warning("No hay datos suficientes para mostrar KPIs.")
     st.stop()
     
-ano_seleccionado = st.selectbox("Seleccione Año para KPIs (basado en Fecha de Ganado):", anos_disponibles)
+def _metric_tiempo(col, label, kpis_ano, prefix):
+    """Métrica de tiempo de ciclo: promedio, con mediana y P90 en la ayuda."""
+    promedio = kpis_ano[f'{prefix}_Prom']
+    if pd.isna(promedio):
+        col.metric(label=label, value="N/A")
+    else:
+        col.metric(
+            label=label,
+            value=f"{promedio:.1f} días",
+            help=f"Mediana: {kpis_ano[f'{prefix}_P50']:.1f} días · P90: {kpis_ano[f'{prefix}_P90']:.1f} días"
+        )
 
-# Filtramos todos los DataFrames por el año de VENTA
-df_filtrado_ventas = df_ventas[df_ventas['Fecha de ganado'].dt.year == ano_seleccionado]
-df_filtrado_iniciados = df_iniciados[df_iniciados['Fecha de ganado'].dt.year == ano_seleccionado]
-df_filtrado_terminados = df_terminados[df_terminados['Fecha de ganado'].dt.year == ano_seleccionado]
+# Fragmento: cambiar de año solo re-ejecuta estas métricas (no los gráficos de abajo)
+@st.fragment
+def mostrar_kpis_anuales():
+    ano_seleccionado = st.selectbox("Seleccione Año para KPIs (basado en Fecha de Ganado):", anos_disponibles)
 
+    # Cambiar de año es solo una búsqueda en la tabla precalculada
+    kpis_ano = kpis_por_ano.loc[ano_seleccionado]
 
-if df_filtrado_ventas.empty:
-    st.warning(f"No hay datos para el año {ano_seleccionado}.")
-else:
     # (MODIFICADO) 4 KPIs
     col1, col2, col3, col4 = st.columns(4)
-    # KPI de Ventas (usa df_filtrado_ventas)
+    # KPI de Ventas
     col1.metric(
         label=f"Proyectos Ganados ({ano_seleccionado})",
-        value=df_filtrado_ventas['CeCo'].nunique()
+        value=int(kpis_ano['Proyectos_Ganados'])
     )
-    # KPI de Ventas (usa df_filtrado_ventas)
+    # KPI de Ventas
     col2.metric(
         label=f"Total kWp Ganados ({ano_seleccionado})",
-        value=f"{df_filtrado_ventas['kWp'].sum():,.1f} kWp"
+        value=f"{kpis_ano['kWp_Ganados']:,.1f} kWp"
     )
-    # KPI de Ciclo (usa df_filtrado_iniciados)
-    if not df_filtrado_iniciados.empty:
-        col3.metric(
-            label=f"Tiempo Prom. (Venta a Inicio) ({ano_seleccionado})",
-            value=f"{df_filtrado_iniciados['Dias (Venta a Inicio)'].mean():.1f} días"
-        )
-    else:
-        col3.metric(
-            label=f"Tiempo Prom. (Venta a Inicio) ({ano_seleccionado})",
-            value="N/A"
-        )
-    
-    # (NUEVO) KPI de Ejecución (usa df_filtrado_terminados)
-    if not df_filtrado_terminados.empty:
-        col4.metric(
-            label=f"Tiempo Prom. Ejecución (Inicio a Fin) ({ano_seleccionado})",
-            value=f"{df_filtrado_terminados['Dias (Ejecución Inicio a Fin)'].mean():.1f} días"
-        )
-    else:
-        col4.metric(
-            label=f"Tiempo Prom. Ejecución (Inicio a Fin) ({ano_seleccionado})",
-            value="N/A"
-        )
+    # KPI de Ciclo (proyectos iniciados)
+    _metric_tiempo(col3, f"Tiempo Prom. (Venta a Inicio) ({ano_seleccionado})", kpis_ano, 'Venta_Inicio')
+
+    # (NUEVO) KPI de Ejecución (proyectos terminados)
+    _metric_tiempo(col4, f"Tiempo Prom. Ejecución (Inicio a Fin) ({ano_seleccionado})", kpis_ano, 'Ejecucion')
+
+mostrar_kpis_anuales()
 
 st.markdown("---")
 
 # --- 4. Visualizaciones ---
 st.subheader("Visualizaciones")
 
+# Los gráficos reciben solo puntos ya agregados (un punto por mes / por intervalo),
+# no las filas de cada proyecto. Se calculan una vez por versión de datos.
+agregados = residential_agg.get_chart_aggregates(df_ventas, df_iniciados, df_terminados, st.session_state.data_version)
+
 # --- Gráfico 1: kWp Ganados por Mes ---
 st.markdown("#### kWp Ganados por Mes")
-chart_kWp_mes = alt.Chart(df_ventas).mark_bar(color="#004a99").encode( # Usa df_ventas
-    x=alt.X('yearmonth(Fecha de ganado):T', title='Mes (Proyecto Ganado)'),
-    y=alt.Y('kWp:Q', aggregate='sum', title='Suma de kWp'),
+chart_kWp_mes = alt.Chart(agregados['ventas_mes']).mark_bar(color="#004a99").encode( # Agregado de df_ventas
+    x=alt.X('yearmonth(Mes):T', title='Mes (Proyecto Ganado)'),
+    y=alt.Y('Suma:Q', title='Suma de kWp'),
     tooltip=[
-        alt.Tooltip('yearmonth(Fecha de ganado):T', title='Mes'),
-        alt.Tooltip('kWp:Q', aggregate='sum', title='Total kWp'),
-        alt.Tooltip('count()', title='N° Proyectos')
+        alt.Tooltip('yearmonth(Mes):T', title='Mes'),
+        alt.Tooltip('Suma:Q', title='Total kWp'),
+        alt.Tooltip('N_Proyectos:Q', title='N° Proyectos')
     ]
 ).interactive()
 st.altair_chart(chart_kWp_mes, use_container_width=True)
 
 # --- Gráfico 2: N° de Proyectos Ganados por Mes ---
 st.markdown("#### N° de Proyectos Ganados por Mes")
-chart_proyectos_mes = alt.Chart(df_ventas).mark_line(point=True, color="#004a99").encode( # Usa df_ventas
-    x=alt.X('yearmonth(Fecha de ganado):T', title='Mes (Proyecto Ganado)'),
-    y=alt.Y('count()', title='Número de Proyectos'),
+chart_proyectos_mes = alt.Chart(agregados['ventas_mes']).mark_line(point=True, color="#004a99").encode( # Agregado de df_ventas
+    x=alt.X('yearmonth(Mes):T', title='Mes (Proyecto Ganado)'),
+    y=alt.Y('N_Proyectos:Q', title='Número de Proyectos'),
     tooltip=[
-        alt.Tooltip('yearmonth(Fecha de ganado):T', title='Mes'),
-        alt.Tooltip('count()', title='N° Proyectos')
+        alt.Tooltip('yearmonth(Mes):T', title='Mes'),
+        alt.Tooltip('N_Proyectos:Q', title='N° Proyectos')
     ]
 ).interactive()
 st.altair_chart(chart_proyectos_mes, use_container_width=True)
@@ -163,41 +132,41 @@ st.altair_chart(chart_proyectos_mes, use_container_width=True)
 
 # --- Gráfico 3: N° de Proyectos Iniciados (Instalación) por Mes ---
 st.markdown("#### N° de Proyectos Iniciados (Instalación) por Mes")
-chart_proyectos_instalados_mes = alt.Chart(df_iniciados).mark_bar(color='#2ca02c', opacity=0.8).encode( # Usa df_iniciados
-    x=alt.X('yearmonth(Fecha de inicio de instalación real):T', title='Mes (Inicio Instalación)'),
-    y=alt.Y('count()', title='Número de Proyectos Iniciados'),
+chart_proyectos_instalados_mes = alt.Chart(agregados['iniciados_mes']).mark_bar(color='#2ca02c', opacity=0.8).encode( # Agregado de df_iniciados
+    x=alt.X('yearmonth(Mes):T', title='Mes (Inicio Instalación)'),
+    y=alt.Y('N_Proyectos:Q', title='Número de Proyectos Iniciados'),
     tooltip=[
-        alt.Tooltip('yearmonth(Fecha de inicio de instalación real):T', title='Mes Inicio'),
-        alt.Tooltip('count()', title='N° Proyectos Iniciados')
+        alt.Tooltip('yearmonth(Mes):T', title='Mes Inicio'),
+        alt.Tooltip('N_Proyectos:Q', title='N° Proyectos Iniciados')
     ]
 ).interactive()
 st.altair_chart(chart_proyectos_instalados_mes, use_container_width=True)
 
 # --- Gráfico 4: kWp Instalados (Iniciados) por Mes ---
 st.markdown("#### kWp Instalados (Proyectos Iniciados) por Mes")
-chart_kWp_instalados_mes = alt.Chart(df_iniciados).mark_bar(color='#1f77b4', opacity=0.8).encode( # Usa df_iniciados
-    x=alt.X('yearmonth(Fecha de inicio de instalación real):T', title='Mes (Inicio Instalación)'),
-    y=alt.Y('kWp:Q', aggregate='sum', title='Suma de kWp (Iniciados)'),
+chart_kWp_instalados_mes = alt.Chart(agregados['iniciados_mes']).mark_bar(color='#1f77b4', opacity=0.8).encode( # Agregado de df_iniciados
+    x=alt.X('yearmonth(Mes):T', title='Mes (Inicio Instalación)'),
+    y=alt.Y('Suma:Q', title='Suma de kWp (Iniciados)'),
     tooltip=[
-        alt.Tooltip('yearmonth(Fecha de inicio de instalación real):T', title='Mes Inicio'),
-        alt.Tooltip('kWp:Q', aggregate='sum', title='Total kWp (Iniciados)'),
-        alt.Tooltip('count()', title='N° Proyectos Iniciados')
+        alt.Tooltip('yearmonth(Mes):T', title='Mes Inicio'),
+        alt.Tooltip('Suma:Q', title='Total kWp (Iniciados)'),
+        alt.Tooltip('N_Proyectos:Q', title='N° Proyectos Iniciados')
     ]
 ).interactive()
 st.altair_chart(chart_kWp_instalados_mes, use_container_width=True)
 
 # --- (NUEVO) GRÁFICO 5: N° de Proyectos Terminados por Mes ---
 st.markdown("#### N° de Proyectos Terminados por Mes")
-chart_proyectos_terminados_mes = alt.Chart(df_terminados).mark_bar(color='#ff7f0e', opacity=0.8).encode( # Usa df_terminados
-    # Usamos la columna 'Fecha de término de instalación real'
-    x=alt.X('yearmonth(Fecha de término de instalación real):T', title='Mes (Término Instalación)'),
+chart_proyectos_terminados_mes = alt.Chart(agregados['terminados_mes']).mark_bar(color='#ff7f0e', opacity=0.8).encode( # Agregado de df_terminados
+    # Mes de la 'Fecha de término de instalación real'
+    x=alt.X('yearmonth(Mes):T', title='Mes (Término Instalación)'),
     
-    # Contamos los proyectos
-    y=alt.Y('count()', title='Número de Proyectos Terminados'),
+    # Proyectos contados en el servidor
+    y=alt.Y('N_Proyectos:Q', title='Número de Proyectos Terminados'),
     
     tooltip=[
-        alt.Tooltip('yearmonth(Fecha de término de instalación real):T', title='Mes Término'),
-        alt.Tooltip('count()', title='N° Proyectos Terminados')
+        alt.Tooltip('yearmonth(Mes):T', title='Mes Término'),
+        alt.Tooltip('N_Proyectos:Q', title='N° Proyectos Terminados')
     ]
 ).interactive()
 st.altair_chart(chart_proyectos_terminados_mes, use_container_width=True)
@@ -206,12 +175,13 @@ st.altair_chart(chart_proyectos_terminados_mes, use_container_width=True)
 # --- Gráfico 6: Histograma de Tiempos de Ciclo (Venta a Inicio) ---
 st.markdown("#### Distribución: Días de Venta a Inicio de Instalación")
 st.markdown("Muestra cuántos proyectos tardan 'X' días en comenzar a instalarse después de la venta.")
-chart_histogram_lag = alt.Chart(df_iniciados).mark_bar().encode( # Usa df_iniciados
-    x=alt.X('Dias (Venta a Inicio):Q', bin=alt.Bin(maxbins=30), title='Días (Venta a Inicio)'),
-    y=alt.Y('count()', title='Cantidad de Proyectos'),
+chart_histogram_lag = alt.Chart(agregados['hist_venta_inicio']).mark_bar().encode( # Intervalos de df_iniciados
+    x=alt.X('Desde:Q', title='Días (Venta a Inicio)'),
+    x2='Hasta:Q',
+    y=alt.Y('Cantidad:Q', title='Cantidad de Proyectos'),
     tooltip=[
-        alt.Tooltip('Dias (Venta a Inicio):Q', bin=alt.Bin(maxbins=30), title='Rango (Días)'),
-        alt.Tooltip('count()', title='Cantidad de Proyectos')
+        alt.Tooltip('Rango:N', title='Rango (Días)'),
+        alt.Tooltip('Cantidad:Q', title='Cantidad de Proyectos')
     ]
 ).interactive()
 st.altair_chart(chart_histogram_lag, use_container_width=True)
@@ -220,19 +190,23 @@ st.altair_chart(chart_histogram_lag, use_container_width=True)
 # --- Gráfico 7: Relación entre Tamaño de Proyecto (kWp) y Tiempo (Venta a Inicio) ---
 st.markdown("#### Relación: kWp vs. Días de Venta a Inicio")
 st.markdown("Ayuda a ver si los proyectos más grandes (más kWp) tardan más en instalarse.")
-chart_scatter_lag_kWp = alt.Chart(df_iniciados).mark_circle(opacity=0.6).encode( # Usa df_iniciados
+df_scatter = agregados['scatter_kwp_dias'] # Puntos de df_iniciados (agrupados si son demasiados)
+agrupado = 'CeCo' not in df_scatter.columns
+chart_scatter_lag_kWp = alt.Chart(df_scatter).mark_circle(opacity=0.6).encode(
     x=alt.X('kWp:Q', title='kWp del Proyecto', scale=alt.Scale(zero=False)),
     y=alt.Y('Dias (Venta a Inicio):Q', title='Días (Venta a Inicio)', scale=alt.Scale(zero=False)),
-    tooltip=['CeCo:N', 'kWp:Q', 'Dias (Venta a Inicio):Q']
+    size=alt.Size('N_Proyectos:Q', title='N° Proyectos') if agrupado else alt.value(30),
+    tooltip=(['N_Proyectos:Q'] if agrupado else ['CeCo:N']) + ['kWp:Q', 'Dias (Venta a Inicio):Q']
 ).interactive()
 st.altair_chart(chart_scatter_lag_kWp, use_container_width=True)
 
 # --- 5. Detalle de Datos (Opcional) ---
-with st.expander("Ver tabla de datos de Ventas (Todos los ganados)"):
-    st.dataframe(df_ventas, use_container_width=True)
-
-with st.expander("Ver tabla de datos de Proyectos Iniciados"):
-    st.dataframe(df_iniciados, use_container_width=True)
-    
-with st.expander("Ver tabla de datos de Proyectos Terminados"):
-    st.dataframe(df_terminados, use_container_width=True)
\ No newline at end of file
+# Cada tabla en su propio fragmento: paginar u ordenar no redibuja el resto de la página
+@st.fragment
+def mostrar_tabla_detalle(titulo, df, key):
+    with st.expander(titulo):
+        ui_helpers.display_paginated_table(df, key=key, hide_index=False)
+
+mostrar_tabla_detalle("Ver tabla de datos de Ventas (Todos los ganados)", df_ventas, "res_ventas")
+mostrar_tabla_detalle("Ver tabla de datos de Proyectos Iniciados", df_iniciados, "res_iniciados")
+mostrar_tabla_detalle("Ver tabla de datos de Proyectos Terminados", df_terminados, "res_terminados")
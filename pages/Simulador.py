@@ -13,13 +13,14 @@ if src_path not in sys.path:
 import config         # Importa constantes
 import simulator      # Importa el motor de simulación
 import ui_helpers     # Importa las funciones de gráficos y métricas
+import perf           # Spans de rendimiento (página Rendimiento)
+import data_loader    # Versión vigente de los datos
+import predicate_index # Filas por SKU y bodega (índice por versión de datos)
 import altair as alt  # Importamos Altair
 
 # --- 1. LÓGICA DE LA PÁGINA DEL SIMULADOR ---
 # Verifica si los datos están cargados (deben haber sido cargados por app.py
-if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
-    st.error("Los datos no se han cargado. Por favor, vuelva al Menú Principal e inténtelo de nuevo.")
-    st.stop()
+data_loader.require_datasets('stock', 'oc', 'consumo')
 
 # --- Configuración de Idioma y Título del Simulador ---
 ui_helpers.setup_locale() # Configura meses en español
@@ -37,16 +38,16 @@ df_consumo = st.session_state.df_consumo
 # --- 3. Construcción de la Barra Lateral (Sidebar) ---
 st.sidebar.header("Configuración de Simulación")
 
-# --- Listas para selectores ---
-lista_skus_stock = df_stock['CodigoArticulo'].dropna().unique()
-lista_skus_consumo = df_consumo['CodigoArticulo'].dropna().unique()
-all_skus = sorted(list(set(lista_skus_stock) | set(lista_skus_consumo)))
+# --- Listas para selectores (cacheadas por versión de datos, compartidas entre páginas) ---
+opciones = ui_helpers.get_selector_options(df_stock, df_consumo, st.session_state.data_version)
 
-lista_bodegas_stock = sorted(df_stock['CodigoBodega'].dropna().unique())
-lista_bodegas_consumo = sorted(df_consumo['BodegaDestino_Requerida'].dropna().unique())
+lista_bodegas_stock = opciones["bodegas_stock"]
+lista_bodegas_consumo = opciones["bodegas_consumo"]
 
 # --- Requerimiento 2: Selector de SKU (usando ui_helper) ---
-opciones_selector_sku, mapa_nombres, default_index = ui_helpers.create_sku_options(all_skus, df_stock)
+opciones_selector_sku = opciones["sku_options"]
+mapa_nombres = opciones["mapa_nombres"]
+default_index = opciones["default_index"]
 
 sku_seleccionado_formateado = st.sidebar.selectbox(
     "1. Seleccione un SKU (busque por código o nombre):",
@@ -98,7 +99,128 @@ service_level_z = config.Z_SCORE_MAP[service_level_str]
 
 lead_time_days = st.sidebar.number_input("5. Lead Time (Días):", min_value=1, max_value=120, value=90)
 
-dias_a_simular = st.sidebar.number_input("6. Días a Simular:", min_value=30, max_value=365, value=100)
+dias_a_simular = st.sidebar.number_input("6. Días a Simular:", min_value=30, max_value=1095, value=100)
+
+demand_model_str = st.sidebar.selectbox(
+    "7. Modelo de Demanda:",
+    options=list(config.DEMAND_MODELS.keys()),
+    index=0,
+    help="'Bootstrap empírico' re-muestrea bloques de consumo diario real (ST_OWTR) en cientos de trayectorias, "
+         "capturando la demanda intermitente por proyectos."
+)
+demand_model = config.DEMAND_MODELS[demand_model_str]
+
+granularity_str = st.sidebar.selectbox(
+    "8. Granularidad de la Proyección:",
+    options=list(config.SIMULATION_GRANULARITIES.keys()),
+    index=0,
+    help="Para horizontes largos, 'Semanal' o 'Mensual' agregan llegadas y demanda por período "
+         "y generan tablas y gráficos mucho más livianos."
+)
+granularity = config.SIMULATION_GRANULARITIES[granularity_str]
+
+# --- Fragmento de Resultados ---
+# Muestra la última simulación (guardada en la sesión). Los controles internos
+# (tabla de proyección, paginación) solo re-ejecutan este fragmento.
+@st.fragment
+def mostrar_resultados_simulacion(resultado):
+    df_sim = resultado['df_sim']
+    metrics = resultado['metrics']
+    llegadas_map = resultado['llegadas_map']
+    params = resultado['params']
+    sku = params['sku']
+
+    # --- B. Mostrar Métricas ---
+    st.subheader(f"Resultados para: {sku}")
+    st.caption(f"Nombre: {mapa_nombres.get(sku, 'N/A')}")
+    ui_helpers.display_metrics(metrics, params['lead_time_days'], params['service_level_z'])
+
+    # --- C. Mostrar Recomendación de Pedido (Refactorizada) ---
+    st.markdown("---") # Separador
+    ui_helpers.display_order_recommendation(metrics, llegadas_map, df_sim, params['lead_time_days'])
+
+    # --- D. Mostrar Detalle de Llegadas ---
+    st.markdown("---") # Separador
+    ui_helpers.display_arrival_details(resultado['df_llegadas_detalle'])
+    st.markdown("---") # Separador
+
+    # --- E. Generar y Mostrar Gráfico ---
+    sku_name = mapa_nombres.get(sku, sku)
+    with perf.span('page.simulador.chart', filas=len(df_sim)):
+        fig = ui_helpers.generate_simulation_plot(
+            df_sim, 
+            metrics, 
+            llegadas_map, 
+            sku_name, 
+            params['dias_a_simular']
+        )
+        st.altair_chart(fig, use_container_width=True)
+
+    # --- F. Mostrar Tabla Fin de Mes (Req. 3) ---
+    df_tabla_resultados = ui_helpers.prepare_end_of_month_table(metrics['month_end_levels'])
+    st.subheader("Stock Simulado a Fin de Mes")
+    st.dataframe(df_tabla_resultados, width='stretch', hide_index=True)
+
+    if st.toggle("Ver proyección completa (por período)", key="sim_ver_proyeccion"):
+        ui_helpers.display_paginated_table(
+            df_sim.reset_index(),
+            key="sim_proyeccion",
+            default_sort='Fecha',
+            ascending=True,
+            formatters={'Fecha': "{:%Y-%m-%d}"}
+        )
+
+    # --- G. Mostrar Tabla de Consumo Utilizada ---
+    st.markdown("---")
+    with st.expander("Ver datos de consumo utilizados para esta simulación"):
+
+        st.subheader(f"Historial de Consumo para {sku}")
+        st.caption(f"Filtrado por bodegas: {', '.join(params['bodega_consumo_sel'])}")
+
+        # Re-filtramos los datos de consumo tal como lo hace el simulador
+        # (El df_consumo global ya fue filtrado por fecha en data_loader.py)
+        if st.session_state.data_version is not None:
+            indice = predicate_index.get_table_index(df_consumo, 'consumo', st.session_state.data_version)
+            df_consumo_usado = df_consumo.iloc[indice.intersect(
+                indice.equals('CodigoArticulo', sku),
+                indice.isin('BodegaDestino_Requerida', params['bodega_consumo_sel'])
+            )].copy()
+        else:
+            df_consumo_usado = df_consumo[
+                (df_consumo['CodigoArticulo'] == sku) &
+                (df_consumo['BodegaDestino_Requerida'].isin(params['bodega_consumo_sel']))
+            ].copy()
+
+        if df_consumo_usado.empty:
+            st.warning("No se encontró historial de consumo para este SKU y bodegas.")
+        else:
+            # --- INICIO DE LA MODIFICACIÓN ---
+            # Limpiamos y seleccionamos columnas relevantes para mostrar
+            columnas_a_mostrar = [
+                'FechaSolicitud', 
+                'CantidadSolicitada', 
+                'BodegaDestino_Requerida',
+                'SolicitadoPor',         # <-- Columna añadida
+                'CodigoProyecto',         # <-- Columna añadida
+                'NombreProyecto',         # <-- Columna añadida
+                'CodigoUnidadNegocio',    # <-- Columna añadida
+                'CeCo' # Este es un supuesto, podría no estar
+            ]
+            # --- FIN DE LA MODIFICACIÓN ---
+            # Filtramos solo columnas que realmente existen en el DataFrame
+            columnas_existentes = [col for col in columnas_a_mostrar if col in df_consumo_usado.columns]
+            df_display_consumo = df_consumo_usado[columnas_existentes].sort_values(by='FechaSolicitud', ascending=False)
+            st.dataframe(df_display_consumo, use_container_width=True)
+            # Mostramos un resumen del consumo mensual
+            st.subheader("Resumen de Consumo Mensual (Base del Cálculo)")
+            try:
+                df_consumo_usado['FechaSolicitud'] = pd.to_datetime(df_consumo_usado['FechaSolicitud'])
+                consumo_mensual = df_consumo_usado.set_index('FechaSolicitud')['CantidadSolicitada'].resample('MS').sum().reset_index()
+                consumo_mensual.columns = ["Mes", "Total Solicitado"]
+                st.dataframe(consumo_mensual.sort_values(by="Mes", ascending=False), use_container_width=True)
+            except Exception as e:
+                st.error(f"No se pudo generar el resumen mensual: {e}")
+
 
 # --- 4. Disparador de Ejecución ---
 if st.sidebar.button("🚀 Ejecutar Simulación", type="primary"):
@@ -110,11 +232,13 @@ if st.sidebar.button("🚀 Ejecutar Simulación", type="primary"):
         st.error("Por favor, seleccione al menos una Bodega de Consumo.")
         st.stop()
 
-    with st.spinner("Calculando simulación..."):
+    with st.spinner("Calculando simulación..."), perf.span('page.simulador.run', sku=sku_seleccionado, modelo=demand_model):
 
         # --- A. Ejecutar Simulación ---
         # (MODIFICADO) Pasamos las listas 'bodega_stock_sel' y 'bodega_consumo_sel'
-        df_sim, metrics, llegadas_map, df_llegadas_detalle = simulator.run_inventory_simulation(
+        # Versión memoizada: combinaciones ya calculadas (por cualquier usuario) vuelven al instante
+        df_sim, metrics, llegadas_map, df_llegadas_detalle = simulator.run_inventory_simulation_cached(
+            data_version=st.session_state.data_version,
             sku_to_simulate=sku_seleccionado,
             warehouse_code=bodega_stock_sel,
             consumption_warehouse=bodega_consumo_sel,
@@ -123,83 +247,38 @@ if st.sidebar.button("🚀 Ejecutar Simulación", type="primary"):
             df_oc_raw=df_oc,       # Pasando el df desde session_state
             simulation_days=dias_a_simular,
             lead_time_days=lead_time_days,
-            service_level_z=service_level_z
-        )
-
-        # --- B. Mostrar Métricas ---
-        st.subheader(f"Resultados para: {sku_seleccionado}")
-        st.caption(f"Nombre: {mapa_nombres.get(sku_seleccionado, 'N/A')}")
-        ui_helpers.display_metrics(metrics, lead_time_days, service_level_z)
-
-        # --- C. Mostrar Recomendación de Pedido (Refactorizada) ---
-        st.markdown("---") # Separador
-        ui_helpers.display_order_recommendation(metrics, llegadas_map, df_sim, lead_time_days)
-
-        # --- D. Mostrar Detalle de Llegadas ---
-        st.markdown("---") # Separador
-        ui_helpers.display_arrival_details(df_llegadas_detalle)
-        st.markdown("---") # Separador
-
-        # --- E. Generar y Mostrar Gráfico ---
-        sku_name = mapa_nombres.get(sku_seleccionado, sku_seleccionado)
-        fig = ui_helpers.generate_simulation_plot(
-            df_sim, 
-            metrics, 
-            llegadas_map, 
-            sku_name, 
-            dias_a_simular
+            service_level_z=service_level_z,
+            demand_model=demand_model,
+            granularity=granularity
         )
-        st.altair_chart(fig, use_container_width=True)
-
-        # --- F. Mostrar Tabla Fin de Mes (Req. 3) ---
-        df_tabla_resultados = ui_helpers.prepare_end_of_month_table(df_sim)
-        st.subheader("Stock Simulado a Fin de Mes")
-        st.dataframe(df_tabla_resultados, width='stretch', hide_index=True)
-
-        # --- G. Mostrar Tabla de Consumo Utilizada ---
-        st.markdown("---")
-        with st.expander("Ver datos de consumo utilizados para esta simulación"):
 
-            st.subheader(f"Historial de Consumo para {sku_seleccionado}")
-            st.caption(f"Filtrado por bodegas: {', '.join(bodega_consumo_sel)}")
-
-            # Re-filtramos los datos de consumo tal como lo hace el simulador
-            # (El df_consumo global ya fue filtrado por fecha en data_loader.py)
-            df_consumo_usado = df_consumo[
-                (df_consumo['CodigoArticulo'] == sku_seleccionado) &
-                (df_consumo['BodegaDestino_Requerida'].isin(bodega_consumo_sel))
-            ].copy()
-
-            if df_consumo_usado.empty:
-                st.warning("No se encontró historial de consumo para este SKU y bodegas.")
-            else:
-                # --- INICIO DE LA MODIFICACIÓN ---
-                # Limpiamos y seleccionamos columnas relevantes para mostrar
-                columnas_a_mostrar = [
-                    'FechaSolicitud', 
-                    'CantidadSolicitada', 
-                    'BodegaDestino_Requerida',
-                    'SolicitadoPor',         # <-- Columna añadida
-                    'CodigoProyecto',         # <-- Columna añadida
-                    'NombreProyecto',         # <-- Columna añadida
-                    'CodigoUnidadNegocio',    # <-- Columna añadida
-                    'CeCo' # Este es un supuesto, podría no estar
-                ]
-                # --- FIN DE LA MODIFICACIÓN ---
-                # Filtramos solo columnas que realmente existen en el DataFrame
-                columnas_existentes = [col for col in columnas_a_mostrar if col in df_consumo_usado.columns]
-                df_display_consumo = df_consumo_usado[columnas_existentes].sort_values(by='FechaSolicitud', ascending=False)
-                st.dataframe(df_display_consumo, use_container_width=True)
-                # Mostramos un resumen del consumo mensual
-                st.subheader("Resumen de Consumo Mensual (Base del Cálculo)")
-                try:
-                    df_consumo_usado['FechaSolicitud'] = pd.to_datetime(df_consumo_usado['FechaSolicitud'])
-                    consumo_mensual = df_consumo_usado.set_index('FechaSolicitud')['CantidadSolicitada'].resample('MS').sum().reset_index()
-                    consumo_mensual.columns = ["Mes", "Total Solicitado"]
-                    st.dataframe(consumo_mensual.sort_values(by="Mes", ascending=False), use_container_width=True)
-                except Exception as e:
-                    st.error(f"No se pudo generar el resumen mensual: {e}")
+    # Se guarda en la sesión: los controles del fragmento no re-ejecutan la simulación
+    st.session_state.sim_resultado = {
+        'data_version': st.session_state.data_version,
+        'df_sim': df_sim,
+        'metrics': metrics,
+        'llegadas_map': llegadas_map,
+        'df_llegadas_detalle': df_llegadas_detalle,
+        'params': {
+            'sku': sku_seleccionado,
+            'bodega_consumo_sel': list(bodega_consumo_sel),
+            'lead_time_days': lead_time_days,
+            'service_level_z': service_level_z,
+            'dias_a_simular': dias_a_simular,
+            'granularity': granularity,
+        },
+    }
 
+resultado = st.session_state.get('sim_resultado')
+if resultado is not None and resultado['data_version'] == st.session_state.data_version:
+    mostrar_resultados_simulacion(resultado)
 else:
     # Mensaje de bienvenida inicial
-    st.info("Ajuste los parámetros en la barra lateral y presione 'Ejecutar Simulación'")
\ No newline at end of file
+    st.info("Ajuste los parámetros en la barra lateral y presione 'Ejecutar Simulación'")
+
+# --- Estado del Cache de Simulaciones ---
+cache_stats = simulator.SIMULATION_CACHE.stats()
+st.sidebar.caption(
+    f"Cache de simulaciones: {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos "
+    f"({cache_stats['entries']} resultados, {cache_stats['bytes'] / 1024**2:,.1f} MB)"
+)
\ No newline at end of file
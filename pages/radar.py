@@ -13,7 +13,10 @@ if src_path not in sys.path:
 
 import config
 import radar_engine 
+import optimizer
 import ui_helpers 
+import perf
+import data_loader
 
 # --- 1. Configuración de Página ---
 st.set_page_config(layout="wide", page_title="Radar de Inventario")
@@ -21,9 +24,7 @@ st.title("Radar de Inventario 📡")
 st.markdown("Visión general del estado del inventario para priorizar acciones.")
 
 # --- 2. Verificar Carga de Datos ---
-if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
-    st.error("Los datos no se han cargado. Por favor, vuelva al Menú Principal e inténtelo de nuevo.")
-    st.stop()
+data_loader.require_datasets('stock', 'oc', 'consumo')
 
 # --- 3. Acceder a los Datos desde st.session_state ---
 df_stock = st.session_state.df_stock
@@ -64,36 +65,121 @@ with col2:
     bodega_stock_sel = st.selectbox(
         "Bodega de Stock:",
         lista_bodegas_stock,
-        index=lista_bodegas_stock.index('BF0001') if 'BF0001' in lista_bodegas_stock else 0
+        index=lista_bodegas_stock.index(config.RADAR_DEFAULT_BODEGA_STOCK) if config.RADAR_DEFAULT_BODEGA_STOCK in lista_bodegas_stock else 0
     )
 with col3:
     bodega_consumo_sel = st.selectbox(
         "Bodega de Consumo:",
         lista_bodegas_consumo,
-        index=lista_bodegas_consumo.index('Bodega de Proyectos RE') if 'Bodega de Proyectos RE' in lista_bodegas_consumo else 0
+        index=lista_bodegas_consumo.index(config.RADAR_DEFAULT_BODEGA_CONSUMO) if config.RADAR_DEFAULT_BODEGA_CONSUMO in lista_bodegas_consumo else 0
     )
 with col4:
     service_level_str = st.select_slider(
         "Nivel de Servicio (para SS):",
         options=list(config.Z_SCORE_MAP.keys()),
-        value="99%"
+        value=config.RADAR_DEFAULT_SERVICE_LEVEL
     )
     service_level_z = config.Z_SCORE_MAP[service_level_str]
 with col5: 
-    lead_time_days = st.number_input("Lead Time (Días) (para ROP):", min_value=1, max_value=120, value=90)
+    lead_time_days = st.number_input("Lead Time (Días) (para ROP):", min_value=1, max_value=120, value=config.RADAR_DEFAULT_LEAD_TIME)
+
+
+# --- Fragmento de Resultados (secciones 6 y 7) ---
+# El filtro de alertas, la descarga y el optimizador se re-ejecutan solos dentro del
+# fragmento: cambiarlos no recalcula el radar ni redibuja los parámetros de arriba.
+@st.fragment
+def mostrar_resultados_radar(df_radar, familia_sel, bodega_stock_sel, bodega_consumo_sel, lead_time_days):
+    st.subheader("Resultados del Radar")
+    
+    col1_res, col2_res = st.columns([1, 1])
+    with col1_res:
+        # ESTE ES EL FILTRO DE VISUALIZACIÓN
+        filtro_alerta = st.selectbox(
+            "Filtrar por Alerta:",
+            ["Todas", "Solo Alertas de Stock 🔴", "Solo Alertas Proyectadas 🔴"]
+        )
+    
+    df_display = df_radar
+    
+    # Aplicar filtros de visualización
+    if filtro_alerta == "Solo Alertas de Stock 🔴":
+        df_display = df_display[df_display["Alerta Stock (vs SS)"] == "🔴"]
+    elif filtro_alerta == "Solo Alertas Proyectadas 🔴":
+        df_display = df_display[df_display["Alerta Proy. (vs ROP)"] == "🔴"]
+
+    df_display = df_display.sort_values(by="DOS (Días)") # Ordenar por el más crítico
+
+    # Formatear el DataFrame para visualización
+    st.dataframe(
+        df_display,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            "Stock Actual": st.column_config.NumberColumn(format="%.0f"),
+            "DOS (Días)": st.column_config.NumberColumn(format="%.1f"),
+            "Stock Proy. (en LT)": st.column_config.NumberColumn(format="%.0f"),
+            "ROP": st.column_config.NumberColumn(format="%.0f"),
+            "Pedido Sugerido": st.column_config.NumberColumn(format="%.0f"),
+            "Demanda Prom. Diaria": st.column_config.NumberColumn(format="%.2f"),
+        }
+    )
+
+    # --- 7. Optimizador de Políticas de Reposición ---
+    with st.expander("⚙️ Optimizar política de reposición por SKU ((s, S) / (R, Q))"):
+        st.caption(
+            "Evalúa una grilla de políticas por SKU con demanda bootstrap (ST_OWTR) y elige la que minimiza "
+            "días de quiebre esperados + costo de mantener inventario (según 'CostoUnitario')."
+        )
+        horizonte_opt = st.number_input("Horizonte de evaluación (Días):", min_value=30, max_value=365, value=180)
+        if st.button("Optimizar políticas de la familia"):
+            with st.spinner(f"Evaluando políticas para {len(df_radar)} SKUs..."):
+                df_politicas = optimizer.optimize_family_policies(
+                    df_radar['SKU'].tolist(),
+                    df_stock,
+                    df_consumo,
+                    df_oc,
+                    [bodega_stock_sel],
+                    [bodega_consumo_sel],
+                    lead_time_days,
+                    horizon_days=horizonte_opt
+                )
+            st.dataframe(
+                df_politicas,
+                width='stretch',
+                hide_index=True,
+                column_config={
+                    "s / R": st.column_config.NumberColumn(format="%.0f"),
+                    "S / Q": st.column_config.NumberColumn(format="%.0f"),
+                    "Días Quiebre Esperados": st.column_config.NumberColumn(format="%.1f"),
+                    "Stock Prom. (Uds.)": st.column_config.NumberColumn(format="%.0f"),
+                    "Valor Inventario Prom.": st.column_config.NumberColumn(format="$%.0f"),
+                    "Pedidos Esperados": st.column_config.NumberColumn(format="%.1f"),
+                    "Costo Total": st.column_config.NumberColumn(format="$%.0f"),
+                    "Días Quiebre (sin pedir)": st.column_config.NumberColumn(format="%.1f"),
+                }
+            )
+
+    # El botón de descarga va dentro del fragmento para reflejar el filtro actual
+    # (el archivo se genera recién al hacer clic)
+    ui_helpers.download_export(
+        df_display,
+        file_stem=f"radar_inventario_{familia_sel.replace(' ', '_')}_{bodega_stock_sel}",
+        key="radar",
+        label="📥 Descargar Reporte",
+        sheet_name="Radar",
+        number_formats={"DOS (Días)": '#,##0.0', "Demanda Prom. Diaria": '#,##0.00', "Stock Actual": '#,##0',
+                        "Stock Proy. (en LT)": '#,##0', "ROP": '#,##0', "Pedido Sugerido": '#,##0'},
+        width='stretch'
+    )
 
 
 # --- 5. LÓGICA DE EJECUCIÓN (CON BLOQUEO INICIAL) ---
 # Solo se ejecuta si el usuario ha seleccionado una familia válida (incluyendo "Todas")
 if familia_sel != "(Seleccione una Familia)":
 
-    # --- Pre-filtrado de DataFrames por Familia ---
-    df_stock_radar = df_stock
-    df_consumo_radar = df_consumo
-    df_oc_radar = df_oc
-
-    with st.spinner("Calculando KPIs para todos los SKUs..."):
-        df_radar = radar_engine.run_full_radar_analysis(
+    barra_progreso = st.empty() # Solo se dibuja si hay que calcular (no en un acierto del cache)
+    with st.spinner("Calculando KPIs para todos los SKUs..."), perf.span('page.radar.run', familia=familia_sel):
+        df_radar, aviso = radar_engine.compute_radar(
         df_stock,          # <-- Pasa el DF completo desde session_state
         df_consumo,        # <-- Pasa el DF completo desde session_state
         df_oc,             # <-- Pasa el DF completo desde session_state
@@ -101,74 +187,27 @@ if familia_sel != "(Seleccione una Familia)":
         bodega_stock_sel,
         bodega_consumo_sel,
         lead_time_days,
-        service_level_z
+        service_level_z,
+        data_version=st.session_state.data_version,
+        _progress=lambda fraccion, texto: barra_progreso.progress(fraccion, text=texto)
     )
+    barra_progreso.empty()
 
     # --- Mensajes de resultado ---
-    if df_radar.empty:
+    if aviso is not None:
+        nivel, mensaje = aviso
+        (st.error if nivel == 'error' else st.warning)(mensaje)
+    elif df_radar.empty:
         st.warning(f"No se encontraron datos para los parámetros seleccionados (Familia: {familia_sel}).")
-        
-        # Limpia resultados anteriores si esta corrida no produce nada
-        if 'df_radar_results' in st.session_state:
-            del st.session_state.df_radar_results
             
     else:
         st.success(f"Reporte generado. Se analizaron {len(df_radar)} SKUs para la familia '{familia_sel}'.")
-        
         # --- 6. Mostrar Resultados ---
-        st.subheader("Resultados del Radar")
-        
-        col1_res, col2_res = st.columns([1, 1])
-        with col1_res:
-            # ESTE ES EL FILTRO DE VISUALIZACIÓN
-            filtro_alerta = st.selectbox(
-                "Filtrar por Alerta:",
-                ["Todas", "Solo Alertas de Stock 🔴", "Solo Alertas Proyectadas 🔴"]
-            )
-        
-        df_display = df_radar.copy()
-        
-        # Aplicar filtros de visualización
-        if filtro_alerta == "Solo Alertas de Stock 🔴":
-            df_display = df_display[df_display["Alerta Stock (vs SS)"] == "🔴"]
-        elif filtro_alerta == "Solo Alertas Proyectadas 🔴":
-            df_display = df_display[df_display["Alerta Proy. (vs ROP)"] == "🔴"]
-
-        # Formatear el DataFrame para visualización
-        st.dataframe(
-            df_display.sort_values(by="DOS (Días)"), # Ordenar por el más crítico
-            width='stretch',
-            hide_index=True,
-            column_config={
-                "Stock Actual": st.column_config.NumberColumn(format="%.0f"),
-                "DOS (Días)": st.column_config.NumberColumn(format="%.1f"),
-                "Stock Proy. (en LT)": st.column_config.NumberColumn(format="%.0f"),
-                "ROP": st.column_config.NumberColumn(format="%.0f"),
-                "Pedido Sugerido": st.column_config.NumberColumn(format="%.0f"),
-                "Demanda Prom. Diaria": st.column_config.NumberColumn(format="%.2f"),
-            }
-        )
-        
-        # Guardar en sesión para descargar
-        st.session_state.df_radar_results = df_display.to_csv(index=False).encode('utf-8')
-
-    # El botón de descarga solo aparece si hay resultados
-    if 'df_radar_results' in st.session_state:
-        st.download_button(
-            label="📥 Descargar Reporte (.csv)",
-            data=st.session_state.df_radar_results,
-            file_name=f"radar_inventario_{familia_sel.replace(' ', '_')}_{bodega_stock_sel}.csv",
-            mime="text/csv",
-            width='stretch'
-        )
+        mostrar_resultados_radar(df_radar, familia_sel, bodega_stock_sel, bodega_consumo_sel, lead_time_days)
 
 # --- FIN DEL BLOQUE 'if' ---
 
 else:
     # --- MENSAJE INICIAL ---
     # Esto es lo que se muestra cuando familia_sel == "(Seleccione una Familia)"
-    st.info("Por favor, seleccione una familia y ajuste los parámetros para comenzar el análisis.")
-    
-    # Limpia el botón de descarga si volvemos al estado inicial
-    if 'df_radar_results' in st.session_state:
-        del st.session_state.df_radar_results
\ No newline at end of file
+    st.info("Por favor, seleccione una familia y ajuste los parámetros para comenzar el análisis.")
\ No newline at end of file
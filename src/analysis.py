@@ -1,7 +1,57 @@
 # --- ARCHIVO: src/analysis.py ---
 # (NUEVO ARCHIVO para la lógica de negocio separada)
+import numpy as np
 import pandas as pd
 
+def calculate_order_recommendations_batch(projection, dates, lead_time_days, thresholds):
+    """
+    Versión en lote de la recomendación de pedido para muchos SKUs a la vez.
+
+    Parámetros:
+    - projection: matriz (n_skus, n_fechas) con el stock proyectado de cada SKU.
+    - dates: pd.DatetimeIndex ordenado (n_fechas,), común a todas las filas.
+      La primera fecha es 'hoy'.
+    - lead_time_days: escalar o vector (n_skus,) con el Lead Time de cada SKU.
+    - thresholds: vector (n_skus,) con el nivel a comparar (SS o ROP).
+
+    Lógica (equivalente a .asof, pero con aritmética de índices):
+    1. forecast_date = hoy + lead_time_days.
+    2. Con searchsorted se toma la última fecha <= forecast_date de cada fila.
+    3. Si el stock proyectado < threshold, se sugiere pedir (threshold - stock).
+
+    Retorna un DataFrame (una fila por SKU) con 'projected_stock_at_lt',
+    'forecast_date', 'is_below', 'suggested_order_qty' y 'covers_horizon'
+    (False si la proyección es más corta que el Lead Time; en ese caso el
+    stock proyectado es NaN y no se sugiere pedido).
+    """
+    projection = np.atleast_2d(np.asarray(projection, dtype=float))
+    n_skus = projection.shape[0]
+    dates = pd.DatetimeIndex(dates)
+
+    lead_times = np.broadcast_to(np.asarray(lead_time_days, dtype='int64'), (n_skus,))
+    thresholds = np.broadcast_to(np.asarray(thresholds, dtype=float), (n_skus,))
+
+    forecast_dates = dates[0] + pd.to_timedelta(lead_times, unit='D')
+    covers_horizon = np.asarray(forecast_dates <= dates[-1])
+
+    # Posición de la última fecha <= forecast_date (semántica de .asof)
+    positions = dates.searchsorted(forecast_dates, side='right') - 1
+    positions = np.clip(positions, 0, projection.shape[1] - 1)
+
+    projected = projection[np.arange(n_skus), positions]
+    projected = np.where(covers_horizon, projected, np.nan)
+
+    is_below = covers_horizon & (projected < thresholds)
+    suggested = np.where(is_below, np.maximum(thresholds - projected, 0.0), 0.0)
+
+    return pd.DataFrame({
+        "projected_stock_at_lt": projected,
+        "forecast_date": forecast_dates,
+        "is_below": is_below,
+        "suggested_order_qty": suggested,
+        "covers_horizon": covers_horizon,
+    })
+
 def calculate_order_recommendation(metrics, llegadas_map, df_sim, lead_time_days):
     """
     Calcula la lógica de recomendación de pedido (cuánto pedir) basado
@@ -18,37 +68,28 @@ def calculate_order_recommendation(metrics, llegadas_map, df_sim, lead_time_days
     # --- 1. Obtener Métricas Clave ---
     ss = metrics['safety_stock']
     
-    # --- 2. Calcular Proyección Futura ---
+    # --- 2. Calcular Proyección Futura (ruta en lote, con 1 SKU) ---
     
-    # Aseguramos que el índice sea Datetime
-    if not isinstance(df_sim.index, pd.DatetimeIndex):
-         df_sim.index = pd.to_datetime(df_sim.index)
-         
-    today = df_sim.index.min()
-    forecast_date = today + pd.DateOffset(days=lead_time_days)
+    # Se usa una copia ordenada del índice como Datetime (no se modifica df_sim)
+    df_sorted = df_sim.sort_index()
+    reco = calculate_order_recommendations_batch(
+        df_sorted['NivelInventario'].to_numpy()[None, :],
+        pd.to_datetime(df_sorted.index),
+        lead_time_days,
+        ss
+    ).iloc[0]
+    forecast_date = reco['forecast_date']
     
     # --- 3. Validar si la simulación cubre la fecha de pronóstico ---
-    if forecast_date > df_sim.index.max():
+    if not reco['covers_horizon']:
         msg = f"La simulación ({len(df_sim)} días) es más corta que el Lead Time ({lead_time_days} días). No se puede proyectar la recomendación."
         return { "status": "error", "error_message": msg }
 
     # --- 4. Obtener Stock Proyectado y Generar Recomendación ---
-    
-    # Usamos .asof para encontrar el valor más cercano si la fecha exacta no existe
-    projected_stock = df_sim.asof(forecast_date)['NivelInventario']
-    
-    is_below_rop = projected_stock < ss
-    suggested_order_qty = 0.0
-    status = "info"
-
-    if is_below_rop:
-        suggested_order_qty = ss - projected_stock
-        suggested_order_qty = max(0.0, suggested_order_qty) 
-        
-        if suggested_order_qty > 0:
-            status = "success"
-    else:
-        status = "info"
+    projected_stock = reco['projected_stock_at_lt']
+    is_below_rop = bool(reco['is_below'])
+    suggested_order_qty = float(reco['suggested_order_qty'])
+    status = "success" if suggested_order_qty > 0 else "info"
         
     # --- 5. Retornar los resultados ---
     return {
@@ -0,0 +1,97 @@
+# --- ARCHIVO: src/arrivals_index.py ---
+# (NUEVO ARCHIVO: tabla de llegadas (OC) pre-normalizada e indexada para ProximasLlegadas)
+
+import numpy as np
+import pandas as pd
+
+ARRIVAL_COLUMNS = [
+    'Número de documento',
+    'Número de artículo',
+    'Nombre Artículo',
+    'Cantidad',
+    'Fecha de entrega de la línea',
+    'Comentarios'
+]
+
+
+class ArrivalsTable:
+    """
+    Líneas de OC con llegada pendiente, normalizadas UNA vez por versión de datos:
+
+    - Fechas y cantidades ya convertidas, y filtro base aplicado
+      (Cantidad > 0 y entrega >= 'start_date').
+    - 'Número de documento', 'Comentarios' y 'Nombre Artículo' como texto, con
+      columnas en minúsculas precalculadas para las búsquedas parciales.
+    - Índice de filas por SKU y N° de OC de cada fila como código entero sobre
+      la lista de documentos únicos (en minúsculas).
+
+    'query' resuelve los cuatro filtros de la página en una sola pasada: primero
+    los índices (SKU, OC) acotan las filas y luego los textos se verifican solo
+    sobre ese subconjunto.
+    """
+
+    def __init__(self, df_oc: pd.DataFrame, mapa_nombres: dict, start_date: pd.Timestamp):
+        df = df_oc.copy()
+        df['Fecha de entrega de la línea'] = pd.to_datetime(df['Fecha de entrega de la línea'], format='%Y-m-%d', errors='coerce')
+        df['Cantidad'] = pd.to_numeric(df['Cantidad'], errors='coerce')
+        if 'Comentarios' not in df.columns:
+            df['Comentarios'] = 'N/A'
+
+        df = df[(df['Cantidad'] > 0) & (df['Fecha de entrega de la línea'] >= start_date)]
+        df = df.sort_values(by='Fecha de entrega de la línea', kind='stable').reset_index(drop=True)
+
+        df['Número de documento'] = df['Número de documento'].astype(str).fillna('')
+        df['Comentarios'] = df['Comentarios'].astype(str)
+        df['Nombre Artículo'] = df['Número de artículo'].map(mapa_nombres).fillna('Nombre no encontrado').astype(str)
+        self.df = df[ARRIVAL_COLUMNS]
+
+        # Columnas de búsqueda en minúsculas (se calculan una sola vez)
+        self._search = {
+            'comentarios': df['Comentarios'].str.lower().fillna('').to_numpy(dtype=object),
+            'nombre': df['Nombre Artículo'].str.lower().fillna('').to_numpy(dtype=object),
+        }
+
+        # Índice por SKU: SKU -> posiciones de fila
+        self._sku_rows = {sku: np.asarray(rows) for sku, rows in df.groupby('Número de artículo').indices.items()}
+
+        # N° de OC: documentos únicos (texto de NumPy, para buscar en todos a la vez) y código de cada fila
+        doc_codes, docs = pd.factorize(df['Número de documento'].str.lower())
+        self._docs = np.asarray(docs, dtype=str)
+        self._doc_codes = doc_codes
+
+    def __len__(self):
+        return len(self.df)
+
+    def _rows_for_document(self, text: str) -> np.ndarray:
+        """
+        Filas (ordenadas) cuyo N° de OC contiene 'text' en cualquier parte. Se
+        busca una vez por documento único, en una sola operación vectorizada.
+        """
+        if len(self._docs) == 0:
+            return np.array([], dtype=np.int64)
+        matches = np.char.find(self._docs, text.lower()) >= 0
+        return np.flatnonzero(matches[self._doc_codes])
+
+    def query(self, sku: str | None = None, oc: str = "", comentario: str = "", nombre: str = "") -> pd.DataFrame:
+        """Aplica los filtros combinados (todos opcionales) y retorna las filas ordenadas por fecha de llegada."""
+        rows = None
+
+        if sku:
+            rows = self._sku_rows.get(sku, np.array([], dtype=np.int64))
+        if oc:
+            doc_rows = self._rows_for_document(oc)
+            rows = doc_rows if rows is None else np.intersect1d(rows, doc_rows)
+        if rows is None:
+            rows = np.arange(len(self.df))
+        else:
+            rows = np.sort(rows)
+
+        # Filtros de texto (búsqueda parcial, sin distinguir mayúsculas) sobre las filas restantes
+        for column, text in (('comentarios', comentario), ('nombre', nombre)):
+            if not text or len(rows) == 0:
+                continue
+            needle = text.lower()
+            values = self._search[column][rows]
+            rows = rows[np.fromiter((needle in v for v in values), dtype=bool, count=len(values))]
+
+        return self.df.iloc[rows]
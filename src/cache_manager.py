@@ -0,0 +1,177 @@
+# --- ARCHIVO: src/cache_manager.py ---
+# (NUEVO ARCHIVO: caches del proceso por espacio de nombres, acotados e invalidados por versión de datos)
+
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+import config
+import perf
+from memo_cache import SizedLRUCache
+from disk_cache import DiskCache
+
+_namespaces = {}
+_namespaces_lock = threading.Lock()
+_inflight = {} # (espacio, clave) -> Lock: una sola sesión calcula cada entrada faltante
+_inflight_lock = threading.Lock()
+_current_version = None
+_disk = None
+_disk_checked = False
+
+
+def get_disk_cache() -> DiskCache | None:
+    """
+    Cache en disco compartido por las réplicas del host (L2), o None si está
+    desactivado o no se pudo abrir. Ver config.DISK_CACHE_*.
+    """
+    global _disk, _disk_checked
+    if _disk_checked:
+        return _disk
+    with _namespaces_lock:
+        if not _disk_checked:
+            env = os.environ.get('FLUX_DISK_CACHE', '').strip()
+            enabled = env.lower() not in ('0', 'false') if env else config.DISK_CACHE_ENABLED
+            path = env if env and env.lower() not in ('1', 'true') else config.DISK_CACHE_PATH
+            if enabled:
+                try:
+                    _disk = DiskCache(path, config.DISK_CACHE_MAX_MB * 1024 * 1024, lease_seconds=config.DISK_CACHE_LEASE_SECONDS)
+                    perf.register_cache('disco (L2)', _disk.stats)
+                except (sqlite3.Error, OSError) as e:
+                    print(f"Cache en disco desactivado: no se pudo abrir '{path}' ({e}).")
+            _disk_checked = True
+    return _disk
+
+
+def get_namespace(name: str) -> SizedLRUCache:
+    """
+    Cache de un espacio de nombres (ver config.CACHE_NAMESPACES). Se crea al
+    primer uso y queda registrado para la página de Rendimiento.
+    """
+    cache = _namespaces.get(name)
+    if cache is not None:
+        return cache
+    with _namespaces_lock:
+        if name not in _namespaces:
+            limits = config.CACHE_NAMESPACES[name]
+            _namespaces[name] = SizedLRUCache(
+                max_bytes=limits['max_mb'] * 1024 * 1024,
+                max_entries=limits.get('max_entries'),
+                ttl_seconds=limits.get('ttl_seconds')
+            )
+            perf.register_cache(name, _namespaces[name].stats)
+        return _namespaces[name]
+
+
+def get_or_compute(namespace: str, key, compute, data_version=None):
+    """
+    Retorna el valor cacheado de 'key' o lo calcula con 'compute()'.
+
+    Si varias sesiones piden la misma clave a la vez, solo una la calcula y
+    las demás esperan su resultado. 'data_version' marca la entrada para que
+    'set_data_version' la descarte cuando cambien los datos.
+
+    En los espacios de config.DISK_CACHE_NAMESPACES, una falla en memoria
+    consulta primero el cache en disco del host (y espera a otra réplica si
+    ya lo está calculando); lo calculado aquí queda disponible para todas.
+    """
+    cache = get_namespace(namespace)
+    found, value = cache.get(key)
+    if found:
+        return value
+
+    with _inflight_lock:
+        lock = _inflight.setdefault((namespace, key), threading.Lock())
+    try:
+        with lock:
+            found, value = cache.get(key, record=False) # Otra sesión pudo calcularlo mientras esperábamos
+            if not found:
+                disk = get_disk_cache() if namespace in config.DISK_CACHE_NAMESPACES else None
+                if disk is not None:
+                    value = disk.get_or_compute(namespace, key, compute, version=data_version, ttl_seconds=cache.ttl_seconds)
+                else:
+                    value = compute()
+                cache.put(key, value, version=data_version)
+    finally:
+        with _inflight_lock:
+            _inflight.pop((namespace, key), None)
+    return value
+
+
+def set_data_version(version: str) -> int:
+    """
+    Registra la versión de datos vigente. Si cambió, descarta en todos los
+    espacios las entradas calculadas con otra versión. Retorna cuántas se descartaron.
+    """
+    global _current_version
+    if version == _current_version:
+        return 0
+    _current_version = version
+    with _namespaces_lock:
+        caches = list(_namespaces.values())
+    removed = sum(cache.invalidate_versions(version) for cache in caches)
+    disk = get_disk_cache()
+    if disk is not None:
+        removed += disk.invalidate_versions(version)
+    return removed
+
+
+def content_key(obj):
+    """Clave según el CONTENIDO de DataFrames/Series (forma, columnas y hash de filas); otros valores se normalizan a hashables."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        columns = tuple(map(str, obj.columns)) if isinstance(obj, pd.DataFrame) else (str(obj.name),)
+        hashed = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+        return ('frame', obj.shape, columns, hashed.tobytes())
+    if isinstance(obj, (list, tuple)):
+        return tuple(content_key(v) for v in obj)
+    if isinstance(obj, (set, frozenset)):
+        return frozenset(content_key(v) for v in obj)
+    if isinstance(obj, dict):
+        return tuple(sorted((k, content_key(v)) for k, v in obj.items()))
+    return obj
+
+
+def cached(namespace: str):
+    """
+    Decorador para funciones cacheadas en un espacio de nombres, con la misma
+    convención que 'st.cache_data': los parámetros que empiezan con '_' NO
+    forman parte de la clave (DataFrames grandes que se identifican por
+    'data_version'); el resto se incluye por contenido.
+
+    Si la función tiene un parámetro 'data_version', la entrada queda marcada
+    con esa versión; si se llama con data_version=None NO se cachea (la clave
+    no identificaría los datos). 'func.uncached' es la función original.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        versioned = 'data_version' in signature.parameters
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            data_version = bound.arguments.get('data_version')
+            if versioned and data_version is None:
+                return func(*args, **kwargs)
+            key = (func.__module__, func.__qualname__) + tuple(
+                (name, content_key(value)) for name, value in bound.arguments.items() if not name.startswith('_')
+            )
+            return get_or_compute(namespace, key, lambda: func(*args, **kwargs), data_version=data_version)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def clear(namespace: str | None = None):
+    """Vacía un espacio de nombres (o todos), también en el cache en disco compartido."""
+    with _namespaces_lock:
+        caches = [cache for name, cache in _namespaces.items() if namespace in (None, name)]
+    for cache in caches:
+        cache.clear()
+    disk = get_disk_cache()
+    if disk is not None:
+        disk.clear(namespace)
@@ -16,6 +16,100 @@ Z_SCORE_MAP = {
     "99%": 2.33
 }
 
+# --- Modelos de Demanda del Simulador ---
+# 'normal': media/std mensual (comportamiento original).
+# 'bootstrap': re-muestreo por bloques del consumo diario real de ST_OWTR.
+DEMAND_MODELS = {
+    "Normal (media mensual)": "normal",
+    "Bootstrap empírico (ST_OWTR)": "bootstrap"
+}
+BOOTSTRAP_N_PATHS = 500   # Trayectorias simuladas por corrida
+BOOTSTRAP_BLOCK_DAYS = 7  # Largo de cada bloque re-muestreado (días consecutivos)
+
+# --- Granularidad de Salida del Simulador ---
+SIMULATION_GRANULARITIES = {
+    "Diaria": "D",
+    "Semanal": "W",
+    "Mensual": "M"
+}
+
+# --- Optimizador de Políticas de Reposición ---
+HOLDING_COST_RATE_ANNUAL = 0.20   # Costo anual de mantener inventario (% del valor)
+STOCKOUT_DAY_COST_FACTOR = 1.0    # Costo de 1 día de quiebre = N días de demanda valorizada
+OPTIMIZER_N_PATHS = 100           # Trayectorias bootstrap por SKU al optimizar
+OPTIMIZER_REORDER_LEVELS = 6      # Puntos de reorden (s / R) evaluados por SKU
+OPTIMIZER_COVER_MONTHS = (0.5, 1, 2, 3) # Tamaños de pedido evaluados (meses de demanda)
+
+# --- Cache de Simulaciones (compartido por el proceso) ---
+SIMULATION_CACHE_MAX_MB = 256
+SIMULATION_CACHE_MAX_ENTRIES = 2000
+
+# --- Caches del Proceso (src/cache_manager.py) ---
+# Por espacio de nombres: memoria máxima (MB), entradas máximas y antigüedad máxima (segundos, None = sin TTL).
+CACHE_NAMESPACES = {
+    "datos":         {"max_mb": 2048, "max_entries": 4,    "ttl_seconds": None},  # Excel leídos y limpiados (uno por archivo, versión vigente)
+    "derivados":     {"max_mb": 1024, "max_entries": 32,   "ttl_seconds": None},  # Índices, cubos y agregados por versión de datos
+    "radar":         {"max_mb": 256,  "max_entries": 64,   "ttl_seconds": 3600},
+    "simulaciones":  {"max_mb": SIMULATION_CACHE_MAX_MB, "max_entries": SIMULATION_CACHE_MAX_ENTRIES, "ttl_seconds": None},
+}
+
+# --- Cache en Disco Compartido entre Réplicas (src/disk_cache.py) ---
+# Segundo nivel para los espacios de DISK_CACHE_NAMESPACES: todos los procesos de
+# Streamlit del mismo host leen el mismo archivo SQLite. Se desactiva con FLUX_DISK_CACHE=0
+# (o FLUX_DISK_CACHE=<ruta> para usar otro archivo).
+DISK_CACHE_ENABLED = True
+DISK_CACHE_PATH = "cache/flux_cache.sqlite"
+DISK_CACHE_MAX_MB = 4096
+DISK_CACHE_NAMESPACES = ("datos", "radar")
+DISK_CACHE_LEASE_SECONDS = 600 # Máximo que una réplica espera a otra que está calculando la misma entrada
+
+# --- Carga de Datos (src/data_loader.py) ---
+DATA_LOAD_WORKERS = 4 # Archivos Excel leídos en paralelo (cada página espera solo por los que usa)
+
+# --- Representación Compacta de los Datos (src/frame_compaction.py) ---
+# Después de limpiar cada archivo: textos repetidos -> categóricos, enteros -> 32 bits,
+# floats -> float32 si la precisión alcanza. Reporte en la página de Rendimiento.
+COMPACT_FRAMES = True
+COMPACT_CATEGORY_MAX_RATIO = 0.5 # Categórico si (valores distintos / filas) <= este valor
+COMPACT_FLOAT_RTOL = 1e-6        # Error relativo máximo aceptado al pasar a float32
+COMPACT_KEEP_FLOAT64 = (         # Montos: se suman sobre miles de filas, se dejan tal cual
+    'CostoUnitario', 'ValorTotalInventario', 'Precio_Unitario', 'Total_Linea', 'Total_Pendiente',
+)
+
+# --- Parámetros por Defecto del Radar (página y precalentamiento) ---
+RADAR_DEFAULT_BODEGA_STOCK = 'BF0001'
+RADAR_DEFAULT_BODEGA_CONSUMO = 'Bodega de Proyectos RE'
+RADAR_DEFAULT_SERVICE_LEVEL = '99%'
+RADAR_DEFAULT_LEAD_TIME = 90
+
+# --- Precalentamiento de Caches (src/warmup.py) ---
+# Después de cada carga de datos se calculan en segundo plano los resultados más
+# usados (radar por familia con parámetros por defecto, cubo de KPIs, agregados
+# residenciales y opciones de selectores). Se desactiva con FLUX_WARMUP=0.
+WARMUP_ENABLED = True
+WARMUP_WORKERS = 2
+WARMUP_RADAR_MAX_FAMILIES = 8 # Familias con más SKUs (cada una ocupa una entrada del espacio 'radar')
+
+# --- Descargas (src/exports.py) ---
+# Los archivos se generan al hacer clic (no en cada ejecución) y por tramos de filas;
+# no se guardan en la sesión ni en caches.
+EXPORT_CHUNK_ROWS = 50_000  # Filas convertidas por tramo
+
+# --- Tablas Paginadas ---
+TABLE_PAGE_SIZES = (25, 50, 100, 250) # Opciones de filas por página
+TABLE_DEFAULT_PAGE_SIZE = 50
+
+# --- Presupuesto de Puntos por Gráfico (downsampling) ---
+CHART_MAX_POINTS = 800     # Líneas (proyección de inventario): LTTB sobre los puntos de cambio
+SCATTER_MAX_POINTS = 2000  # Dispersión: sobre este número se agrupa en una grilla (~raíz de N celdas por eje)
+
+# --- Instrumentación de Rendimiento (src/perf.py, página Rendimiento) ---
+# Desactivada por defecto. También se activa con la variable de entorno FLUX_PERF=1
+# (o FLUX_PERF=mem para medir además memoria con tracemalloc, más costoso).
+PERF_ENABLED = False
+PERF_TRACK_MEMORY = False
+PERF_MAX_SPANS = 2000 # Spans recientes que se conservan (por proceso)
+
 # --- Mapeo de SKUs (Homogenización) ---
 MAPEO_SKUS = {
     # Grupo 1 (SKUs -> EXI-009231) Inversores 1P5kw Hibrido
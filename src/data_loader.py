@@ -1,86 +1,309 @@
 # --- ARCHIVO: src/data_loader.py ---
 # (Modificado para usar rutas de 'data/' y 'st.session_state')
 
+import hashlib
+import os
 import pandas as pd
 import streamlit as st
 import config # Importamos nuestro archivo de configuración local
+import perf
+import cache_manager
+from data_store import DataStore
+import warmup
+import frame_compaction
 
-# --- 1. Función de Carga Real (Cacheada) ---
-@st.cache_data
-def _load_all_data():
+# Conjuntos de datos: nombre -> (archivo en 'data/', clave en st.session_state, etiqueta)
+# El orden es el de la tupla (df_stock, df_oc, df_consumo, df_residencial).
+DATASETS = {
+    'stock':       ('Stock.xlsx',                 'df_stock',       'Stock'),
+    'oc':          ('OPOR.xlsx',                  'df_oc',          'OPOR (OCs)'),
+    'consumo':     ('ST_OWTR.xlsx',               'df_consumo',     'Consumo (ST_OWTR)'),
+    'residencial': ('BD_Master_Residencial.xlsx', 'df_residencial', 'Residencial'),
+}
+DATA_FILES = tuple(archivo for archivo, _, _ in DATASETS.values())
+
+_MEMORY_REPORTS = {} # nombre -> reporte de frame_compaction.compact_frame de la última carga
+
+# --- 1. Funciones de Carga Real (por conjunto de datos) ---
+def _clean_oc(df_oc):
+    """Fechas válidas, últimos 5 meses y SKUs normalizados (config.MAPEO_SKUS)."""
+    df_oc['Fecha de contabilización'] = pd.to_datetime(df_oc['Fecha de contabilización'], format='%Y-m-%d', errors='coerce')
+    df_oc = df_oc.dropna(subset=['Fecha de contabilización'])
+
+    hoy = pd.Timestamp.now()
+    hace_5_meses = (hoy - pd.DateOffset(months=5)).replace(day=1) # hace 6 meses puse ahora
+    df_oc = df_oc[df_oc['Fecha de contabilización'] >= hace_5_meses].copy()
+    #df_oc = df_oc[~df_oc['Comentarios'].str.contains('PROA', na=False)].copy()
+
+    df_oc['Número de artículo'] = df_oc['Número de artículo'].replace(config.MAPEO_SKUS)
+    return df_oc
+
+def _clean_consumo(df_consumo):
+    """Fechas válidas, últimos 3 meses y SKUs normalizados (config.MAPEO_SKUS)."""
+    df_consumo['FechaSolicitud'] = pd.to_datetime(df_consumo['FechaSolicitud'], errors='coerce')
+    df_consumo = df_consumo.dropna(subset=['FechaSolicitud'])
+
+    hoy = pd.Timestamp.now()
+    hace_3_meses = (hoy - pd.DateOffset(months=3)).replace(day=1) # hace 6 meses puse ahora
+    df_consumo = df_consumo[df_consumo['FechaSolicitud'] >= hace_3_meses].copy()
+
+    df_consumo['CodigoArticulo'] = df_consumo['CodigoArticulo'].replace(config.MAPEO_SKUS)
+    return df_consumo
+
+_CLEANERS = {'oc': _clean_oc, 'consumo': _clean_consumo} # Stock y Residencial se usan tal como vienen
+
+def _read_dataset(name, data_dir='data'):
+    """
+    Lee y limpia UN conjunto de datos (ver DATASETS). Sin cache: ver '_load_dataset'.
+
+    Lanza:
+    - FileNotFoundError: Si no se encuentra el archivo Excel.
     """
-    Carga, limpia y pre-procesa todos los archivos de datos iniciales.
-    Usa la carpeta 'data/'.
-    
+    path = os.path.join(data_dir, DATASETS[name][0])
+    with perf.span(f'loader.read_excel.{name}'):
+        df = pd.read_excel(path)
+    if name in _CLEANERS:
+        with perf.span(f'loader.clean.{name}', rows=len(df)):
+            df = _CLEANERS[name](df)
+    print(f"Archivo '{DATASETS[name][0]}' cargado desde '{data_dir}/' ({len(df):,} filas).")
+    return df
+
+def _compact_dataset(name, df):
+    """Representación compacta (config.COMPACT_*). Retorna (DataFrame, reporte de memoria antes/después)."""
+    if not config.COMPACT_FRAMES:
+        mb = frame_compaction.frame_memory_mb(df)
+        return df, {'filas': len(df), 'columnas': df.shape[1], 'mb_antes': mb, 'mb_despues': mb,
+                    'categoricas': [], 'enteras': [], 'float32': []}
+    with perf.span(f'loader.compact.{name}', rows=len(df)):
+        df, report = frame_compaction.compact_frame(
+            df,
+            keep_float64=config.COMPACT_KEEP_FLOAT64,
+            category_max_ratio=config.COMPACT_CATEGORY_MAX_RATIO,
+            float_rtol=config.COMPACT_FLOAT_RTOL
+        )
+    print(f"'{DATASETS[name][0]}' compactado: {report['mb_antes']:,.1f} MB -> {report['mb_despues']:,.1f} MB.")
+    return df, report
+
+def _read_all_data(data_dir='data'):
+    """
+    Carga, limpia y pre-procesa todos los archivos de datos iniciales, uno tras
+    otro. Usa la carpeta 'data/' (o 'data_dir', p. ej. datos sintéticos para benchmarks).
+    Sin cache: la app carga cada conjunto por separado y en paralelo (ver '_DATA_STORE').
+
     Retorna:
     - tupla(pd.DataFrame): (df_stock, df_oc, df_consumo, df_residencial)
-    
+
     Lanza:
     - FileNotFoundError: Si no se encuentra un archivo Excel esencial.
     """
     print("--- (EJECUTANDO CACHE) Cargando y Limpiando Datos Globales ---")
-    
+
     try:
-        # RUTAS ACTUALIZADAS A LA CARPETA 'data/'
-        df_stock = pd.read_excel('data/Stock.xlsx')
-        df_residencial = pd.read_excel("data/BD_Master_Residencial.xlsx")
-        df_oc = pd.read_excel("data/OPOR.xlsx")
-        df_consumo = pd.read_excel('data/ST_OWTR.xlsx')
-        print("Archivos 'Stock', 'OPOR' y 'ST_OWTR' cargados desde 'data/'.")
-    
+        frames = tuple(_compact_dataset(name, _read_dataset(name, data_dir))[0] for name in DATASETS)
     except FileNotFoundError as e:
-        print(f"Error: No se pudo encontrar el archivo: {e.filename} en la carpeta 'data/'.")
+        print(f"Error: No se pudo encontrar el archivo: {e.filename} en la carpeta '{data_dir}/'.")
         raise e # Esto detendrá la carga
     except Exception as e:
         st.error(f"Error inesperado al leer archivos: {e}")
         return None, None, None, None
 
-    # --- Limpieza Global de Fechas ---
-    df_oc['Fecha de contabilización'] = pd.to_datetime(df_oc['Fecha de contabilización'], format='%Y-m-%d', errors='coerce')
-    df_consumo['FechaSolicitud'] = pd.to_datetime(df_consumo['FechaSolicitud'], errors='coerce')
-    
-    df_oc = df_oc.dropna(subset=['Fecha de contabilización'])
-    df_consumo = df_consumo.dropna(subset=['FechaSolicitud'])
+    print("Datos globales cargados y limpiados.")
 
-    # --- Filtro Global de 4 Meses ---
-    hoy = pd.Timestamp.now()
-    hace_5_meses = (hoy - pd.DateOffset(months=5)).replace(day=1) # hace 6 meses puse ahora
-    hace_3_meses = (hoy - pd.DateOffset(months=3)).replace(day=1) # hace 6 meses puse ahora
+    return frames
 
-    df_oc = df_oc[df_oc['Fecha de contabilización'] >= hace_5_meses].copy()
-    #df_oc = df_oc[~df_oc['Comentarios'].str.contains('PROA', na=False)].copy()    
-    df_consumo = df_consumo[df_consumo['FechaSolicitud'] >= hace_3_meses].copy()
+def _file_signature(path):
+    """(ruta, fecha de modificación, tamaño): cambia si el archivo se reemplaza, edita o aparece."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (path, None, None) # La lectura reportará el error
+    return (path, stat.st_mtime_ns, stat.st_size)
 
-    # --- Limpieza Global de SKUs (Usando config) ---
-    df_consumo['CodigoArticulo'] = df_consumo['CodigoArticulo'].replace(config.MAPEO_SKUS)
-    df_oc['Número de artículo'] = df_oc['Número de artículo'].replace(config.MAPEO_SKUS)
-    #df_stock['CodigoArticulo'] = df_stock['CodigoArticulo'].replace(config.MAPEO_SKUS)
-    
-    print("Datos globales cargados y limpiados.")
-    
-    return df_stock, df_oc, df_consumo, df_residencial
+def _cleaning_signature(name):
+    """
+    Lo que, además del archivo, determina el resultado de '_CLEANERS[name]':
+    el día (ventanas de 5 meses de OC y 3 de consumo) y config.MAPEO_SKUS.
+    Vacía para los conjuntos que se usan tal como vienen.
+    """
+    if name not in _CLEANERS:
+        return ()
+    mapeo = hashlib.sha1(repr(sorted(config.MAPEO_SKUS.items())).encode()).hexdigest()[:16]
+    return (pd.Timestamp.now().date().isoformat(), mapeo)
 
-# --- 2. Función de Acceso a Session State ---
-def load_data_into_session():
+def _data_signature(data_dir='data'):
+    """Firma de los archivos y de su limpieza: cambia con un Excel nuevo, al pasar de día o con otro MAPEO_SKUS."""
+    return tuple(
+        (_file_signature(os.path.join(data_dir, archivo)), _cleaning_signature(name))
+        for name, (archivo, _, _) in DATASETS.items()
+    )
+
+def _load_dataset(name, data_dir='data'):
+    """
+    '_read_dataset' + '_compact_dataset' cacheado en el espacio 'datos' de cache_manager.
+
+    La clave es la firma del archivo (fecha de modificación y tamaño), así que
+    reemplazar un Excel provoca una nueva lectura sin reiniciar la app (solo de
+    ese archivo). Para OPOR y Consumo incluye también el día y MAPEO_SKUS
+    ('_cleaning_signature'): el cache en disco sobrevive a los reinicios y no
+    debe dejar congeladas las ventanas de fechas ni un mapeo de SKUs antiguo. El espacio conserva una entrada por conjunto de datos: al
+    publicar una versión nueva la anterior deja de ocupar memoria aquí.
+    Con el cache en disco activo, cada Excel se lee una sola vez por host.
+    Los errores de lectura no se cachean. Los DataFrames retornados se
+    comparten entre sesiones: NO modificarlos.
+    """
+    key = (
+        '_load_dataset', name,
+        _file_signature(os.path.join(data_dir, DATASETS[name][0])),
+        _cleaning_signature(name),
+        config.COMPACT_FRAMES
+    )
+    df, report = cache_manager.get_or_compute('datos', key, lambda: _compact_dataset(name, _read_dataset(name, data_dir)))
+    _MEMORY_REPORTS[name] = report
+    return df
+
+def memory_report():
+    """Memoria de cada conjunto de datos antes y después de compactarlo (última carga del proceso)."""
+    rows = []
+    for name, report in _MEMORY_REPORTS.items():
+        rows.append({
+            'conjunto': DATASETS[name][2],
+            'filas': report['filas'],
+            'mb_antes': report['mb_antes'],
+            'mb_despues': report['mb_despues'],
+            'reduccion_pct': 100 * (1 - report['mb_despues'] / report['mb_antes']) if report['mb_antes'] else 0.0,
+            'categoricas': ', '.join(map(str, report['categoricas'])),
+            'enteras': ', '.join(map(str, report['enteras'])),
+            'float32': ', '.join(map(str, report['float32'])),
+        })
+    return pd.DataFrame(rows, columns=['conjunto', 'filas', 'mb_antes', 'mb_despues', 'reduccion_pct', 'categoricas', 'enteras', 'float32'])
+
+# --- 2. Huella (Versión) de los Datos ---
+def compute_data_fingerprint(*dfs):
+    """
+    Calcula una huella corta del contenido de los DataFrames cargados.
+    Se usa como parte de las claves de cache: si los archivos cambian,
+    la huella cambia y los resultados cacheados anteriores dejan de usarse.
+    """
+    hasher = hashlib.sha1()
+    for df in dfs:
+        if df is None:
+            hasher.update(b'None')
+            continue
+        hasher.update(str(df.shape).encode())
+        hasher.update(','.join(map(str, df.columns)).encode())
+        hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()[:16]
+
+# --- 3. Versión Vigente de los Datos (compartida por el proceso) ---
+def _on_publish(snapshot):
+    cache_manager.set_data_version(snapshot.version) # Resultados cacheados con datos anteriores ya no sirven
+    warmup.schedule(snapshot.frames, snapshot.version) # Radar, KPIs, Residencial y selectores en segundo plano
+
+_DATA_STORE = DataStore(
+    loaders={name: (lambda name=name: _load_dataset(name)) for name in DATASETS},
+    fingerprint=compute_data_fingerprint,
+    signature=_data_signature,
+    on_publish=_on_publish,
+    max_workers=config.DATA_LOAD_WORKERS
+)
+
+def get_data_store():
+    """DataStore del proceso: versión vigente, carga por conjunto de datos y recarga en segundo plano."""
+    return _DATA_STORE
+
+# --- 4. Función de Acceso a Session State ---
+def _assign_snapshot(snapshot):
+    (st.session_state.df_stock,
+     st.session_state.df_oc,
+     st.session_state.df_consumo,
+     st.session_state.df_residencial) = snapshot.frames
+    st.session_state.data_version = snapshot.version
+    st.session_state.data_loaded = True
+
+def sync_session_data():
+    """
+    Si hay una versión de datos completa más nueva que la de esta sesión, la
+    sesión pasa a usarla (solo cambia referencias). La ejecución en curso de
+    otra página no se ve afectada: sigue con los DataFrames que ya tomó.
+    Retorna True si cambió la versión.
+    """
+    snapshot = _DATA_STORE.current()
+    if snapshot is None:
+        return False
+    if st.session_state.get('data_loaded') and snapshot.version == st.session_state.get('data_version'):
+        return False
+    _assign_snapshot(snapshot)
+    print(f"Sesión actualizada a la versión de datos {snapshot.version}.")
+    return True
+
+def show_load_progress(names=None):
+    """Estado de carga de cada conjunto de datos (barra de progreso y tabla)."""
+    progress = _DATA_STORE.progress()
+    names = list(names or DATASETS)
+    listos = sum(progress[n]['state'] == 'listo' for n in names)
+    st.progress(listos / len(names), text=f"Cargando datos: {listos} de {len(names)} archivos listos...")
+    iconos = {'pendiente': '⏳', 'cargando': '🔄', 'listo': '✅', 'error': '❌'}
+    for n in names:
+        p = progress[n]
+        detalle = f" — {p['rows']:,} filas en {p['seconds']:.1f} s" if p['state'] == 'listo' else ''
+        if p['state'] == 'error':
+            detalle = f" — {p['error']}"
+        st.caption(f"{iconos[p['state']]} {DATASETS[n][2]} (`{DATASETS[n][0]}`){detalle}")
+
+def require_datasets(*names):
     """
-    Wrapper que llama a la función cacheada y guarda los datos
-    en st.session_state para que todas las páginas los usen.
-    """
-    if 'data_loaded' not in st.session_state:
-        try:
-            # Llama a la función cacheada
-            (st.session_state.df_stock, 
-             st.session_state.df_oc, 
-             st.session_state.df_consumo, 
-             st.session_state.df_residencial) = _load_all_data()
-            
-            st.session_state.data_loaded = True
-            print("Datos cargados en st.session_state.")
-
-        except FileNotFoundError as e:
-            st.error(f"Error Crítico: No se pudo encontrar el archivo: {e.filename}.")
-            st.info(f"Por favor, asegúrese de que el archivo '{e.filename}' esté en la carpeta 'data/'.")
+    Deja en st.session_state los DataFrames que la página necesita
+    ('stock', 'oc', 'consumo', 'residencial') y espera SOLO por ellos,
+    mostrando el avance de la carga. Llamar al inicio de cada página.
+
+    - Con la carga completa, la sesión usa la versión vigente (y toma una más
+      nueva si se publicó, ver 'sync_session_data').
+    - Durante la carga inicial, la página sigue apenas sus archivos están
+      listos; 'data_version' queda en None (los resultados no se cachean)
+      hasta que terminen todos.
+    - Si falla la lectura de un archivo que la página necesita, se muestra el
+      error y se detiene la página.
+    """
+    _DATA_STORE.start()
+    sync_session_data()
+    if st.session_state.get('data_loaded'):
+        return
+
+    placeholder = st.empty()
+    while _DATA_STORE.current() is None:
+        progress = _DATA_STORE.progress()
+        fallidos = [n for n in names if progress[n]['state'] == 'error']
+        if fallidos:
+            placeholder.empty()
+            for n in fallidos:
+                st.error(f"Error Crítico: No se pudo cargar '{DATASETS[n][0]}': {progress[n]['error']}")
+            st.info("Por favor, asegúrese de que los archivos estén en la carpeta 'data/' y reintente desde el Menú Principal.")
             st.stop()
-        except Exception as e:
-            st.error(f"Ocurrió un error inesperado durante la carga de datos: {e}")
-            st.stop()
\ No newline at end of file
+        if all(progress[n]['state'] == 'listo' for n in names):
+            break
+        with placeholder.container():
+            show_load_progress(names)
+        _DATA_STORE.wait(names, timeout=0.5)
+    placeholder.empty()
+
+    if sync_session_data():
+        return
+    # Carga inicial aún en curso: solo los conjuntos disponibles, sin versión
+    for name, df in _DATA_STORE.partial(names).items():
+        st.session_state[DATASETS[name][1]] = df
+    st.session_state.data_version = None
+    st.session_state.data_loaded = False
+
+def load_data_into_session():
+    """
+    Inicia la carga de datos SIN esperarla (el Menú se dibuja de inmediato) y,
+    si ya hay una versión completa, la deja en st.session_state para que todas
+    las páginas la usen. Si los archivos de 'data/' cambiaron, inicia una
+    recarga en segundo plano: las sesiones siguen trabajando y toman la nueva
+    versión al terminar.
+    """
+    _DATA_STORE.start()
+    sync_session_data()
+
+    if _DATA_STORE.files_changed():
+        _DATA_STORE.reload_async()
@@ -0,0 +1,241 @@
+# --- ARCHIVO: src/data_store.py ---
+# (NUEVO ARCHIVO: versión vigente de los datos del proceso, recargable en segundo plano)
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import perf
+
+
+class ReadWriteLock:
+    """
+    Lock de lectores-escritor: varias lecturas en paralelo, una escritura
+    exclusiva. Da preferencia al escritor (una escritura pendiente no queda
+    esperando detrás de lecturas que siguen llegando).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class DataSnapshot:
+    """Una versión completa de los datos: los 4 DataFrames, su huella y la firma de los archivos de origen."""
+    __slots__ = ('frames', 'version', 'signature', 'loaded_at')
+
+    def __init__(self, frames: tuple, version: str, signature, loaded_at: float):
+        self.frames = frames
+        self.version = version
+        self.signature = signature
+        self.loaded_at = loaded_at
+
+
+class DataStore:
+    """
+    Versión vigente de los datos del proceso (compartida por todas las sesiones).
+
+    - Cada conjunto de datos (Stock, OPOR, ...) se carga por separado en un
+      pool de hilos, con su avance en 'progress()'. Durante la carga inicial
+      los conjuntos ya listos quedan disponibles en 'partial()', así una
+      página espera solo por los que necesita ('wait').
+    - 'current()' retorna el snapshot completo vigente bajo lock de lectura:
+      nunca se ve un estado a medio cargar.
+    - 'start()' y 'reload_async()' construyen la versión en segundo plano, SIN
+      bloquear a las sesiones, y la publican con un intercambio atómico bajo
+      lock de escritura (solo dura la asignación de la referencia).
+    - Las sesiones que están ejecutando siguen con los DataFrames que ya
+      tomaron; en su siguiente ejecución toman la nueva versión (ver
+      data_loader.sync_session_data). El snapshot anterior se libera cuando
+      ninguna sesión lo referencia.
+
+    Las funciones de carga se inyectan para no depender de Streamlit:
+    - loaders: {nombre: función sin argumentos que retorna el DataFrame (o lanza excepción)};
+      el orden define el de 'DataSnapshot.frames'.
+    - fingerprint(*frames): huella de los datos (data_version).
+    - signature(): firma barata de los archivos de origen (fechas y tamaños).
+    - on_publish(snapshot): se llama después de cada intercambio.
+    """
+
+    def __init__(self, loaders: dict, fingerprint, signature, on_publish=None, max_workers: int = 4):
+        self._loaders = dict(loaders)
+        self._fingerprint = fingerprint
+        self._signature = signature
+        self._on_publish = on_publish
+        self._max_workers = max_workers
+        self._lock = ReadWriteLock()
+        self._snapshot = None
+        self._build_lock = threading.Lock() # Una sola construcción a la vez (carga inicial o recarga)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._cond = threading.Condition() # Avance por conjunto y conjuntos parciales
+        self._progress = {name: _new_progress() for name in self._loaders}
+        self._partial = {}
+        self._failed_signature = None
+        self.last_error = None
+
+    # --- Lectura ---
+    def current(self) -> DataSnapshot | None:
+        with self._lock.read():
+            return self._snapshot
+
+    def progress(self) -> dict:
+        """{nombre: {'state': pendiente|cargando|listo|error, 'rows', 'seconds', 'error'}} de la última construcción."""
+        with self._cond:
+            return {name: dict(p) for name, p in self._progress.items()}
+
+    def partial(self, names) -> dict:
+        """Conjuntos ya cargados de la carga inicial (antes de que exista un snapshot completo)."""
+        with self._cond:
+            return {name: self._partial[name] for name in names if name in self._partial}
+
+    def wait(self, names, timeout: float | None = None) -> bool:
+        """Espera a que los conjuntos 'names' estén listos (o fallen, o se publique un snapshot). Retorna False si se agotó 'timeout'."""
+        def done():
+            states = [self._progress[name]['state'] for name in names]
+            return self._snapshot is not None or 'error' in states or all(s == 'listo' for s in states)
+        with self._cond:
+            return self._cond.wait_for(done, timeout)
+
+    # --- Construcción ---
+    def _set_progress(self, name: str, **values):
+        with self._cond:
+            self._progress[name].update(values)
+            self._cond.notify_all()
+
+    def _load_one(self, name: str, initial: bool):
+        self._set_progress(name, state='cargando')
+        start = time.perf_counter()
+        try:
+            df = self._loaders[name]()
+        except Exception as e:
+            self._set_progress(name, state='error', error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - start)
+            raise
+        with self._cond:
+            if initial:
+                self._partial[name] = df
+            self._progress[name].update(state='listo', rows=len(df), seconds=time.perf_counter() - start)
+            self._cond.notify_all()
+        return df
+
+    def _build(self) -> DataSnapshot:
+        signature = self._signature() # Antes de leer: si un archivo cambia durante la carga, se vuelve a detectar
+        initial = self.current() is None
+        with self._cond:
+            self._progress = {name: _new_progress() for name in self._loaders}
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='flux-load') as pool:
+            futures = {name: pool.submit(self._load_one, name, initial) for name in self._loaders}
+        errors = [f.exception() for f in futures.values() if f.exception() is not None]
+        if errors:
+            self._failed_signature = signature
+            raise errors[0]
+        frames = tuple(futures[name].result() for name in self._loaders)
+        with perf.span('loader.fingerprint'):
+            version = self._fingerprint(*frames)
+        return DataSnapshot(frames, version, signature, time.time())
+
+    def _publish(self, snapshot: DataSnapshot):
+        with self._lock.write():
+            self._snapshot = snapshot
+        with self._cond:
+            self._partial = {} # Ya están en el snapshot
+            self._cond.notify_all()
+        self._failed_signature = None
+        self.last_error = None
+        if self._on_publish is not None:
+            self._on_publish(snapshot)
+
+    def _run_build(self):
+        try:
+            with self._build_lock, perf.span('store.build'):
+                snapshot = self._build()
+                current = self.current()
+                if current is not None and snapshot.version == current.version:
+                    # Mismo contenido: se conservan los DataFrames que ya usan las sesiones
+                    snapshot = DataSnapshot(current.frames, current.version, snapshot.signature, snapshot.loaded_at)
+                self._publish(snapshot)
+        except Exception as e:  # El snapshot anterior (si existe) sigue vigente
+            self.last_error = f"{type(e).__name__}: {e}"
+            anterior = ", se mantiene la versión anterior" if self.current() is not None else ""
+            print(f"Carga de datos fallida{anterior} ({self.last_error}).")
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    def reload_async(self) -> bool:
+        """Inicia una construcción en segundo plano. Retorna False si ya había una en curso."""
+        with self._thread_lock:
+            if self.is_loading():
+                return False
+            self._thread = threading.Thread(target=self._run_build, name='flux-data-load', daemon=True)
+            self._thread.start()
+            return True
+
+    def start(self) -> bool:
+        """
+        Inicia la carga inicial si aún no hay datos (no bloquea). Después de una
+        carga fallida solo reintenta si los archivos cambiaron (o con 'reload_async').
+        """
+        if self._snapshot is not None or self.is_loading():
+            return False
+        if self._failed_signature is not None and self._signature() == self._failed_signature:
+            return False
+        return self.reload_async()
+
+    def is_loading(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def files_changed(self) -> bool:
+        """True si los archivos de origen cambiaron desde el snapshot vigente."""
+        snapshot = self.current()
+        if snapshot is None:
+            return False
+        try:
+            return self._signature() != snapshot.signature
+        except OSError:
+            return False # Archivo reemplazándose en este momento: se revisa en la próxima ejecución
+
+    def status(self) -> dict:
+        snapshot = self.current()
+        return {
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "loading": self.is_loading(),
+            "last_error": self.last_error,
+        }
+
+
+def _new_progress() -> dict:
+    return {'state': 'pendiente', 'rows': None, 'seconds': None, 'error': None}
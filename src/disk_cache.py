@@ -0,0 +1,248 @@
+# --- ARCHIVO: src/disk_cache.py ---
+# (NUEVO ARCHIVO: cache en disco (SQLite) compartido por todos los procesos de la app en el host)
+
+import hashlib
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    version     TEXT,
+    created     REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    owner     TEXT NOT NULL,
+    expires   REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+def key_digest(key) -> str:
+    """Huella estable de una clave (tuplas de textos, números, bytes, fechas): igual en todos los procesos."""
+    return hashlib.sha1(pickle.dumps(key, protocol=4)).hexdigest()
+
+
+class DiskCache:
+    """
+    Segundo nivel (L2) de cache_manager: un archivo SQLite que comparten
+    todas las réplicas de Streamlit del mismo host.
+
+    - SQLite se encarga del bloqueo entre procesos (modo WAL: lecturas en
+      paralelo con una escritura).
+    - 'get_or_compute' toma un "lease" por clave: si otra réplica ya está
+      calculando la misma entrada, se espera su resultado en vez de repetir
+      el cálculo (p. ej. leer los Excel una sola vez por host).
+    - Acotado por tamaño total: al superar 'max_bytes' se eliminan las
+      entradas usadas hace más tiempo.
+
+    Los valores se guardan con pickle: el archivo debe estar en una carpeta
+    escribible solo por el usuario de la app. Cualquier error de disco se
+    reporta y se trata como un fallo de cache (la app sigue funcionando).
+    """
+
+    def __init__(self, path: str, max_bytes: int, lease_seconds: float = 600, poll_seconds: float = 0.25):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.waits = 0
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    # --- Conexiones (una por hilo) ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def _report(self, action: str, error: Exception):
+        self._count(errors=1)
+        print(f"Cache en disco: error al {action} ({type(error).__name__}: {error}).")
+
+    # --- Lectura / escritura ---
+    def get(self, namespace: str, key, ttl_seconds: float | None = None, record: bool = True):
+        """Retorna (True, valor) si la entrada existe (y no expiró), o (False, None). Con record=False no cuenta aciertos/fallos."""
+        digest = key_digest(key)
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value, created FROM entries WHERE namespace = ? AND key = ?', (namespace, digest)
+            ).fetchone()
+            if row is not None and ttl_seconds is not None and time.time() - row[1] > ttl_seconds:
+                with conn:
+                    conn.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, digest))
+                row = None
+            if row is None:
+                self._count(misses=int(record))
+                return False, None
+            value = pickle.loads(row[0])
+            with conn:
+                conn.execute(
+                    'UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?', (time.time(), namespace, digest)
+                )
+            self._count(hits=int(record))
+            return True, value
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            self._report('leer', e)
+            return False, None
+
+    def put(self, namespace: str, key, value, version=None):
+        """Guarda un valor y elimina las entradas menos usadas si se supera el tamaño máximo."""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            self._report('serializar', e)
+            return
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (namespace, key, value, size, version, created, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (namespace, key_digest(key), sqlite3.Binary(blob), len(blob), version, now, now)
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            self._report('escribir', e)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for namespace, digest, size in conn.execute(
+            'SELECT namespace, key, size FROM entries ORDER BY last_access'
+        ).fetchall():
+            conn.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, digest))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    # --- Cálculo una sola vez por host ---
+    def _try_lease(self, namespace: str, digest: str) -> bool:
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM leases WHERE namespace = ? AND key = ? AND expires < ?', (namespace, digest, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO leases (namespace, key, owner, expires) VALUES (?, ?, ?, ?)',
+                (namespace, digest, self.owner, now + self.lease_seconds)
+            )
+        return cursor.rowcount == 1
+
+    def _release(self, namespace: str, digest: str):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?', (namespace, digest, self.owner))
+
+    def get_or_compute(self, namespace: str, key, compute, version=None, ttl_seconds: float | None = None):
+        """
+        Retorna el valor del disco o lo calcula con 'compute()'. Si otra réplica
+        tiene el lease de la clave, espera (hasta que expire) a que publique su resultado.
+        """
+        digest = key_digest(key)
+        first = True
+        while True:
+            found, value = self.get(namespace, key, ttl_seconds, record=first)
+            if found:
+                if not first:
+                    self._count(hits=1) # Lo publicó la réplica que tenía el lease
+                return value
+            first = False
+            try:
+                leased = self._try_lease(namespace, digest)
+            except sqlite3.Error as e:
+                self._report('tomar el lease', e)
+                return compute()
+            if leased:
+                break
+            self._count(waits=1)
+            time.sleep(self.poll_seconds)
+
+        try:
+            value = compute()
+            self.put(namespace, key, value, version=version)
+            return value
+        finally:
+            try:
+                self._release(namespace, digest)
+            except sqlite3.Error as e:
+                self._report('liberar el lease', e)
+
+    # --- Mantención ---
+    def invalidate_versions(self, keep_version) -> int:
+        """Elimina las entradas marcadas con una versión de datos distinta de 'keep_version'."""
+        try:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    'DELETE FROM entries WHERE version IS NOT NULL AND version != ?', (keep_version,)
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            self._report('invalidar', e)
+            return 0
+
+    def clear(self, namespace: str | None = None):
+        try:
+            conn = self._connect()
+            with conn:
+                if namespace is None:
+                    conn.execute('DELETE FROM entries')
+                else:
+                    conn.execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+        except sqlite3.Error as e:
+            self._report('vaciar', e)
+
+    def stats(self) -> dict:
+        """Contadores de este proceso + contenido actual del archivo (compartido)."""
+        try:
+            entries, total = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
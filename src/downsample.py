@@ -0,0 +1,105 @@
+# --- ARCHIVO: src/downsample.py ---
+# (NUEVO ARCHIVO: reducción de puntos para gráficos, preservando la forma)
+
+import numpy as np
+import pandas as pd
+
+import config
+
+
+def _as_float(values) -> np.ndarray:
+    """Convierte fechas (a días) o números en un arreglo float para calcular áreas."""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float) / 86_400e9
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige 'threshold' puntos que conservan la forma
+    visual de la serie (picos y valles incluidos). Siempre mantiene el primero y el último.
+    Retorna las posiciones elegidas, en orden.
+    """
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if end >= next_end:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(df: pd.DataFrame, x_col: str, y_cols, max_points: int | None = None) -> pd.DataFrame:
+    """
+    Reduce una serie (línea escalonada) a lo más 'max_points' filas:
+
+    1. Se quedan solo los puntos donde cambia algún valor de 'y_cols' (más el
+       primero y el último). Con interpolación 'step-after' esto no altera el gráfico.
+    2. Si aún sobran puntos, LTTB sobre cada columna (repartiendo el presupuesto)
+       y se unen las posiciones elegidas.
+    """
+    max_points = config.CHART_MAX_POINTS if max_points is None else max_points
+    n = len(df)
+    if n <= max_points:
+        return df
+
+    values = df[list(y_cols)].to_numpy(dtype=float)
+    changes = np.ones(n, dtype=bool)
+    changes[1:] = (values[1:] != values[:-1]).any(axis=1)
+    changes[-1] = True
+    rows = np.flatnonzero(changes)
+
+    if len(rows) > max_points:
+        budget = max(3, max_points // len(y_cols))
+        x = df[x_col].to_numpy()[rows]
+        picked = [rows[lttb_indices(x, values[rows, j], budget)] for j in range(len(y_cols))]
+        rows = np.unique(np.concatenate(picked))
+
+    return df.iloc[rows]
+
+
+def bin_scatter(df: pd.DataFrame, x_col: str, y_col: str, max_points: int | None = None) -> pd.DataFrame:
+    """
+    Dispersión con presupuesto de puntos. Si hay más de 'max_points' filas, agrupa
+    en una grilla de raíz(max_points) x raíz(max_points) celdas y retorna un punto
+    por celda ocupada (posición = promedio de sus puntos) con 'N_Proyectos' =
+    cantidad de puntos. Con pocas filas retorna los originales con 'N_Proyectos' = 1.
+    """
+    max_points = config.SCATTER_MAX_POINTS if max_points is None else max_points
+    bins = max(1, int(np.sqrt(max_points)))
+
+    df = df.dropna(subset=[x_col, y_col])
+    if len(df) <= max_points:
+        return df.assign(N_Proyectos=1)
+
+    x = df[x_col].to_numpy(dtype=float)
+    y = df[y_col].to_numpy(dtype=float)
+
+    def _cell(v):
+        span = v.max() - v.min()
+        if span == 0:
+            return np.zeros(len(v), dtype=np.int64)
+        return np.minimum(((v - v.min()) / span * bins).astype(np.int64), bins - 1)
+
+    cell = _cell(x) * bins + _cell(y)
+    grouped = pd.DataFrame({x_col: x, y_col: y, 'cell': cell}).groupby('cell')
+    result = grouped[[x_col, y_col]].mean()
+    result['N_Proyectos'] = grouped.size()
+    return result.reset_index(drop=True)
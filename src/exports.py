@@ -0,0 +1,152 @@
+# --- ARCHIVO: src/exports.py ---
+# (NUEVO ARCHIVO: exportación de tablas a CSV / Excel / Parquet por tramos, generada al momento de descargar)
+
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional: sin pyarrow solo se ofrecen CSV y Excel
+    pa = pq = None
+
+import config
+import perf
+
+# Extensión: (etiqueta, MIME)
+FORMATS = {
+    'csv': ('CSV', 'text/csv'),
+    'xlsx': ('Excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet'),
+}
+
+_XLSX_MAX_ROWS = 1_048_575 # Límite de filas de una hoja (sin el encabezado)
+
+
+def available_formats() -> list:
+    """Formatos que se pueden generar en este entorno (Parquet requiere pyarrow)."""
+    return [fmt for fmt in FORMATS if fmt != 'parquet' or pq is not None]
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+# --- Escritores (cada uno recibe un archivo binario abierto) ---
+def write_csv(df: pd.DataFrame, out, chunk_rows: int):
+    if df.empty:
+        out.write(df.to_csv(index=False).encode('utf-8'))
+        return
+    for i, chunk in enumerate(_chunks(df, chunk_rows)):
+        out.write(chunk.to_csv(index=False, header=(i == 0)).encode('utf-8'))
+
+
+def write_parquet(df: pd.DataFrame, out, chunk_rows: int):
+    if pq is None:
+        raise RuntimeError("La exportación a Parquet requiere 'pyarrow'.")
+    # Esquema de la tabla completa: un tramo con solo vacíos no define el tipo de la columna
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _xlsx_number_format(series: pd.Series) -> str | None:
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return None
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return '#,##0'
+    if pd.api.types.is_float_dtype(series.dtype):
+        return '#,##0.00'
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return 'yyyy-mm-dd'
+    return None
+
+
+def _xlsx_column_values(series: pd.Series) -> list:
+    """Valores de una columna como tipos de Python (vacíos e infinitos -> None; textos sin caracteres de control)."""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype) and getattr(series.dt, 'tz', None) is not None:
+        series = series.dt.tz_localize(None) # Excel no guarda zona horaria
+    if pd.api.types.is_float_dtype(series.dtype):
+        series = series.mask(np.isinf(series)) # Excel no tiene infinito (p. ej. DOS con demanda 0): celda vacía
+    values = series.astype(object).where(series.notna(), None)
+    if pd.api.types.is_string_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+        values = values.map(lambda v: ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v)
+    return values.tolist()
+
+
+def write_xlsx(df: pd.DataFrame, out, chunk_rows: int, sheet_name: str = 'Datos', number_formats: dict | None = None):
+    """
+    Hoja con encabezado en negrita y fijo, anchos de columna y formato numérico
+    por tipo de columna ('number_formats' = {columna: formato} para cambiarlo).
+    Usa el modo 'write_only' de openpyxl: las filas se escriben a disco a medida
+    que llegan, la memoria no crece con el tamaño de la hoja.
+    """
+    if len(df) > _XLSX_MAX_ROWS:
+        raise ValueError(f"La tabla tiene {len(df):,} filas; una hoja de Excel admite {_XLSX_MAX_ROWS:,}. Use CSV o Parquet.")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name[:31])
+    ws.freeze_panes = 'A2'
+
+    columns = [str(col) for col in df.columns]
+    formats = [(number_formats or {}).get(col, _xlsx_number_format(df[col])) for col in df.columns]
+    sample = df.head(200)
+    for j, col in enumerate(df.columns, start=1):
+        longest = sample[col].astype(str).str.len().max() if len(sample) else 0
+        width = max(len(columns[j - 1]), int(longest if pd.notna(longest) else 0)) + 2
+        ws.column_dimensions[get_column_letter(j)].width = min(width, 60)
+
+    bold = Font(bold=True)
+    header = []
+    for name in columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = bold
+        header.append(cell)
+    ws.append(header)
+
+    for chunk in _chunks(df, chunk_rows):
+        values = [_xlsx_column_values(chunk[col]) for col in chunk.columns]
+        for row in zip(*values):
+            cells = []
+            for value, number_format in zip(row, formats):
+                if value is not None and (number_format is not None or (isinstance(value, str) and value.startswith('='))):
+                    cell = WriteOnlyCell(ws, value=value)
+                    if number_format is not None:
+                        cell.number_format = number_format
+                    else:
+                        cell.data_type = 's' # Texto que empieza con '=': no es una fórmula
+                    value = cell
+                cells.append(value)
+            ws.append(cells)
+    wb.save(out)
+
+
+_WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}
+
+
+def build_export(df: pd.DataFrame, fmt: str, chunk_rows: int | None = None, **options):
+    """
+    Genera la exportación de 'df' en el formato 'fmt' ('csv', 'xlsx' o 'parquet')
+    y retorna un io.BytesIO posicionado al inicio (uno de los tipos que acepta
+    st.download_button; Streamlit guarda el archivo completo en memoria de
+    todas formas). Las filas se convierten por tramos: no se arma una copia
+    intermedia de la tabla completa como texto. 'options' se pasa al
+    escritor (p. ej. sheet_name en Excel).
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Formato de exportación desconocido: '{fmt}'.")
+    chunk_rows = chunk_rows or config.EXPORT_CHUNK_ROWS
+    out = io.BytesIO()
+    with perf.span(f'export.{fmt}', filas=len(df)):
+        _WRITERS[fmt](df, out, chunk_rows, **options)
+    out.seek(0)
+    return out
@@ -0,0 +1,92 @@
+# --- ARCHIVO: src/family_dashboard.py ---
+# (NUEVO ARCHIVO: agregados por familia para el dashboard de familias de productos)
+
+import pandas as pd
+
+DEFAULT_FAMILY = 'EQUIPOS PRINCIPALES'
+TOP_N = 10
+
+
+def normalize_families(familia: pd.Series) -> pd.Series:
+    """'Familia' sin espacios extremos y en mayúsculas. Se normalizan solo los valores distintos, no cada fila."""
+    codes, uniques = pd.factorize(familia)
+    normalized = pd.Index(uniques).astype(str).str.strip().str.upper()
+    result = pd.Series(normalized.take(codes), index=familia.index, dtype=object)
+    return result.where(codes >= 0)
+
+
+class FamilyDashboard:
+    """
+    KPIs y rankings de TODAS las familias, calculados en una sola pasada agrupada
+    (una vez por versión de datos). Mostrar cualquier familia es solo una búsqueda:
+
+    - Resumen por familia: SKUs únicos, unidades, valor de inventario y consumo reciente.
+    - Por familia: tabla de artículos (SKU, nombre, unidades, valor) y Top-N por
+      valor, por unidades y por rotación (consumo).
+    """
+
+    def __init__(self, df_stock: pd.DataFrame, df_consumo: pd.DataFrame, top_n: int = TOP_N):
+        stock = pd.DataFrame({
+            'Familia': normalize_families(df_stock['Familia']),
+            'CodigoArticulo': df_stock['CodigoArticulo'],
+            'NombreArticulo': df_stock['NombreArticulo'],
+            'Unidades_Stock': pd.to_numeric(df_stock['DisponibleParaPrometer'], errors='coerce').fillna(0),
+        })
+        costo = pd.to_numeric(df_stock['CostoUnitario'], errors='coerce').fillna(0)
+        stock['Valor_Stock'] = stock['Unidades_Stock'] * costo
+        stock = stock.dropna(subset=['Familia'])
+
+        # Artículos por familia (un SKU puede estar en varias líneas/bodegas)
+        articles = stock.groupby(['Familia', 'CodigoArticulo', 'NombreArticulo']).agg(
+            Unidades_Stock=('Unidades_Stock', 'sum'),
+            Valor_Stock=('Valor_Stock', 'sum')
+        ).reset_index()
+
+        # Consumo por SKU (una pasada) y asignado a cada familia que contiene el SKU
+        consumo_sku = (
+            pd.to_numeric(df_consumo['CantidadSolicitada'], errors='coerce').fillna(0)
+            .groupby(df_consumo['CodigoArticulo']).sum()
+            .rename('CantidadSolicitada')
+        )
+        family_skus = stock[['Familia', 'CodigoArticulo']].drop_duplicates().sort_values('CodigoArticulo', kind='stable')
+        consumo_familia = family_skus.merge(consumo_sku, left_on='CodigoArticulo', right_index=True, how='inner')
+
+        rotacion = consumo_familia.merge(
+            articles[['Familia', 'CodigoArticulo', 'NombreArticulo']], on=['Familia', 'CodigoArticulo'], how='left'
+        )
+        # Si un SKU consumido no tiene nombre en stock, se muestra su código
+        rotacion['NombreArticulo'] = rotacion['NombreArticulo'].fillna(rotacion['CodigoArticulo'])
+
+        self.summary = pd.DataFrame({
+            'SKUs_Unicos': stock.groupby('Familia')['CodigoArticulo'].nunique(),
+            'Unidades_Stock': articles.groupby('Familia')['Unidades_Stock'].sum(),
+            'Valor_Stock': articles.groupby('Familia')['Valor_Stock'].sum(),
+            'Consumo_Reciente': consumo_familia.groupby('Familia')['CantidadSolicitada'].sum(),
+        }).fillna(0)
+
+        def _by_family(df):
+            return {familia: group.drop(columns='Familia') for familia, group in df.groupby('Familia', sort=False)}
+
+        self._articles = _by_family(articles.sort_values('Valor_Stock', ascending=False, kind='stable'))
+        self._top_valor = _by_family(articles.sort_values('Valor_Stock', ascending=False, kind='stable').groupby('Familia').head(top_n))
+        self._top_unidades = _by_family(articles.sort_values('Unidades_Stock', ascending=False, kind='stable').groupby('Familia').head(top_n))
+        self._top_rotacion = _by_family(rotacion.sort_values('CantidadSolicitada', ascending=False, kind='stable').groupby('Familia').head(top_n))
+
+    def families(self) -> list:
+        """Familias disponibles, ordenadas alfabéticamente."""
+        return sorted(self.summary.index)
+
+    def default_index(self) -> int:
+        families = self.families()
+        return families.index(DEFAULT_FAMILY) if DEFAULT_FAMILY in families else 0
+
+    def family(self, familia: str) -> dict:
+        """KPIs, rankings y tabla de artículos de una familia (ya normalizada)."""
+        empty = pd.DataFrame(columns=['CodigoArticulo', 'NombreArticulo', 'Unidades_Stock', 'Valor_Stock'])
+        return {
+            'kpis': self.summary.loc[familia],
+            'articulos': self._articles.get(familia, empty),
+            'top_valor': self._top_valor.get(familia, empty),
+            'top_unidades': self._top_unidades.get(familia, empty),
+            'top_rotacion': self._top_rotacion.get(familia, pd.DataFrame(columns=['CodigoArticulo', 'CantidadSolicitada', 'NombreArticulo'])),
+        }
@@ -0,0 +1,96 @@
+# --- ARCHIVO: src/frame_compaction.py ---
+# (NUEVO ARCHIVO: representación compacta en memoria de los DataFrames cargados)
+
+import numpy as np
+import pandas as pd
+
+MB = 1024 ** 2
+_INT32 = np.iinfo(np.int32)
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """Memoria del DataFrame (incluye el contenido de los textos)."""
+    return df.memory_usage(deep=True).sum() / MB
+
+
+def _is_text(series: pd.Series) -> bool:
+    return pd.api.types.is_string_dtype(series.dtype) or series.dtype == object
+
+
+def _compact_integers(series: pd.Series):
+    """
+    Enteros de 64 a 32 bits si el rango lo permite (no se baja de 32 bits: la
+    aritmética entre columnas chicas, p. ej. int8 + int8, se desborda). Una
+    columna float con solo valores enteros y vacíos (lo típico de Excel) pasa
+    a 'Int32' nullable. Retorna None si la columna no es entera o no cambia.
+    """
+    is_int = pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype)
+    if not is_int and not (pd.api.types.is_float_dtype(series.dtype) and series.dtype == np.float64):
+        return None
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    valid = values[~np.isnan(values)]
+    if not len(valid) or not np.all(np.isfinite(valid)) or not np.array_equal(valid, np.round(valid)):
+        return None
+    if not (_INT32.min <= valid.min() and valid.max() <= _INT32.max):
+        return None
+    if len(valid) == len(values):
+        return series.astype(np.int32)
+    return series.astype('Int32')
+
+
+def _compact_float(series: pd.Series, rtol: float):
+    """float64 -> float32 si todos los valores se conservan dentro de 'rtol'. Retorna None si no."""
+    if series.dtype != np.float64:
+        return None
+    values = series.to_numpy()
+    as32 = values.astype(np.float32)
+    if not np.allclose(as32, values, rtol=rtol, atol=0, equal_nan=True):
+        return None
+    return pd.Series(as32, index=series.index, name=series.name)
+
+
+def compact_frame(df: pd.DataFrame, keep_float64=(), category_max_ratio: float = 0.5, float_rtol: float = 1e-6):
+    """
+    Retorna (DataFrame compacto, reporte) sin modificar 'df':
+
+    - Textos con pocos valores distintos (únicos / filas <= 'category_max_ratio'):
+      categóricos (SKU, bodega, familia, comprador...).
+    - Enteros: int32 si el rango lo permite; floats enteros con vacíos: 'Int32' nullable.
+    - Floats: float32 si la precisión alcanza ('float_rtol').
+    - Las columnas de 'keep_float64' (montos que se suman o multiplican sobre
+      muchas filas) no se tocan.
+
+    El reporte tiene filas, MB antes/después y qué columnas cambiaron.
+    """
+    before = frame_memory_mb(df)
+    columns = {}
+    changed = {'categoricas': [], 'enteras': [], 'float32': []}
+    n_rows = len(df)
+
+    for col in df.columns:
+        series = df[col]
+        new = None
+        if _is_text(series):
+            if n_rows and series.nunique(dropna=True) <= category_max_ratio * n_rows:
+                new = series.astype('category')
+                changed['categoricas'].append(col)
+        else:
+            if col in keep_float64:
+                new = None
+            elif (new := _compact_integers(series)) is not None:
+                changed['enteras'].append(col)
+            else:
+                new = _compact_float(series, float_rtol)
+                if new is not None:
+                    changed['float32'].append(col)
+        columns[col] = series if new is None else new
+
+    compact = pd.DataFrame(columns, index=df.index)
+    report = {
+        'filas': n_rows,
+        'columnas': df.shape[1],
+        'mb_antes': before,
+        'mb_despues': frame_memory_mb(compact),
+        **changed,
+    }
+    return compact, report
@@ -0,0 +1,131 @@
+# --- ARCHIVO: src/kpi_cube.py ---
+# (NUEVO ARCHIVO: cubo pre-agregado de KPIs de compradores para KPIs_Compradores)
+
+import numpy as np
+import pandas as pd
+
+import cache_manager
+
+COL_FECHA = 'Fecha de contabilización'
+COL_CREADOR = 'Creador'
+COL_DOC = 'Número de documento'
+COL_MONTO = 'Total_Linea'
+
+
+class BuyerKpiCube:
+    """
+    Agregados de las líneas de OC por (fecha de contabilización, Creador), construidos
+    UNA vez por carga de datos:
+
+    - Celdas: monto total y número de líneas de cada (fecha, comprador).
+    - Documentos: pares únicos (fecha, comprador, OC) para contar OCs distintas de
+      forma EXACTA sobre cualquier rango (una OC repartida en varios meses o
+      compradores se cuenta una vez en el total, igual que 'nunique').
+
+    Ambas tablas están ordenadas por fecha, así que un filtro de rango es una
+    búsqueda binaria y el filtro de compradores una máscara sobre códigos enteros.
+    Los gráficos mensuales se arman agregando solo el tramo seleccionado.
+    """
+
+    def __init__(self, df_oc: pd.DataFrame):
+        fechas = pd.to_datetime(df_oc[COL_FECHA], errors='coerce')
+        valid = fechas.notna().to_numpy()
+
+        buyer_codes, self.buyers = pd.factorize(df_oc[COL_CREADOR], use_na_sentinel=False)
+        doc_codes, _ = pd.factorize(df_oc[COL_DOC]) # NaN -> -1 (no cuenta como OC, igual que 'nunique')
+
+        lines = pd.DataFrame({
+            'fecha': fechas.to_numpy()[valid],
+            'buyer': buyer_codes[valid],
+            'doc': doc_codes[valid],
+            'monto': pd.to_numeric(df_oc[COL_MONTO], errors='coerce').to_numpy()[valid],
+        })
+
+        self.cells = lines.groupby(['fecha', 'buyer'], sort=True).agg(
+            monto=('monto', 'sum'),
+            lineas=('monto', 'size')
+        ).reset_index()
+        self.docs = (
+            lines.loc[lines['doc'] >= 0, ['fecha', 'buyer', 'doc']]
+            .drop_duplicates()
+            .sort_values('fecha', kind='stable')
+            .reset_index(drop=True)
+        )
+
+        # Mes como entero (meses desde 1970); la etiqueta 'YYYY-MM' se arma solo al graficar
+        for table in (self.cells, self.docs):
+            table['mes'] = table['fecha'].to_numpy().astype('datetime64[M]').astype(np.int64)
+
+        self._cell_dates = self.cells['fecha'].to_numpy()
+        self._doc_dates = self.docs['fecha'].to_numpy()
+
+        self.min_date = self.cells['fecha'].min() if len(self.cells) else pd.NaT
+        self.max_date = self.cells['fecha'].max() if len(self.cells) else pd.NaT
+
+    def _slice(self, table, dates, buyers, start, end):
+        lo = np.searchsorted(dates, np.datetime64(start), side='left')
+        hi = np.searchsorted(dates, np.datetime64(end), side='right')
+        part = table.iloc[lo:hi]
+        codes = self.buyers.get_indexer(pd.Index(list(buyers)))
+        codes = codes[codes >= 0]
+        return part[np.isin(part['buyer'].to_numpy(), codes)]
+
+    def query(self, buyers, start, end) -> "CubeSlice":
+        """Selecciona los compradores y el rango [start, end] (ambos inclusive)."""
+        return CubeSlice(
+            self,
+            self._slice(self.cells, self._cell_dates, buyers, start, end),
+            self._slice(self.docs, self._doc_dates, buyers, start, end)
+        )
+
+
+class CubeSlice:
+    """Tramo del cubo para un filtro dado. Todas las salidas usan los nombres de columna de la página."""
+
+    def __init__(self, cube: BuyerKpiCube, cells: pd.DataFrame, docs: pd.DataFrame):
+        self._buyers = cube.buyers
+        self.cells = cells
+        self.docs = docs
+
+    @property
+    def empty(self) -> bool:
+        return self.cells.empty
+
+    def _names(self, codes):
+        return self._buyers.take(np.asarray(codes, dtype=np.int64))
+
+    def totals(self) -> dict:
+        """Monto total, OCs únicas y compradores activos del tramo."""
+        return {
+            'monto_total': self.cells['monto'].sum(),
+            'ocs_unicas': len(np.unique(self.docs['doc'].to_numpy())),
+            'compradores_activos': int(self._names(self.cells['buyer'].unique()).notna().sum()),
+            'lineas': int(self.cells['lineas'].sum()),
+        }
+
+    def monthly(self) -> pd.DataFrame:
+        """Por (Año-Mes, Creador): 'Total_Linea' (monto) y 'Conteo_OCs' (OCs únicas)."""
+        monto = self.cells.groupby(['mes', 'buyer'])['monto'].sum()
+        ocs = self.docs.groupby(['mes', 'buyer'])['doc'].nunique()
+        df = pd.concat([monto.rename(COL_MONTO), ocs.rename('Conteo_OCs')], axis=1).reset_index()
+        df['Conteo_OCs'] = df['Conteo_OCs'].fillna(0).astype(int)
+        df[COL_CREADOR] = self._names(df['buyer'])
+        df['Año-Mes'] = np.datetime_as_string(df['mes'].to_numpy().astype('datetime64[M]'), unit='M')
+        df = df[df[COL_CREADOR].notna()] # Igual que groupby: sin comprador no se grafica
+        return df[['Año-Mes', COL_CREADOR, COL_MONTO, 'Conteo_OCs']]
+
+    def by_buyer(self) -> pd.DataFrame:
+        """Por Creador: 'Monto_Total' y 'OCs_Unicas' (OCs distintas en todo el rango)."""
+        monto = self.cells.groupby('buyer')['monto'].sum()
+        ocs = self.docs.groupby('buyer')['doc'].nunique()
+        df = pd.concat([monto.rename('Monto_Total'), ocs.rename('OCs_Unicas')], axis=1).reset_index()
+        df['OCs_Unicas'] = df['OCs_Unicas'].fillna(0).astype(int)
+        df[COL_CREADOR] = self._names(df['buyer'])
+        df = df[df[COL_CREADOR].notna()]
+        return df[[COL_CREADOR, 'Monto_Total', 'OCs_Unicas']]
+
+
+@cache_manager.cached('derivados')
+def get_kpi_cube(_df_oc: pd.DataFrame, data_version) -> BuyerKpiCube:
+    """Cubo de la versión de datos vigente, compartido por todas las sesiones (lo precalienta src/warmup.py)."""
+    return BuyerKpiCube(_df_oc)
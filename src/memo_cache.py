@@ -0,0 +1,142 @@
+# --- ARCHIVO: src/memo_cache.py ---
+# (NUEVO ARCHIVO: memoización en memoria, compartida por todo el proceso)
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(obj, _seen=None) -> int:
+    """
+    Estima el tamaño en bytes de un resultado cacheado.
+    Cuenta DataFrames/Series con memory_usage(deep=True) y recorre tuplas,
+    listas y diccionarios (como el retorno de 'run_inventory_simulation'),
+    además de los atributos de objetos pre-calculados. Cada objeto se cuenta una vez.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(v, _seen) for v in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type) and not callable(obj):
+        # Objetos pre-calculados (índices, cubos, tablas): se suman sus atributos
+        return sys.getsizeof(obj) + estimate_size(vars(obj), _seen)
+    return sys.getsizeof(obj)
+
+
+class SizedLRUCache:
+    """
+    Cache LRU acotado por memoria (bytes) y, opcionalmente, por número de entradas
+    y por antigüedad ('ttl_seconds'). Cada entrada puede llevar la versión de datos
+    con que se calculó, para invalidar de una vez todo lo de versiones anteriores.
+
+    Es seguro entre hilos: Streamlit atiende cada sesión en su propio hilo y esta
+    instancia se comparte a nivel de proceso (todas las sesiones y usuarios).
+    Los valores devueltos se comparten: quien los reciba NO debe modificarlos.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int | None = None, ttl_seconds: float | None = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict() # key -> (value, size, creado, versión)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - created > self.ttl_seconds
+
+    def get(self, key, record: bool = True):
+        """
+        Retorna (True, valor) si la clave existe y no expiró (y la marca como
+        reciente), o (False, None). Con record=False no cuenta aciertos/fallos.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._expired(entry[2]):
+                self.current_bytes -= self._data.pop(key)[1]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += record
+                return True, entry[0]
+            self.misses += record
+            return False, None
+
+    def put(self, key, value, size: int | None = None, version=None):
+        """Guarda un valor y expulsa los menos usados hasta respetar los límites."""
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return # Nunca cabría: no se cachea
+
+        with self._lock:
+            if key in self._data:
+                self.current_bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size, time.monotonic(), version)
+            self.current_bytes += size
+
+            while self._data and (
+                self.current_bytes > self.max_bytes or
+                (self.max_entries is not None and len(self._data) > self.max_entries)
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self.current_bytes -= evicted[1]
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, version=None):
+        """Retorna el valor cacheado o lo calcula con 'compute()' y lo guarda."""
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value, version=version)
+        return value
+
+    def invalidate_versions(self, keep_version) -> int:
+        """Elimina las entradas calculadas con una versión de datos distinta de 'keep_version' (las sin versión se conservan)."""
+        with self._lock:
+            stale = [k for k, entry in self._data.items() if entry[3] is not None and entry[3] != keep_version]
+            for k in stale:
+                self.current_bytes -= self._data.pop(k)[1]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """Contadores para mostrar en la UI."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,269 @@
+# --- ARCHIVO: src/optimizer.py ---
+# (NUEVO ARCHIVO para optimizar políticas de reposición sobre el simulador)
+
+import pandas as pd
+import numpy as np
+import config    # Importa config.py desde la misma carpeta 'src'
+import simulator # Reutiliza el bootstrap de demanda del simulador
+
+POLICY_COLUMNS = [
+    "SKU", "Nombre", "Política", "s / R", "S / Q", "Días Quiebre Esperados",
+    "Stock Prom. (Uds.)", "Valor Inventario Prom.", "Pedidos Esperados",
+    "Costo Total", "Días Quiebre (sin pedir)"
+]
+
+
+def build_policy_grid(daily_demand_mean: float, lead_time_days: int) -> pd.DataFrame:
+    """
+    Construye la grilla de políticas candidatas para un SKU.
+
+    - (s, S): si la posición de inventario cae a 's' o menos, pedir hasta 'S'.
+    - (R, Q): si la posición de inventario cae a 'R' o menos, pedir 'Q' unidades.
+
+    Los puntos de reorden van de 0 a 2x la demanda esperada en el Lead Time y los
+    tamaños de pedido cubren 'config.OPTIMIZER_COVER_MONTHS' meses de demanda.
+    Siempre se incluye la política "Sin pedidos" como referencia.
+    """
+    rows = [("Sin pedidos", -np.inf, 0.0)]
+
+    demand_lt = daily_demand_mean * lead_time_days
+    monthly_demand = daily_demand_mean * config.AVERAGE_DAYS_PER_MONTH
+    q_values = np.unique(np.round(np.array(config.OPTIMIZER_COVER_MONTHS) * monthly_demand))
+    q_values = q_values[q_values > 0]
+
+    if q_values.size > 0:
+        s_values = np.unique(np.round(np.linspace(0, 2 * demand_lt, config.OPTIMIZER_REORDER_LEVELS)))
+        for s in s_values:
+            for q in q_values:
+                rows.append(("(s, S)", s, s + q))
+                rows.append(("(R, Q)", s, q))
+
+    return pd.DataFrame(rows, columns=["Política", "s / R", "S / Q"])
+
+
+def simulate_policies(
+    initial_stock: np.ndarray,
+    arrivals: np.ndarray,
+    demand: np.ndarray,
+    policy_sku: np.ndarray,
+    reorder_level: np.ndarray,
+    order_param: np.ndarray,
+    order_up_to: np.ndarray,
+    lead_time_days: int
+):
+    """
+    Simula en lote TODAS las políticas candidatas sobre TODAS las trayectorias.
+
+    El único bucle es sobre los días; cada paso opera sobre matrices de forma
+    (n_políticas, n_trayectorias). Igual que el simulador, se permite inventario
+    negativo (backorder) y un día cuenta como quiebre si termina bajo cero.
+
+    Parámetros:
+    - initial_stock: (n_skus,) stock inicial de cada SKU.
+    - arrivals: (n_skus, días) llegadas de OCs ya emitidas.
+    - demand: (n_skus, n_trayectorias, días) demanda simulada.
+    - policy_sku: (n_políticas,) índice del SKU al que pertenece cada política.
+    - reorder_level: (n_políticas,) 's' o 'R'.
+    - order_param: (n_políticas,) 'S' (pedir hasta) o 'Q' (cantidad fija).
+    - order_up_to: (n_políticas,) True para (s, S), False para (R, Q).
+
+    Retorna:
+    - tupla(np.ndarray): (días de quiebre, stock promedio, n° pedidos), cada uno
+      de forma (n_políticas,) promediado sobre las trayectorias.
+    """
+    n_paths, horizon = demand.shape[1], demand.shape[2]
+    n_policies = policy_sku.size
+    pipeline_len = max(1, int(lead_time_days))
+    dtype = np.float32 # Precisión suficiente para unidades y reduce a la mitad el tráfico de memoria
+
+    # Demanda con el día como primer eje: cada paso toma filas contiguas
+    demand_by_day = np.ascontiguousarray(demand.transpose(2, 0, 1), dtype=dtype)
+    # Llegadas programadas que aún no llegan (cuentan en la posición de inventario)
+    pending_arrivals = arrivals[:, ::-1].cumsum(axis=1)[:, ::-1] - arrivals
+    arrivals_by_day = np.ascontiguousarray(arrivals.T[:, policy_sku, None], dtype=dtype)
+    pending_by_day = np.ascontiguousarray(pending_arrivals.T[:, policy_sku, None], dtype=dtype)
+
+    on_hand = np.repeat(initial_stock[policy_sku, None], n_paths, axis=1).astype(dtype)
+    on_order = np.zeros((n_policies, n_paths), dtype=dtype)
+    pipeline = np.zeros((pipeline_len, n_policies, n_paths), dtype=dtype) # Buffer circular de pedidos en tránsito
+    stockout_days = np.zeros((n_policies, n_paths), dtype=np.int32)
+    on_hand_sum = np.zeros((n_policies, n_paths), dtype=dtype)
+    n_orders = np.zeros((n_policies, n_paths), dtype=np.int32)
+    position = np.empty((n_policies, n_paths), dtype=dtype)
+    qty = np.empty((n_policies, n_paths), dtype=dtype)
+
+    reorder_level = reorder_level[:, None].astype(dtype)
+    order_param = order_param[:, None].astype(dtype)
+    order_up_to = order_up_to[:, None]
+
+    for t in range(horizon):
+        slot = t % pipeline_len
+
+        # 1. Recepciones: pedidos de la política + OCs existentes
+        received = pipeline[slot]
+        on_hand += received
+        on_hand += arrivals_by_day[t]
+        on_order -= received
+
+        # 2. Consumo del día
+        on_hand -= demand_by_day[t][policy_sku]
+        stockout_days += on_hand < 0
+        on_hand_sum += np.maximum(on_hand, 0.0)
+
+        # 3. Revisión: pedir si la posición de inventario cae al punto de reorden
+        np.add(on_hand, on_order, out=position)
+        position += pending_by_day[t]
+        np.subtract(order_param, position, out=qty, where=order_up_to)
+        np.copyto(qty, order_param, where=~order_up_to)
+        np.maximum(qty, 0.0, out=qty)
+        qty *= position <= reorder_level
+
+        # El pedido de hoy llega en t + Lead Time, que reutiliza este mismo slot
+        pipeline[slot] = qty
+        on_order += qty
+        n_orders += qty > 0
+
+    return (
+        stockout_days.mean(axis=1),
+        on_hand_sum.astype(float).mean(axis=1) / horizon,
+        n_orders.mean(axis=1)
+    )
+
+
+def optimize_family_policies(
+    skus: list[str],
+    df_stock: pd.DataFrame,
+    df_consumo: pd.DataFrame,
+    df_oc: pd.DataFrame,
+    warehouse_code: list[str],
+    consumption_warehouse: list[str],
+    lead_time_days: int,
+    horizon_days: int = 180,
+    n_paths: int = config.OPTIMIZER_N_PATHS,
+    block_days: int = config.BOOTSTRAP_BLOCK_DAYS,
+    max_batch_cells: int = 20_000_000,
+    random_seed: int | None = 0
+) -> pd.DataFrame:
+    """
+    Evalúa la grilla de políticas (s, S) y (R, Q) para cada SKU y retorna la
+    mejor por SKU: la que minimiza
+
+        Costo = Días de quiebre esperados * (demanda diaria valorizada * STOCKOUT_DAY_COST_FACTOR)
+              + Valor de inventario promedio * HOLDING_COST_RATE_ANNUAL * (horizonte / 365)
+
+    usando 'CostoUnitario' de Stock.xlsx. La demanda se genera con el mismo
+    bootstrap por bloques del simulador, y los SKUs se procesan en lotes de
+    hasta 'max_batch_cells' celdas del buffer de pedidos en tránsito
+    (políticas x trayectorias x Lead Time, ~80 MB en float32) para acotar la memoria.
+    """
+    if not skus:
+        return pd.DataFrame(columns=POLICY_COLUMNS)
+
+    today = pd.Timestamp.now().floor('D')
+    rng = np.random.default_rng(random_seed)
+    sku_index = pd.Index(skus)
+
+    # --- 1. Stock inicial y costo unitario por SKU ---
+    df_stock_sel = df_stock[
+        df_stock['CodigoArticulo'].isin(sku_index) & df_stock['CodigoBodega'].isin(warehouse_code)
+    ]
+    initial_stock = (
+        pd.to_numeric(df_stock_sel['DisponibleParaPrometer'], errors='coerce')
+        .groupby(df_stock_sel['CodigoArticulo']).sum()
+        .reindex(sku_index, fill_value=0).to_numpy(dtype=float)
+    )
+    costos = pd.to_numeric(df_stock['CostoUnitario'], errors='coerce')
+    unit_cost = (
+        costos[costos > 0].groupby(df_stock['CodigoArticulo']).mean()
+        .reindex(sku_index, fill_value=0).to_numpy(dtype=float)
+    )
+    mapa_nombres = df_stock.drop_duplicates(subset=['CodigoArticulo']).set_index('CodigoArticulo')['NombreArticulo']
+
+    # --- 2. Historial diario de consumo (matriz SKU x día, en una pasada) ---
+    dias_historicos = simulator.historical_days(today)
+    df_consumo_sel = df_consumo[
+        df_consumo['CodigoArticulo'].isin(sku_index) &
+        df_consumo['BodegaDestino_Requerida'].isin(consumption_warehouse)
+    ]
+    history = (
+        pd.to_numeric(df_consumo_sel['CantidadSolicitada'], errors='coerce').clip(lower=0)
+        .groupby([df_consumo_sel['CodigoArticulo'], df_consumo_sel['FechaSolicitud'].dt.floor('D')]).sum()
+        .unstack(fill_value=0)
+        .reindex(index=sku_index, columns=dias_historicos, fill_value=0)
+        .to_numpy(dtype=float)
+    )
+
+    # --- 3. Llegadas de OCs existentes (matriz SKU x día del horizonte) ---
+    dias_horizonte = pd.date_range(start=today, periods=horizon_days, freq='D')
+    fechas_oc = pd.to_datetime(df_oc['Fecha de entrega de la línea'], errors='coerce').dt.floor('D')
+    cantidades_oc = pd.to_numeric(df_oc['Cantidad'], errors='coerce')
+    mask_oc = df_oc['Número de artículo'].isin(sku_index) & (cantidades_oc > 0) & (fechas_oc >= today)
+    arrivals = (
+        cantidades_oc[mask_oc]
+        .groupby([df_oc.loc[mask_oc, 'Número de artículo'], fechas_oc[mask_oc]]).sum()
+        .unstack(fill_value=0)
+        .reindex(index=sku_index, columns=dias_horizonte, fill_value=0)
+        .to_numpy(dtype=float)
+    )
+
+    # --- 4. Evaluación por lotes de SKUs ---
+    # El buffer de pedidos en tránsito escala con el Lead Time: se acota el lote en consecuencia
+    policies_per_sku = len(build_policy_grid(1.0, lead_time_days))
+    cells_per_sku = policies_per_sku * n_paths * max(1, lead_time_days)
+    chunk_skus = int(max(1, max_batch_cells // cells_per_sku))
+
+    results = []
+    for start in range(0, len(skus), chunk_skus):
+        chunk = np.arange(start, min(start + chunk_skus, len(skus)))
+
+        demand = np.stack([
+            simulator.bootstrap_demand_paths(history[i], horizon_days, n_paths, block_days, rng)
+            for i in chunk
+        ])
+        daily_mean = history[chunk].mean(axis=1)
+
+        grids = []
+        for local_i, i in enumerate(chunk):
+            grid = build_policy_grid(daily_mean[local_i], lead_time_days)
+            grid['_sku_local'] = local_i
+            grids.append(grid)
+        df_grid = pd.concat(grids, ignore_index=True)
+        policy_sku = df_grid['_sku_local'].to_numpy()
+
+        stockout, avg_units, n_orders = simulate_policies(
+            initial_stock[chunk],
+            arrivals[chunk],
+            demand,
+            policy_sku,
+            df_grid['s / R'].to_numpy(dtype=float),
+            df_grid['S / Q'].to_numpy(dtype=float),
+            (df_grid['Política'] == "(s, S)").to_numpy(),
+            lead_time_days
+        )
+
+        cost = unit_cost[chunk][policy_sku]
+        holding_value = avg_units * cost
+        df_grid['Días Quiebre Esperados'] = stockout
+        df_grid['Stock Prom. (Uds.)'] = avg_units
+        df_grid['Valor Inventario Prom.'] = holding_value
+        df_grid['Pedidos Esperados'] = n_orders
+        df_grid['Costo Total'] = (
+            stockout * daily_mean[policy_sku] * cost * config.STOCKOUT_DAY_COST_FACTOR
+            + holding_value * config.HOLDING_COST_RATE_ANNUAL * horizon_days / 365
+        )
+        df_grid['SKU'] = sku_index[chunk].to_numpy()[policy_sku]
+
+        # Referencia: quiebres si no se emite ningún pedido nuevo
+        sin_pedidos = df_grid[df_grid['Política'] == "Sin pedidos"].set_index('SKU')['Días Quiebre Esperados']
+
+        # Mejor política por SKU (a igual costo, menos días de quiebre)
+        df_grid = df_grid.sort_values(['SKU', 'Costo Total', 'Días Quiebre Esperados'])
+        best = df_grid.drop_duplicates(subset=['SKU'], keep='first').copy()
+        best['Días Quiebre (sin pedir)'] = best['SKU'].map(sin_pedidos)
+        results.append(best)
+
+    df_best = pd.concat(results, ignore_index=True)
+    df_best['Nombre'] = df_best['SKU'].map(mapa_nombres).fillna("N/A")
+    df_best.loc[df_best['Política'] == "Sin pedidos", ['s / R', 'S / Q']] = np.nan
+
+    return df_best[POLICY_COLUMNS].sort_values(by='Costo Total', ascending=False).reset_index(drop=True)
@@ -0,0 +1,211 @@
+# --- ARCHIVO: src/perf.py ---
+# (NUEVO ARCHIVO: spans de tiempo/memoria para los caminos críticos y registro de caches)
+
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pandas as pd
+
+import config
+
+_env = os.environ.get('FLUX_PERF', '').strip().lower()
+_enabled = config.PERF_ENABLED or _env not in ('', '0', 'false')
+_track_memory = config.PERF_TRACK_MEMORY or _env == 'mem'
+
+_spans = deque(maxlen=config.PERF_MAX_SPANS)
+_spans_lock = threading.Lock()
+_local = threading.local()
+_caches = {} # nombre -> función sin argumentos que retorna stats() (ver memo_cache.SizedLRUCache)
+
+MB = 1024 ** 2
+
+
+class _NoopSpan:
+    """Span vacío: lo único que se ejecuta cuando la instrumentación está desactivada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **meta):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _stack() -> list:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Span:
+    """
+    Mide el tiempo (perf_counter) de un bloque y, si tracemalloc está activo,
+    el pico de memoria sobre el nivel de entrada. Los spans se anidan por hilo
+    (cada sesión de Streamlit corre en su propio hilo), guardando el span padre.
+    """
+    __slots__ = ('name', 'meta', 'parent', 'depth', 'start', 'mem_start', 'peak')
+
+    def __init__(self, name: str, meta: dict):
+        self.name = name
+        self.meta = meta
+
+    def set(self, **meta):
+        """Agrega metadatos al span (p. ej. filas procesadas) antes de cerrarlo."""
+        self.meta.update(meta)
+
+    def __enter__(self):
+        stack = _stack()
+        parent = stack[-1] if stack else None
+        self.parent = parent.name if parent else None
+        self.depth = len(stack)
+        self.mem_start = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None and parent.mem_start is not None:
+                parent.peak = max(parent.peak, peak) # Conserva el pico del padre antes de reiniciarlo
+            tracemalloc.reset_peak()
+            self.mem_start = self.peak = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+
+        mem_peak_mb = None
+        if self.mem_start is not None and tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            mem_peak_mb = (self.peak - self.mem_start) / MB
+            if stack and stack[-1].mem_start is not None:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+
+        record = {
+            'timestamp': pd.Timestamp.now(),
+            'span': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'ms': elapsed * 1000,
+            'mem_peak_mb': mem_peak_mb,
+            'error': exc_type.__name__ if exc_type else None,
+            'thread': threading.current_thread().name,
+            'meta': self.meta or None,
+        }
+        with _spans_lock:
+            _spans.append(record)
+        return False
+
+
+def span(name: str, **meta):
+    """
+    Context manager que registra un span:
+
+        with perf.span('radar.sku_loop', skus=len(all_skus)):
+            ...
+
+    Con la instrumentación desactivada retorna un objeto vacío compartido (sin
+    medir nada), así que se puede dejar en los caminos críticos.
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, meta)
+
+
+def timed(name: str | None = None):
+    """Decorador: registra un span por llamada (nombre por defecto: módulo.función)."""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def is_tracking_memory() -> bool:
+    return _enabled and tracemalloc.is_tracing()
+
+
+def enable(track_memory: bool = False):
+    """Activa la instrumentación en todo el proceso (opcionalmente con tracemalloc)."""
+    global _enabled
+    _enabled = True
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Desactiva la instrumentación y detiene tracemalloc si estaba activo."""
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def clear():
+    with _spans_lock:
+        _spans.clear()
+
+
+def recent_spans(limit: int | None = None) -> pd.DataFrame:
+    """Últimos spans registrados (el más reciente primero)."""
+    with _spans_lock:
+        records = list(_spans)
+    if limit is not None:
+        records = records[-limit:]
+    columns = ['timestamp', 'span', 'parent', 'depth', 'ms', 'mem_peak_mb', 'error', 'thread', 'meta']
+    return pd.DataFrame(records[::-1], columns=columns)
+
+
+def span_summary() -> pd.DataFrame:
+    """Por nombre de span: llamadas, tiempo total, p50/p95/máximo (ms) y pico de memoria máximo."""
+    df = recent_spans()
+    if df.empty:
+        return pd.DataFrame(columns=['span', 'llamadas', 'total_ms', 'p50_ms', 'p95_ms', 'max_ms', 'mem_peak_mb', 'ultima'])
+    grouped = df.groupby('span')
+    summary = pd.DataFrame({
+        'llamadas': grouped.size(),
+        'total_ms': grouped['ms'].sum(),
+        'p50_ms': grouped['ms'].median(),
+        'p95_ms': grouped['ms'].quantile(0.95),
+        'max_ms': grouped['ms'].max(),
+        'mem_peak_mb': pd.to_numeric(df['mem_peak_mb'], errors='coerce').groupby(df['span']).max(),
+        'ultima': grouped['timestamp'].max(),
+    })
+    return summary.sort_values('total_ms', ascending=False).reset_index()
+
+
+def register_cache(name: str, stats_fn):
+    """Registra un cache para la página de Rendimiento. 'stats_fn()' retorna un dict como SizedLRUCache.stats()."""
+    _caches[name] = stats_fn
+
+
+def cache_stats() -> pd.DataFrame:
+    """Estado de los caches registrados (aciertos, fallos, tasa de acierto, tamaño)."""
+    rows = [{'cache': name, **stats_fn()} for name, stats_fn in _caches.items()]
+    return pd.DataFrame(rows)
+
+
+if _enabled and _track_memory:
+    tracemalloc.start()
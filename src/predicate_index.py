@@ -0,0 +1,183 @@
+# --- ARCHIVO: src/predicate_index.py ---
+# (NUEVO ARCHIVO: índice de posiciones de fila para los filtros que se repiten en el Radar, el Simulador y las páginas)
+
+import numpy as np
+import pandas as pd
+
+import cache_manager
+import perf
+
+_EMPTY = np.array([], dtype=np.int32)
+
+
+def _positions_dtype(n_rows: int):
+    return np.int32 if n_rows < np.iinfo(np.int32).max else np.int64
+
+
+class KeyPositions:
+    """
+    Filas de cada valor de una columna (SKU, bodega, familia), en formato
+    compacto: todas las posiciones ordenadas por valor en un solo arreglo y el
+    tramo [inicio, fin) de cada valor. Las posiciones de un valor quedan
+    ordenadas (mismo orden que el filtro booleano equivalente). Los vacíos no se indexan.
+    """
+
+    def __init__(self, values: pd.Series):
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        n_missing = int((codes < 0).sum())
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self._rows = order[n_missing:].astype(_positions_dtype(len(codes)))
+        self._offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._offsets[1:])
+        self._codes = {value: code for code, value in enumerate(uniques)}
+
+    def __len__(self):
+        return len(self._codes)
+
+    def get(self, value) -> np.ndarray:
+        """Posiciones con columna == value (arreglo vacío si el valor no existe)."""
+        code = self._codes.get(value)
+        if code is None:
+            return _EMPTY
+        return self._rows[self._offsets[code]:self._offsets[code + 1]]
+
+    def get_many(self, values) -> np.ndarray:
+        """Posiciones (ordenadas) con columna en 'values'. Los tramos no se solapan: basta concatenar y ordenar."""
+        parts = [self.get(value) for value in pd.unique(np.asarray(list(values), dtype=object))]
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return _EMPTY
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+
+class SortedDates:
+    """Fechas de una columna ordenadas, con su fila de origen: un rango de fechas se resuelve con búsqueda binaria."""
+
+    def __init__(self, values: pd.Series):
+        dates = pd.to_datetime(values, errors='coerce').to_numpy(dtype='datetime64[ns]')
+        valid = np.flatnonzero(~np.isnat(dates))
+        order = np.argsort(dates[valid], kind='stable')
+        self._dates = dates[valid][order]
+        self._rows = valid[order].astype(_positions_dtype(len(dates)))
+
+    def between(self, start=None, end=None) -> np.ndarray:
+        """Posiciones (ordenadas) con start <= fecha < end (None = sin límite). Las fechas vacías no entran."""
+        lo = 0 if start is None else np.searchsorted(self._dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        hi = len(self._dates) if end is None else np.searchsorted(self._dates, np.datetime64(pd.Timestamp(end), 'ns'), side='left')
+        return np.sort(self._rows[lo:hi])
+
+
+class FrameIndex:
+    """
+    Índice de predicados sobre UN DataFrame (no guarda el DataFrame: solo
+    posiciones de fila, para 'df.iloc[...]').
+
+    - keys: columnas de igualdad / pertenencia ('equals', 'isin').
+    - dates: columnas de fecha para rangos ('since', 'between').
+    - flags: {nombre: función(df) -> máscara booleana} de filtros fijos
+      (p. ej. Cantidad > 0), evaluados una sola vez. Un vacío en la máscara
+      (columnas enteras nullable, ver frame_compaction) cuenta como falso,
+      igual que NaN > 0.
+
+    Las columnas que no existen en el DataFrame no se indexan; consultarlas
+    lanza KeyError, igual que filtrar el DataFrame por esa columna.
+    Los filtros combinados se resuelven con 'intersect' sobre las posiciones.
+    """
+
+    def __init__(self, df: pd.DataFrame, keys=(), dates=(), flags=None):
+        self.n_rows = len(df)
+        self._keys = {col: KeyPositions(df[col]) for col in keys if col in df.columns}
+        self._dates = {col: SortedDates(df[col]) for col in dates if col in df.columns}
+        self._flags = {}
+        dtype = _positions_dtype(self.n_rows)
+        for name, mask in (flags or {}).items():
+            try:
+                selected = pd.Series(mask(df)).to_numpy(dtype=bool, na_value=False)
+                self._flags[name] = np.flatnonzero(selected).astype(dtype)
+            except KeyError:
+                pass
+
+    def equals(self, col: str, value) -> np.ndarray:
+        return self._keys[col].get(value)
+
+    def isin(self, col: str, values) -> np.ndarray:
+        return self._keys[col].get_many(values)
+
+    def since(self, col: str, start) -> np.ndarray:
+        return self._dates[col].between(start=start)
+
+    def between(self, col: str, start=None, end=None) -> np.ndarray:
+        return self._dates[col].between(start, end)
+
+    def flag(self, name: str) -> np.ndarray:
+        return self._flags[name]
+
+    @staticmethod
+    def intersect(*positions) -> np.ndarray | None:
+        """
+        Intersección de varios conjuntos de posiciones ordenadas (sin repetidos).
+        None significa "todas las filas" y no restringe; si todos son None retorna None.
+        """
+        selected = sorted((p for p in positions if p is not None), key=len)
+        if not selected:
+            return None
+        result = selected[0]
+        for other in selected[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+
+def take(df: pd.DataFrame, positions: np.ndarray | None) -> pd.DataFrame:
+    """Filas de 'df' en 'positions' (None = el DataFrame completo, sin copiar)."""
+    return df if positions is None else df.iloc[positions]
+
+
+# Columnas indexadas de cada tabla (ver data_loader.DATASETS)
+TABLES = {
+    'stock': {
+        'keys': ('CodigoArticulo', 'CodigoBodega', 'Familia'),
+        'flags': {'con_stock': lambda df: pd.to_numeric(df['DisponibleParaPrometer'], errors='coerce') > 0},
+    },
+    'consumo': {
+        'keys': ('CodigoArticulo', 'BodegaDestino_Requerida'),
+        'dates': ('FechaSolicitud',),
+    },
+    'oc': {
+        'keys': ('Número de artículo',),
+        'dates': ('Fecha de entrega de la línea',),
+        'flags': {'cantidad_positiva': lambda df: pd.to_numeric(df['Cantidad'], errors='coerce') > 0},
+    },
+}
+
+
+@cache_manager.cached('derivados')
+def get_table_index(_df, table: str, data_version) -> FrameIndex:
+    """
+    Índice de una tabla vigente ('stock', 'consumo' u 'oc'), uno por versión de
+    datos y compartido por todas las sesiones. Las posiciones solo valen para
+    el MISMO DataFrame con que se construyó. Con data_version=None no se cachea.
+    """
+    with perf.span(f'predicate_index.{table}', filas=len(_df)):
+        return FrameIndex(_df, **TABLES[table])
+
+
+class DataIndex:
+    """Índices de Stock, Consumo y OPOR de una misma versión de datos."""
+    __slots__ = ('stock', 'consumo', 'oc')
+
+    def __init__(self, stock: FrameIndex, consumo: FrameIndex, oc: FrameIndex):
+        self.stock = stock
+        self.consumo = consumo
+        self.oc = oc
+
+
+def get_data_index(df_stock, df_consumo, df_oc, data_version) -> DataIndex:
+    """Los tres índices (cada uno cacheado por separado: una página que solo usa Stock no construye los demás)."""
+    return DataIndex(
+        get_table_index(df_stock, 'stock', data_version),
+        get_table_index(df_consumo, 'consumo', data_version),
+        get_table_index(df_oc, 'oc', data_version),
+    )
@@ -3,8 +3,11 @@
 
 import pandas as pd
 import numpy as np
-import streamlit as st
 from src import config # Importa la configuración
+import analysis # Recomendación de pedido en lote (compartida con el simulador)
+import perf # Spans de rendimiento (mismo módulo que usan las páginas)
+import cache_manager # Cache del radar (espacio 'radar': TTL 1 hora, invalidado por versión de datos)
+import predicate_index # Posiciones de fila por SKU, bodega y familia (sin recorrer las tablas completas)
 
 def _calculate_sku_kpis(
     sku, 
@@ -20,8 +23,10 @@ def _calculate_sku_kpis(
 
         Esta función toma los datos filtrados de stock, consumo (demanda) y 
         órdenes de compra (OC) para un SKU específico, y calcula métricas
-        esenciales como el Punto de Reorden (ROP), Stock de Seguridad (SS),
-        Días de Cobertura (DOS) y una sugerencia de pedido.
+        esenciales como el Punto de Reorden (ROP), Stock de Seguridad (SS) y
+        Días de Cobertura (DOS). La proyección en LT y la sugerencia de pedido
+        se calculan después, para todos los SKUs a la vez, con
+        'analysis.calculate_order_recommendations_batch'.
 
         Parámetros:
         -----------
@@ -50,8 +55,7 @@ def _calculate_sku_kpis(
         dict
             Un diccionario que contiene todos los KPIs calculados para el SKU.
             Las claves incluyen: "SKU", "Nombre", "Stock Actual", "DOS (Días)",
-            "ROP", "Stock Proy. (en LT)", "Pedido Sugerido", "Alerta Stock (vs SS)",
-            "Alerta Proy. (vs ROP)", "Próx. Llegada", "Demanda Prom. Diaria".
+            "ROP", "Alerta Stock (vs SS)", "Próx. Llegada", "Demanda Prom. Diaria".
         None
             Retorna None si se produce una excepción durante el procesamiento del SKU.
         """
@@ -127,10 +131,6 @@ def _calculate_sku_kpis(
             (df_oc_sku['Fecha de entrega de la línea'] >= today)
         ]
         
-        # Agrupa las llegadas por fecha y suma las cantidades (por si hay varias OC el mismo día).
-        # Esto crea una Serie de Pandas (Fecha -> Cantidad).
-        llegadas_map = df_llegadas.groupby('Fecha de entrega de la línea')['Cantidad'].sum()
-        
         # Encuentra la fecha de la próxima llegada más cercana.
         next_arrival_date = df_llegadas['Fecha de entrega de la línea'].min()
         
@@ -141,33 +141,10 @@ def _calculate_sku_kpis(
             # Formatea la fecha a string para el reporte.
             next_arrival_date = next_arrival_date.strftime('%Y-%m-%d')
 
-        # --- 6. Lógica de Recomendación (Proyección) ---
-        # Calcula la fecha en que llegaría un pedido hecho hoy (Hoy + Lead Time).
-        forecast_date = today + pd.DateOffset(days=lead_time_days)
-        
-        # Suma todas las llegadas programadas *dentro* de la ventana de Lead Time (entre hoy y la 'forecast_date').
-        llegadas_en_lt = llegadas_map[llegadas_map.index <= forecast_date].sum()
-        
-        # Proyecta el stock al final del Lead Time:
-        # Stock Proyectado = Stock Actual + Llegadas en LT - Demanda en LT
-        projected_stock_at_lt = initial_stock + llegadas_en_lt - (daily_demand_mean * lead_time_days)
-
-        # Inicializa la cantidad sugerida de pedido.
-        suggested_order_qty = 0.0
-        # Comprueba si el stock proyectado al final del LT estará por debajo del ROP.
-        if projected_stock_at_lt < reorder_point:
-            # Si es así, sugiere pedir la diferencia para volver a cubrir el ROP.
-            # (Esta es una política de "pedir hasta ROP"; otras políticas podrían pedir hasta un "Máximo").
-            suggested_order_qty = reorder_point - projected_stock_at_lt
-            # Asegura que la cantidad sugerida no sea negativa (por si acaso).
-            suggested_order_qty = max(0.0, suggested_order_qty)
-
-        # --- 7. Alertas ---
+        # --- 6. Alertas ---
         # Alerta si el stock *actual* ya está por debajo del Stock de Seguridad.
+        # (La alerta proyectada vs ROP se calcula en lote en 'run_full_radar_analysis').
         alert_stock_actual = initial_stock < safety_stock
-        # Alerta si el stock *proyectado* caerá por debajo del ROP (¡necesita pedir!).
-        # Esta es la misma condición que se usa para sugerir el pedido.
-        alert_proyectada = projected_stock_at_lt < reorder_point
 
         # Retorna un diccionario con todos los KPIs calculados para este SKU.
         return {
@@ -177,10 +154,7 @@ def _calculate_sku_kpis(
             "Stock Actual": initial_stock,
             "DOS (Días)": days_of_supply,
             "Alerta Stock (vs SS)": "🔴" if alert_stock_actual else "🟢",
-            "Stock Proy. (en LT)": projected_stock_at_lt,
             "ROP": reorder_point,
-            "Alerta Proy. (vs ROP)": "🔴" if alert_proyectada else "🟢",
-            "Pedido Sugerido": suggested_order_qty,
             "Próx. Llegada": next_arrival_date,
             "Demanda Prom. Diaria": daily_demand_mean
         }
@@ -193,8 +167,9 @@ def _calculate_sku_kpis(
         return None
 
 
-@st.cache_data(ttl=3600)
-def run_full_radar_analysis(
+@cache_manager.cached('radar')
+@perf.timed('radar.compute_radar')
+def compute_radar(
     _df_stock_full,     # <-- Renombrado para claridad
     _df_consumo_full,   # <-- Renombrado para claridad
     _df_oc_full,        # <-- Renombrado para claridad
@@ -202,91 +177,145 @@ def run_full_radar_analysis(
     bodega_stock_sel,
     bodega_consumo_sel,
     lead_time_days,
-    service_level_z
+    service_level_z,
+    data_version=None,  # <-- Huella de los datos: forma parte de la clave del cache (None = sin cache)
+    _progress=None      # <-- función(fracción, texto) para mostrar el avance; no es parte de la clave
 ):
-    # --- 1. (NUEVO) Filtrado por Familia ---
-    if familia_sel != "Todas":
-        try:
-            # Filtra stock por familia
-            _df_stock = _df_stock_full[_df_stock_full['Familia'] == familia_sel].copy()
+    """
+    Radar de inventario de una familia (o "Todas") en un par de bodegas.
+    No usa Streamlit: se llama igual desde la página y desde el precalentamiento
+    (warmup), que corre en otro hilo. La página entrega '_progress' para su
+    barra de avance; en un acierto del cache no se llama.
+
+    Retorna (df_results, aviso): 'aviso' es None o (nivel, mensaje), con nivel
+    'warning' o 'error', para que quien llama lo muestre (p. ej. familia sin
+    SKUs de stock); en ese caso df_results viene vacío. Ambos se cachean juntos.
+    """
+    with perf.span('radar.prepare', familia=familia_sel):
+        # Índice de la versión de datos: los filtros se resuelven con posiciones de fila
+        index = predicate_index.get_data_index(_df_stock_full, _df_consumo_full, _df_oc_full, data_version)
+        intersect = predicate_index.FrameIndex.intersect
+
+        # --- 1. (NUEVO) Filtrado por Familia ---
+        filas_stock = filas_consumo = filas_oc = None # None = todas las filas ("Todas")
+        if familia_sel != "Todas":
+            try:
+                # Filtra stock por familia
+                filas_stock = index.stock.equals('Familia', familia_sel)
             
-            if _df_stock.empty:
-                st.warning(f"No se encontraron SKUs de stock para la familia '{familia_sel}'.")
-                return pd.DataFrame() # Retorna DF vacío
+                if not len(filas_stock):
+                    return pd.DataFrame(), ('warning', f"No se encontraron SKUs de stock para la familia '{familia_sel}'.")
 
-            # Obtiene SKUs de esa familia
-            # (Asegúrate que la columna de SKU se llame 'CodigoArticulo' en Stock)
-            skus_de_familia = _df_stock['CodigoArticulo'].unique() 
+                # Obtiene SKUs de esa familia
+                # (Asegúrate que la columna de SKU se llame 'CodigoArticulo' en Stock)
+                skus_de_familia = _df_stock_full['CodigoArticulo'].iloc[filas_stock].unique()
             
-            # Filtra consumo y OC por esos SKUs
-            _df_consumo = _df_consumo_full[_df_consumo_full['CodigoArticulo'].isin(skus_de_familia)].copy()
-            _df_oc = _df_oc_full[_df_oc_full['Número de artículo'].isin(skus_de_familia)].copy()
+                # Filtra consumo y OC por esos SKUs
+                filas_consumo = index.consumo.isin('CodigoArticulo', skus_de_familia)
+                filas_oc = index.oc.isin('Número de artículo', skus_de_familia)
         
-        except KeyError as e:
-            st.error(f"Error: No se encontró la columna 'Familia' o 'SKU' en los DataFrames. Detalle: {e}")
-            return pd.DataFrame()
-    else:
-        # Si es "Todas", usa los dataframes completos
-        _df_stock = _df_stock_full.copy()
-        _df_consumo = _df_consumo_full.copy()
-        _df_oc = _df_oc_full.copy()
+            except KeyError as e:
+                return pd.DataFrame(), ('error', f"Error: No se encontró la columna 'Familia' o 'SKU' en los DataFrames. Detalle: {e}")
 
+        _df_stock = predicate_index.take(_df_stock_full, filas_stock)
 
-    # --- 2. Preparar Datos (Filtros de Bodega) ---
-    # (Este código ya lo tenías, se queda igual)
-    df_stock = _df_stock[_df_stock['CodigoBodega'] == bodega_stock_sel].copy()
-    df_consumo = _df_consumo[_df_consumo['BodegaDestino_Requerida'] == bodega_consumo_sel].copy()
+        # --- 2. Preparar Datos (Filtros de Bodega) ---
+        df_stock = predicate_index.take(
+            _df_stock_full, intersect(filas_stock, index.stock.equals('CodigoBodega', bodega_stock_sel))
+        )
+        df_consumo = predicate_index.take(
+            _df_consumo_full, intersect(filas_consumo, index.consumo.equals('BodegaDestino_Requerida', bodega_consumo_sel))
+        )
     
-    # Pre-limpieza de OCs
-    df_oc = _df_oc.copy() # _df_oc ya está filtrado por familia
-    df_oc['Fecha de entrega de la línea'] = pd.to_datetime(df_oc['Fecha de entrega de la línea'], format='%Y-m-%d', errors='coerce')
-    df_oc['Cantidad'] = pd.to_numeric(df_oc['Cantidad'], errors='coerce')
+        # Pre-limpieza de OCs (sobre las líneas de la familia)
+        df_oc = predicate_index.take(_df_oc_full, filas_oc).copy()
+        df_oc['Fecha de entrega de la línea'] = pd.to_datetime(df_oc['Fecha de entrega de la línea'], format='%Y-m-%d', errors='coerce')
+        df_oc['Cantidad'] = pd.to_numeric(df_oc['Cantidad'], errors='coerce')
 
-    # Mapa de nombres
-    mapa_nombres = _df_stock.drop_duplicates(subset=['CodigoArticulo']).set_index('CodigoArticulo')['NombreArticulo'].to_dict()
+        # Mapa de nombres
+        mapa_nombres = _df_stock.drop_duplicates(subset=['CodigoArticulo']).set_index('CodigoArticulo')['NombreArticulo'].to_dict()
 
-    # Lista de SKUs a procesar (todos los que tienen stock o consumo)
-    skus_stock = df_stock['CodigoArticulo'].unique()
-    skus_consumo = df_consumo['CodigoArticulo'].unique()
-    all_skus = sorted(list(set(skus_stock) | set(skus_consumo)))
+        # Lista de SKUs a procesar (todos los que tienen stock o consumo)
+        skus_stock = df_stock['CodigoArticulo'].unique()
+        skus_consumo = df_consumo['CodigoArticulo'].unique()
+        all_skus = sorted(list(set(skus_stock) | set(skus_consumo)))
+
+        # Filas de cada SKU en las tablas ya filtradas (una pasada por tabla, no una por SKU)
+        por_sku_stock = predicate_index.FrameIndex(df_stock, keys=('CodigoArticulo',))
+        por_sku_consumo = predicate_index.FrameIndex(df_consumo, keys=('CodigoArticulo',))
+        por_sku_oc = predicate_index.FrameIndex(df_oc, keys=('Número de artículo',))
     
     results_list = []
     
-    # Barra de progreso
-    progress_bar = st.progress(0, text="Iniciando análisis masivo...")
+    with perf.span('radar.sku_loop', skus=len(all_skus)):
+        if _progress is not None:
+            _progress(0.0, "Iniciando análisis masivo...")
 
-    # --- 2. Iterar por cada SKU ---
-    for i, sku in enumerate(all_skus):
+        # --- 2. Iterar por cada SKU ---
+        for i, sku in enumerate(all_skus):
         
-        # Filtrar dataframes para este SKU (eficiente)
-        df_stock_sku = df_stock[df_stock['CodigoArticulo'] == sku]
-        df_consumo_sku = df_consumo[df_consumo['CodigoArticulo'] == sku]
-        df_oc_sku = df_oc[df_oc['Número de artículo'] == sku]
+            # Filtrar dataframes para este SKU (posiciones del índice)
+            df_stock_sku = df_stock.iloc[por_sku_stock.equals('CodigoArticulo', sku)]
+            df_consumo_sku = df_consumo.iloc[por_sku_consumo.equals('CodigoArticulo', sku)]
+            df_oc_sku = df_oc.iloc[por_sku_oc.equals('Número de artículo', sku)]
         
-        # Calcular KPIs
-        kpis = _calculate_sku_kpis(
-            sku, 
-            df_stock_sku, 
-            df_consumo_sku, 
-            df_oc_sku, 
-            mapa_nombres,
-            lead_time_days, 
-            service_level_z
-        )
+            # Calcular KPIs
+            kpis = _calculate_sku_kpis(
+                sku, 
+                df_stock_sku, 
+                df_consumo_sku, 
+                df_oc_sku, 
+                mapa_nombres,
+                lead_time_days, 
+                service_level_z
+            )
         
-        if kpis:
-            results_list.append(kpis)
+            if kpis:
+                results_list.append(kpis)
             
-        # Actualizar barra de progreso
-        progress_bar.progress((i + 1) / len(all_skus), text=f"Procesando SKU: {sku} ({i+1}/{len(all_skus)})")
-
-    progress_bar.empty() # Limpiar barra
+            # Informar el avance (barra de progreso de la página)
+            if _progress is not None:
+                _progress((i + 1) / len(all_skus), f"Procesando SKU: {sku} ({i+1}/{len(all_skus)})")
     
     if not results_list:
-        return pd.DataFrame() # Retorna DF vacío si no hay resultados
+        return pd.DataFrame(), None # Sin SKUs con stock o consumo en esas bodegas
 
-    # --- 3. Retornar DataFrame final ---
     df_results = pd.DataFrame(results_list)
+
+    # --- 3. Proyección y Recomendación en Lote ---
+    with perf.span('radar.batch_projection', skus=len(df_results)):
+        # Matriz (SKU x día) de stock proyectado hasta el Lead Time:
+        # Stock Actual + Llegadas acumuladas - Demanda diaria * días transcurridos.
+        today = pd.Timestamp.now().floor('D')
+        dates = pd.date_range(start=today, periods=int(lead_time_days) + 1, freq='D')
+        sku_index = pd.Index(df_results['SKU'])
+
+        df_llegadas = df_oc[
+            (df_oc['Cantidad'] > 0) &
+            (df_oc['Fecha de entrega de la línea'] >= today) &
+            (df_oc['Número de artículo'].isin(sku_index))
+        ]
+        llegadas = (
+            df_llegadas.groupby(['Número de artículo', df_llegadas['Fecha de entrega de la línea'].dt.floor('D')])['Cantidad'].sum()
+            .unstack(fill_value=0)
+            .reindex(index=sku_index, columns=dates, fill_value=0)
+            .to_numpy(dtype=float)
+        )
+        projection = (
+            df_results['Stock Actual'].to_numpy(dtype=float)[:, None]
+            + llegadas.cumsum(axis=1)
+            - df_results['Demanda Prom. Diaria'].to_numpy(dtype=float)[:, None] * np.arange(len(dates))
+        )
+
+        # Misma ruta de recomendación que las simulaciones (comparando contra el ROP)
+        reco = analysis.calculate_order_recommendations_batch(
+            projection, dates, lead_time_days, df_results['ROP'].to_numpy(dtype=float)
+        )
+        df_results['Stock Proy. (en LT)'] = reco['projected_stock_at_lt'].to_numpy()
+        df_results['Pedido Sugerido'] = reco['suggested_order_qty'].to_numpy()
+        df_results['Alerta Proy. (vs ROP)'] = np.where(reco['is_below'], "🔴", "🟢")
+
+    # --- 4. Retornar DataFrame final ---
     
     # Organizar columnas
     column_order = [
@@ -296,4 +325,4 @@ def run_full_radar_analysis(
     ]
     df_results = df_results[column_order]
     
-    return df_results
\ No newline at end of file
+    return df_results, None
\ No newline at end of file
@@ -0,0 +1,165 @@
+# --- ARCHIVO: src/residential_agg.py ---
+# (NUEVO ARCHIVO: limpieza, KPIs por año y agregaciones del lado del servidor para Residencial)
+
+import numpy as np
+import pandas as pd
+
+import downsample
+import cache_manager
+
+HISTOGRAM_MAX_BINS = 30
+
+COL_GANADO = 'Fecha de ganado'
+COL_INICIO = 'Fecha de inicio de instalación real'
+COL_TERMINO = 'Fecha de término de instalación real'
+
+
+def prepare_residential_frames(df_residencial: pd.DataFrame):
+    """
+    Limpia BD_Master_Residencial y crea los TRES DataFrames de la página:
+
+    1. df_ventas: para KPIs de ventas. Solo requiere datos de venta.
+    2. df_iniciados: ciclo venta -> inicio de instalación ('Dias (Venta a Inicio)' >= 0).
+    3. df_terminados: ejecución inicio -> término ('Dias (Ejecución Inicio a Fin)' >= 0).
+    """
+    df = df_residencial.copy()
+    df['kWp'] = pd.to_numeric(df['kWp'], errors='coerce')
+    for col in (COL_GANADO, COL_INICIO, COL_TERMINO):
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    df_ventas = df.dropna(subset=[COL_GANADO, 'kWp', 'CeCo']).copy()
+    df_ventas['Mes Fecha de ganado'] = df_ventas[COL_GANADO].dt.to_period('M').astype(str)
+
+    df_iniciados = df.dropna(subset=[COL_GANADO, COL_INICIO, 'kWp', 'CeCo']).copy()
+    df_terminados = df.dropna(subset=[COL_GANADO, COL_INICIO, COL_TERMINO, 'kWp', 'CeCo']).copy()
+
+    if not df_iniciados.empty:
+        # Días desde la venta hasta el inicio de la instalación (se filtran datos ilógicos)
+        df_iniciados['Dias (Venta a Inicio)'] = (df_iniciados[COL_INICIO] - df_iniciados[COL_GANADO]).dt.days
+        df_iniciados = df_iniciados[df_iniciados['Dias (Venta a Inicio)'] >= 0].copy()
+
+    if not df_terminados.empty:
+        # Días de ejecución (inicio a fin)
+        df_terminados['Dias (Ejecución Inicio a Fin)'] = (df_terminados[COL_TERMINO] - df_terminados[COL_INICIO]).dt.days
+        df_terminados = df_terminados[df_terminados['Dias (Ejecución Inicio a Fin)'] >= 0].copy()
+
+    return df_ventas, df_iniciados, df_terminados
+
+
+def _cycle_stats(df: pd.DataFrame, years: pd.Series, col: str, prefix: str) -> pd.DataFrame:
+    """Promedio, mediana y P90 de 'col' por año de venta."""
+    if df.empty or col not in df.columns:
+        return pd.DataFrame(columns=[f'{prefix}_Prom', f'{prefix}_P50', f'{prefix}_P90'])
+    grouped = df[col].groupby(years)
+    return pd.DataFrame({
+        f'{prefix}_Prom': grouped.mean(),
+        f'{prefix}_P50': grouped.median(),
+        f'{prefix}_P90': grouped.quantile(0.9),
+    })
+
+
+def yearly_kpis(df_ventas: pd.DataFrame, df_iniciados: pd.DataFrame, df_terminados: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tabla de KPIs por año de VENTA ('Fecha de ganado'), índice = año (desc).
+    Los tiempos de ciclo quedan en NaN si ese año no tiene proyectos iniciados/terminados.
+    """
+    ventas_year = df_ventas[COL_GANADO].dt.year
+    kpis = pd.DataFrame({
+        'Proyectos_Ganados': df_ventas['CeCo'].groupby(ventas_year).nunique(),
+        'kWp_Ganados': df_ventas['kWp'].groupby(ventas_year).sum(),
+    })
+    if not df_iniciados.empty:
+        kpis = kpis.join(_cycle_stats(df_iniciados, df_iniciados[COL_GANADO].dt.year, 'Dias (Venta a Inicio)', 'Venta_Inicio'))
+    if not df_terminados.empty:
+        kpis = kpis.join(_cycle_stats(df_terminados, df_terminados[COL_GANADO].dt.year, 'Dias (Ejecución Inicio a Fin)', 'Ejecucion'))
+    for prefix in ('Venta_Inicio', 'Ejecucion'):
+        for stat in ('Prom', 'P50', 'P90'):
+            if f'{prefix}_{stat}' not in kpis.columns:
+                kpis[f'{prefix}_{stat}'] = np.nan
+    kpis.index.name = 'Año'
+    return kpis.sort_index(ascending=False)
+
+
+def monthly_series(df: pd.DataFrame, date_col: str, value_col: str | None = None) -> pd.DataFrame:
+    """
+    Serie mensual compacta: una fila por mes con datos.
+    Columnas: 'Mes' (primer día del mes), 'N_Proyectos' y, si se indica
+    'value_col', su suma en 'Suma'. Equivale a 'yearmonth(...)' + count()/sum()
+    de Vega-Lite, pero calculado aquí para enviar solo los puntos agregados.
+    """
+    fechas = df[date_col].dropna()
+    if fechas.empty:
+        columnas = ['Mes', 'N_Proyectos'] + (['Suma'] if value_col else [])
+        return pd.DataFrame(columns=columnas)
+
+    meses = fechas.dt.to_period('M').dt.to_timestamp()
+    grouped = df.loc[fechas.index].groupby(meses.rename('Mes'), sort=True)
+    result = grouped.size().rename('N_Proyectos').to_frame()
+    if value_col:
+        result['Suma'] = grouped[value_col].sum()
+    return result.reset_index()
+
+
+def _nice_step(span: float, maxbins: int) -> float:
+    """Paso "redondo" (1, 2 o 5 x 10^k) que cubre 'span' con a lo más 'maxbins' intervalos (como bin de Vega-Lite)."""
+    if span <= 0:
+        return 1.0
+    raw = span / maxbins
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for factor in (1, 2, 5, 10):
+        step = factor * magnitude
+        if span / step <= maxbins:
+            return float(step)
+    return float(10 * magnitude)
+
+
+def histogram_bins(values: pd.Series, maxbins: int = HISTOGRAM_MAX_BINS) -> pd.DataFrame:
+    """
+    Histograma con límites "redondos". Retorna una fila por intervalo con datos:
+    'Desde', 'Hasta' (intervalo [Desde, Hasta)), 'Cantidad' y 'Rango' (texto para el tooltip).
+    """
+    values = pd.to_numeric(values, errors='coerce').dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return pd.DataFrame(columns=['Desde', 'Hasta', 'Cantidad', 'Rango'])
+
+    step = _nice_step(values.max() - values.min(), maxbins)
+    start = np.floor(values.min() / step) * step
+    idx = np.floor((values - start) / step).astype(np.int64)
+    counts = np.bincount(idx)
+    bins = np.flatnonzero(counts)
+
+    desde = start + bins * step
+    hasta = desde + step
+    return pd.DataFrame({
+        'Desde': desde,
+        'Hasta': hasta,
+        'Cantidad': counts[bins],
+        'Rango': [f"{a:,.0f} – {b:,.0f}" for a, b in zip(desde, hasta)],
+    })
+
+
+def build_chart_aggregates(df_ventas: pd.DataFrame, df_iniciados: pd.DataFrame, df_terminados: pd.DataFrame) -> dict:
+    """Todas las series y bins que grafica la página Residencial (una vez por versión de datos)."""
+    return {
+        'ventas_mes': monthly_series(df_ventas, 'Fecha de ganado', 'kWp'),
+        'iniciados_mes': monthly_series(df_iniciados, 'Fecha de inicio de instalación real', 'kWp'),
+        'terminados_mes': monthly_series(df_terminados, 'Fecha de término de instalación real'),
+        'hist_venta_inicio': histogram_bins(df_iniciados['Dias (Venta a Inicio)'])
+            if 'Dias (Venta a Inicio)' in df_iniciados.columns else histogram_bins(pd.Series(dtype=float)),
+        # Dispersión kWp vs días: puntos originales o grilla (config.SCATTER_MAX_POINTS)
+        'scatter_kwp_dias': downsample.bin_scatter(df_iniciados[['CeCo', 'kWp', 'Dias (Venta a Inicio)']], 'kWp', 'Dias (Venta a Inicio)')
+            if 'Dias (Venta a Inicio)' in df_iniciados.columns else pd.DataFrame(columns=['kWp', 'Dias (Venta a Inicio)', 'N_Proyectos']),
+    }
+
+
+# --- Versiones cacheadas (una vez por versión de datos; las precalienta src/warmup.py) ---
+@cache_manager.cached('derivados')
+def get_residential_data(_df_residencial: pd.DataFrame, data_version):
+    """(df_ventas, df_iniciados, df_terminados, kpis_por_ano). Compartidos entre sesiones: solo lectura."""
+    df_ventas, df_iniciados, df_terminados = prepare_residential_frames(_df_residencial)
+    return df_ventas, df_iniciados, df_terminados, yearly_kpis(df_ventas, df_iniciados, df_terminados)
+
+
+@cache_manager.cached('derivados')
+def get_chart_aggregates(_df_ventas: pd.DataFrame, _df_iniciados: pd.DataFrame, _df_terminados: pd.DataFrame, data_version) -> dict:
+    return build_chart_aggregates(_df_ventas, _df_iniciados, _df_terminados)
@@ -0,0 +1,168 @@
+# --- ARCHIVO: src/search_index.py ---
+# (NUEVO ARCHIVO: índice invertido de trigramas para búsquedas de texto)
+
+import re
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    import re._parser as sre_parse # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    from re._constants import LITERAL
+except ImportError:
+    from sre_constants import LITERAL
+
+NGRAM = 3
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _required_literals(pattern: str) -> list[str]:
+    """
+    Extrae los fragmentos literales que TODA coincidencia de la regex debe contener
+    (secuencias de caracteres literales al nivel superior del patrón).
+    Con alternativas ('a|b') o patrones sin literales retorna [] y se verifica todo.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+
+    literals, current = [], []
+    for op, arg in parsed:
+        if op == LITERAL:
+            current.append(chr(arg))
+        else:
+            if current:
+                literals.append(''.join(current))
+            current = []
+    if current:
+        literals.append(''.join(current))
+    return [lit.lower() for lit in literals if len(lit) >= NGRAM]
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas sobre uno o más campos de texto de un DataFrame.
+
+    Se construye una sola vez por carga de datos. Cada texto distinto es un
+    "documento" que apunta a las filas (posiciones) que lo contienen, así que
+    nombres repetidos en varias bodegas se indexan y verifican una sola vez.
+
+    - search(): coincidencia parcial (o regex) sin distinguir mayúsculas, igual
+      que 'str.contains(case=False)', pero verificando solo los candidatos que
+      comparten todos los trigramas de la consulta.
+    - fuzzy_search(): coincidencias aproximadas ordenadas por similitud de trigramas.
+    """
+
+    def __init__(self, *columns):
+        doc_ids = {}
+        doc_rows = []
+        for values in columns:
+            for row, value in enumerate(values):
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                text = str(value).lower()
+                if text not in doc_ids:
+                    doc_ids[text] = len(doc_rows)
+                    doc_rows.append([])
+                doc_rows[doc_ids[text]].append(row)
+
+        self.docs = list(doc_ids.keys())
+        self.doc_rows = [np.unique(np.array(rows, dtype=np.int64)) for rows in doc_rows]
+
+        postings = defaultdict(list)
+        for doc_id, text in enumerate(self.docs):
+            for gram in _trigrams(text):
+                postings[gram].append(doc_id)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self.doc_ngram_counts = np.array([len(_trigrams(text)) for text in self.docs], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _candidates(self, literal: str):
+        """Documentos que contienen todos los trigramas del literal (None = sin poda posible)."""
+        grams = _trigrams(literal)
+        if not grams:
+            return None
+        # Intersección empezando por las listas más cortas
+        lists = sorted((self.postings.get(g, np.array([], dtype=np.int64)) for g in grams), key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            if result.size == 0:
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def _rows(self, doc_ids) -> np.ndarray:
+        if len(doc_ids) == 0:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate([self.doc_rows[d] for d in doc_ids]))
+
+    def search(self, query: str, regex: bool = False) -> np.ndarray:
+        """
+        Retorna las posiciones de fila que coinciden con 'query'.
+        Lanza re.error si 'regex=True' y la expresión es inválida.
+        """
+        if regex:
+            compiled = re.compile(query, re.IGNORECASE)
+            literals = _required_literals(query)
+            candidates = None
+            for literal in literals:
+                ids = self._candidates(literal)
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            doc_ids = range(len(self.docs)) if candidates is None else candidates
+            matches = [d for d in doc_ids if compiled.search(self.docs[d])]
+        else:
+            needle = query.lower()
+            candidates = self._candidates(needle)
+            doc_ids = range(len(self.docs)) if candidates is None else candidates
+            matches = [d for d in doc_ids if needle in self.docs[d]]
+        return self._rows(matches)
+
+    def fuzzy_search(self, query: str, min_score: float = 0.5, limit: int | None = None):
+        """
+        Coincidencias aproximadas (tolerantes a errores de tipeo).
+
+        Puntaje = trigramas compartidos / trigramas de la consulta, con una leve
+        penalización por largo del documento. Retorna (posiciones de fila, puntaje)
+        ordenados de mayor a menor relevancia.
+        """
+        grams = _trigrams(query.lower())
+        if not grams:
+            return self.search(query), None
+
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return np.array([], dtype=np.int64), np.array([])
+
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.docs))
+        doc_ids = np.flatnonzero(shared >= np.ceil(min_score * len(grams)))
+        scores = shared[doc_ids] / len(grams)
+        # A igual cobertura, preferir textos más cortos (más específicos)
+        scores = scores - 1e-3 * (self.doc_ngram_counts[doc_ids] / (self.doc_ngram_counts.max() or 1))
+
+        order = np.argsort(-scores, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+
+        rows, row_scores = [], []
+        for i in order:
+            rows.append(self.doc_rows[doc_ids[i]])
+            row_scores.append(np.full(len(self.doc_rows[doc_ids[i]]), scores[i]))
+        if not rows:
+            return np.array([], dtype=np.int64), np.array([])
+
+        rows = np.concatenate(rows)
+        row_scores = np.concatenate(row_scores)
+        # Una fila puede coincidir por nombre y por SKU: se queda con su mejor puntaje
+        _, first = np.unique(rows, return_index=True)
+        keep = np.sort(first)
+        return rows[keep], row_scores[keep]
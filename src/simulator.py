@@ -2,10 +2,101 @@
 # (Modificado para importar 'config' desde 'src' y aceptar listas de bodegas)
 # (v2 - Corregido el cálculo del promedio mensual para incluir meses con consumo 0)
 
+import math
 import pandas as pd
 import numpy as np
 import config # Importa config.py desde la misma carpeta 'src'
+import perf
+import cache_manager
+import predicate_index
+import analysis # Recomendación de pedido (misma lógica que el Radar)
 
+# Cache de simulaciones a nivel de proceso (compartido entre sesiones y usuarios)
+SIMULATION_CACHE = cache_manager.get_namespace('simulaciones')
+
+
+def _z_to_quantile(service_level_z: float) -> float:
+    """Convierte un factor Z en el cuantil equivalente de la normal estándar."""
+    return 0.5 * (1.0 + math.erf(service_level_z / math.sqrt(2.0)))
+
+
+def historical_days(today: pd.Timestamp) -> pd.DatetimeIndex:
+    """Días del período histórico usado para la demanda (4 meses completos previos al mes actual)."""
+    start_of_current_month = today.replace(day=1)
+    return pd.date_range(
+        start=(today - pd.DateOffset(months=4)).replace(day=1),
+        end=start_of_current_month,
+        freq='D',
+        inclusive='left'
+    )
+
+
+@perf.timed('simulator.bootstrap_demand_paths')
+def bootstrap_demand_paths(
+    daily_history: np.ndarray,
+    horizon_days: int,
+    n_paths: int,
+    block_days: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Genera trayectorias de demanda diaria re-muestreando bloques del historial real
+    (moving block bootstrap). Todo el muestreo es vectorizado sobre las trayectorias.
+
+    Los bloques conservan días consecutivos del historial, por lo que se mantienen
+    la intermitencia y los "peaks" de proyectos que el modelo normal suaviza.
+
+    Retorna:
+    - np.ndarray de forma (n_paths, horizon_days) con la demanda de cada día.
+    """
+    daily_history = np.asarray(daily_history, dtype=float)
+    if daily_history.size == 0 or horizon_days <= 0:
+        return np.zeros((n_paths, max(horizon_days, 0)))
+
+    # El bloque no puede ser más largo que el historial disponible
+    block_days = int(max(1, min(block_days, daily_history.size)))
+    n_blocks = -(-horizon_days // block_days) # División entera hacia arriba
+    max_start = daily_history.size - block_days + 1
+
+    # Inicio aleatorio de cada bloque -> índices de todos los días de cada trayectoria
+    starts = rng.integers(0, max_start, size=(n_paths, n_blocks))
+    idx = starts[:, :, None] + np.arange(block_days)[None, None, :]
+    idx = idx.reshape(n_paths, n_blocks * block_days)[:, :horizon_days]
+
+    return daily_history[idx]
+
+
+def simulation_bucket_starts(today: pd.Timestamp, simulation_days: int, granularity: str) -> pd.DatetimeIndex:
+    """
+    Fechas de inicio de cada período de la simulación.
+    - 'D': cada día.
+    - 'W': cada 7 días desde hoy.
+    - 'M': hoy y el primer día de cada mes siguiente.
+    """
+    end = today + pd.Timedelta(days=simulation_days)
+    if granularity == 'D':
+        starts = pd.date_range(start=today, periods=simulation_days, freq='D')
+    elif granularity == 'W':
+        starts = pd.date_range(start=today, end=end, freq='7D', inclusive='left')
+    elif granularity == 'M':
+        month_starts = pd.date_range(start=today + pd.Timedelta(days=1), end=end, freq='MS', inclusive='left')
+        starts = pd.DatetimeIndex([today]).append(month_starts)
+    else:
+        raise ValueError(f"Granularidad desconocida: '{granularity}'.")
+    return starts.rename('Fecha')
+
+
+def _aggregate_arrivals(llegadas_map: dict, bucket_starts: pd.DatetimeIndex, last_day: pd.Timestamp) -> dict:
+    """Suma las llegadas por período (fecha de inicio del período). Las posteriores al horizonte se conservan."""
+    aggregated = {}
+    for fecha, cantidad in llegadas_map.items():
+        if fecha <= last_day:
+            fecha = bucket_starts[bucket_starts.searchsorted(fecha, side='right') - 1]
+        aggregated[fecha] = aggregated.get(fecha, 0) + cantidad
+    return aggregated
+
+
+@perf.timed('simulator.run_inventory_simulation')
 def run_inventory_simulation(
     sku_to_simulate: str,
     warehouse_code: list[str], # <-- (MODIFICADO) Acepta una lista
@@ -15,12 +106,38 @@ def run_inventory_simulation(
     df_oc_raw: pd.DataFrame,
     simulation_days: int,
     lead_time_days: int, 
-    service_level_z: float
+    service_level_z: float,
+    demand_model: str = "normal",
+    n_paths: int = config.BOOTSTRAP_N_PATHS,
+    block_days: int = config.BOOTSTRAP_BLOCK_DAYS,
+    random_seed: int | None = None,
+    granularity: str = "D",
+    index: predicate_index.DataIndex | None = None
 ):
     """
     Ejecuta la lógica de simulación de inventario día a día.
-    (El contenido de esta función no cambia)
+
+    demand_model:
+    - 'normal': demanda diaria constante a partir de la media mensual (original).
+    - 'bootstrap': re-muestrea bloques de consumo diario real de ST_OWTR en
+      'n_paths' trayectorias. 'NivelInventario' es la trayectoria media y se
+      agregan las bandas P05/P95; el SS se calcula con el cuantil empírico
+      de la demanda durante el Lead Time.
+
+    granularity ('D', 'W' o 'M'): la simulación siempre corre a nivel diario,
+    pero el DataFrame de salida tiene una fila por período (nivel al inicio
+    del período) y las llegadas se agrupan en el período que las recibe.
+    Proyecciones largas pesan así una fracción en memoria y en los gráficos.
+    La recomendación de pedido (metrics['order_recommendation']) y el stock
+    al cierre de cada mes (metrics['month_end_levels']) se calculan sobre la
+    serie diaria, antes de agrupar: no dependen de la granularidad.
+
+    index: índice de predicados (predicate_index) de ESTOS mismos DataFrames.
+    Si se entrega, las filas del SKU se toman por posición en vez de recorrer
+    las tablas completas (y la limpieza de OPOR se hace solo sobre esas filas).
     """
+    if demand_model not in config.DEMAND_MODELS.values():
+        raise ValueError(f"Modelo de demanda desconocido: '{demand_model}'.")
     
     # Define la fecha de 'hoy' (inicio de la simulación)
     today = pd.Timestamp.now().floor('D')
@@ -28,10 +145,16 @@ def run_inventory_simulation(
     # --- B. CÁLCULO DE STOCK INICIAL (I_0) ---
     
     # (MODIFICADO) Filtra el DataFrame de stock para el SKU y MÚLTIPLES bodegas
-    df_stock_filtered = df_stock_raw[
-        (df_stock_raw['CodigoArticulo'] == sku_to_simulate) &
-        (df_stock_raw['CodigoBodega'].isin(warehouse_code)) # <-- (MODIFICADO) Usa .isin()
-    ].copy()
+    if index is not None:
+        df_stock_filtered = df_stock_raw.iloc[index.stock.intersect(
+            index.stock.equals('CodigoArticulo', sku_to_simulate),
+            index.stock.isin('CodigoBodega', warehouse_code)
+        )].copy()
+    else:
+        df_stock_filtered = df_stock_raw[
+            (df_stock_raw['CodigoArticulo'] == sku_to_simulate) &
+            (df_stock_raw['CodigoBodega'].isin(warehouse_code)) # <-- (MODIFICADO) Usa .isin()
+        ].copy()
     
     # Asegura que el stock sea numérico y calcula el total
     df_stock_filtered['DisponibleParaPrometer'] = pd.to_numeric(df_stock_filtered['DisponibleParaPrometer'], errors='coerce')
@@ -40,16 +163,23 @@ def run_inventory_simulation(
     # --- C. CÁLCULO DE CONSUMO ---
     
     # (MODIFICADO) Filtra el DataFrame de consumo para el SKU y MÚLTIPLES bodegas
-    df_consumo_filtered = df_consumo_raw[
-        (df_consumo_raw['CodigoArticulo'] == sku_to_simulate) &
-        (df_consumo_raw['BodegaDestino_Requerida'].isin(consumption_warehouse)) # <-- (MODIFICADO) Usa .isin()
-    ].copy()
+    if index is not None:
+        df_consumo_filtered = df_consumo_raw.iloc[index.consumo.intersect(
+            index.consumo.equals('CodigoArticulo', sku_to_simulate),
+            index.consumo.isin('BodegaDestino_Requerida', consumption_warehouse)
+        )].copy()
+    else:
+        df_consumo_filtered = df_consumo_raw[
+            (df_consumo_raw['CodigoArticulo'] == sku_to_simulate) &
+            (df_consumo_raw['BodegaDestino_Requerida'].isin(consumption_warehouse)) # <-- (MODIFICADO) Usa .isin()
+        ].copy()
     
     # Inicializa métricas de demanda (buena práctica para asegurar que existan)
     daily_demand_mean = 0.0
     daily_demand_std = 0.0
     monthly_demand_mean = 0.0
     demand_M_0, demand_M_1, demand_M_2, demand_M_3 = 0.0, 0.0, 0.0, 0.0
+    consumo_diario_historico = np.array([])
 
     # Define las fechas de inicio para los meses a analizar (M, M-1, M-2, M-3)
     start_of_current_month = today.replace(day=1)
@@ -113,6 +243,15 @@ def run_inventory_simulation(
         demand_M_2 = consumo_mensual.get(start_of_M_minus_2, 0)
         demand_M_3 = consumo_mensual.get(start_of_M_minus_3, 0)
 
+        # 4. Serie diaria (con ceros) del mismo período histórico, para el bootstrap
+        dias_historicos = historical_days(today)
+        consumo_diario_historico = (
+            df_consumo_indexed['CantidadSolicitada'].resample('D').sum()
+            .reindex(dias_historicos, fill_value=0)
+            .clip(lower=0)
+            .to_numpy(dtype=float)
+        )
+
     # --- D. CÁLCULO DE SS y ROP ---
     
     demand_during_lead_time = daily_demand_mean * lead_time_days
@@ -120,9 +259,31 @@ def run_inventory_simulation(
     safety_stock = service_level_z * std_dev_during_lead_time
     reorder_point = demand_during_lead_time + safety_stock
 
+    demand_paths = None
+    if demand_model == "bootstrap":
+        rng = np.random.default_rng(random_seed)
+        horizon = max(simulation_days, lead_time_days)
+        demand_paths = bootstrap_demand_paths(consumo_diario_historico, horizon, n_paths, block_days, rng)
+
+        # SS empírico: cuantil (según Z) de la demanda acumulada en el Lead Time
+        # menos su media. Refleja la intermitencia real en vez de suponer normalidad.
+        demand_lt = demand_paths[:, :lead_time_days].sum(axis=1)
+        demand_during_lead_time = demand_lt.mean()
+        safety_stock = max(0.0, np.quantile(demand_lt, _z_to_quantile(service_level_z)) - demand_during_lead_time)
+        reorder_point = demand_during_lead_time + safety_stock
+        demand_paths = demand_paths[:, :simulation_days]
+
     # --- E. CÁLCULO DE LLEGADAS (OC) ---
     
-    df_oc_clean = df_oc_raw.copy()
+    if index is not None:
+        # Solo las líneas del SKU con Cantidad > 0 y entrega desde hoy (el filtro de abajo se mantiene)
+        df_oc_clean = df_oc_raw.iloc[index.oc.intersect(
+            index.oc.equals('Número de artículo', sku_to_simulate),
+            index.oc.flag('cantidad_positiva'),
+            index.oc.since('Fecha de entrega de la línea', today)
+        )].copy()
+    else:
+        df_oc_clean = df_oc_raw.copy()
     try:
         df_oc_clean['Fecha de entrega de la línea'] = pd.to_datetime(df_oc_clean['Fecha de entrega de la línea'], format='%Y-m-%d', errors='coerce')
         df_oc_clean['Cantidad'] = pd.to_numeric(df_oc_clean['Cantidad'], errors='coerce')
@@ -138,43 +299,149 @@ def run_inventory_simulation(
     
     llegadas_por_fecha = df_llegadas_detalle.groupby('Fecha de entrega de la línea')['Cantidad'].sum() 
     llegadas_map = llegadas_por_fecha.to_dict()
+    llegadas_count = len(llegadas_map)
     
     # --- F. EJECUTAR SIMULACIÓN DÍA A DÍA ---
-    
-    inventory_level = initial_stock
-    history_list = [] 
-    date_list = []    
 
-    for day in range(simulation_days):
-        current_date = today + pd.Timedelta(days=day)
-        
-        history_list.append(inventory_level)
-        date_list.append(current_date)
-        
-        inventory_level += llegadas_map.get(current_date, 0)
-        
-        if daily_demand_std > 0:
-            daily_consumption = np.random.normal(loc=daily_demand_mean, scale=0) #, scale=daily_demand_std)
-        else:
-            daily_consumption = daily_demand_mean
-            
-        daily_consumption = max(0, daily_consumption)
-        inventory_level -= daily_consumption
-        
-    df_sim = pd.DataFrame({'NivelInventario': history_list}, index=pd.Index(date_list, name='Fecha'))
+    # Flujos diarios del horizonte. El nivel de cada día se registra ANTES de sus
+    # llegadas y consumo: nivel(d) = stock inicial + flujo neto acumulado hasta d-1.
+    dates = pd.date_range(start=today, periods=simulation_days, freq='D', name='Fecha')
+    arrivals = np.array([llegadas_map.get(d, 0) for d in dates], dtype=float)
+
+    # Días (desde hoy) en que comienza cada período de la granularidad pedida
+    bucket_starts = simulation_bucket_starts(today, simulation_days, granularity)
+    bucket_offsets = (bucket_starts - today).days.to_numpy()
+
+    stockout_probability = None
+    if demand_paths is not None:
+        # Bootstrap: todas las trayectorias a la vez.
+        net_flow = arrivals[None, :] - demand_paths
+        levels = initial_stock + np.cumsum(net_flow, axis=1) - net_flow
+
+        # Probabilidad de quiebre: fracción de trayectorias que llegan bajo cero
+        # (se mide día a día aunque la salida sea semanal o mensual)
+        stockout_probability = float((levels < 0).any(axis=1).mean())
+        daily_levels = levels.mean(axis=0)
+        daily_closing = daily_levels + net_flow.mean(axis=0)
+        levels = levels[:, bucket_offsets]
+        df_sim = pd.DataFrame({
+            'NivelInventario': levels.mean(axis=0),
+            'NivelInventario_P05': np.percentile(levels, 5, axis=0),
+            'NivelInventario_P95': np.percentile(levels, 95, axis=0),
+        }, index=bucket_starts)
+
+    else:
+        # Modelo normal: consumo diario constante (la media; la std solo afecta al SS)
+        daily_consumption = max(0.0, daily_demand_mean)
+        net_flow = arrivals - daily_consumption
+        levels = initial_stock + np.cumsum(net_flow) - net_flow
+        daily_levels = levels
+        daily_closing = levels + net_flow
+        df_sim = pd.DataFrame({'NivelInventario': levels[bucket_offsets]}, index=bucket_starts)
+
+    # Recomendación en T + Lead Time sobre el nivel de CADA día (con 'W' o 'M'
+    # la fila de df_sim es el inicio del período, no el día del Lead Time)
+    order_recommendation = analysis.calculate_order_recommendation(
+        {'safety_stock': safety_stock},
+        llegadas_map,
+        pd.DataFrame({'NivelInventario': daily_levels}, index=dates),
+        lead_time_days
+    )
+
+    # Stock al cierre (después de llegadas y consumo) del último día de cada mes
+    # del horizonte. El mes en curso al final del horizonte queda con el cierre
+    # del último día simulado ('FechaCierre' anterior al fin de mes = parcial)
+    month_end_levels = pd.DataFrame(
+        {'NivelInventario': daily_closing, 'FechaCierre': dates}, index=dates
+    ).resample('ME').last()
+
+    if granularity != 'D':
+        # Llegadas agrupadas en el período que las recibe, para alinearlas con la serie
+        llegadas_map = _aggregate_arrivals(llegadas_map, bucket_starts, dates[-1])
 
     # --- G. EMPAQUETAR RESULTADOS ---
     
     metrics = {
         'initial_stock': initial_stock,
         'monthly_demand_mean': monthly_demand_mean,
-        'llegadas_count': len(llegadas_map),
+        'llegadas_count': llegadas_count,
         'safety_stock': safety_stock,
         'reorder_point': reorder_point,
         'demand_M_0': (start_of_current_month, demand_M_0),
         'demand_M_1': (start_of_M_minus_1, demand_M_1),
         'demand_M_2': (start_of_M_minus_2, demand_M_2),
         'demand_M_3': (start_of_M_minus_3, demand_M_3),
+        'demand_model': demand_model,
+        'stockout_probability': stockout_probability,
+        'granularity': granularity,
+        'order_recommendation': order_recommendation,
+        'month_end_levels': month_end_levels,
     }
 
-    return df_sim, metrics, llegadas_map, df_llegadas_detalle
\ No newline at end of file
+    return df_sim, metrics, llegadas_map, df_llegadas_detalle
+
+
+def run_inventory_simulation_cached(
+    data_version: str,
+    sku_to_simulate: str,
+    warehouse_code: list[str],
+    consumption_warehouse: list[str],
+    df_stock_raw: pd.DataFrame,
+    df_consumo_raw: pd.DataFrame,
+    df_oc_raw: pd.DataFrame,
+    simulation_days: int,
+    lead_time_days: int,
+    service_level_z: float,
+    demand_model: str = "normal",
+    n_paths: int = config.BOOTSTRAP_N_PATHS,
+    block_days: int = config.BOOTSTRAP_BLOCK_DAYS,
+    random_seed: int | None = None,
+    granularity: str = "D"
+):
+    """
+    Igual que 'run_inventory_simulation', pero memoizado en SIMULATION_CACHE
+    (espacio 'simulaciones' de cache_manager).
+
+    La clave incluye la huella de los datos ('data_version') y el día actual,
+    por lo que un cambio de archivos o de fecha nunca reutiliza resultados viejos;
+    además la entrada se descarta al cargarse una nueva versión de datos.
+    Con data_version=None (carga inicial aún en curso) no se cachea ni se usa
+    el índice de predicados (también es por versión de datos).
+    El resultado es compartido: no modificar los DataFrames/diccionarios retornados.
+    """
+    key = (
+        data_version,
+        pd.Timestamp.now().floor('D'),
+        sku_to_simulate,
+        tuple(sorted(warehouse_code)),
+        tuple(sorted(consumption_warehouse)),
+        int(simulation_days),
+        int(lead_time_days),
+        float(service_level_z),
+        demand_model,
+        int(n_paths),
+        int(block_days),
+        random_seed,
+        granularity,
+    )
+    compute = lambda: run_inventory_simulation(
+        sku_to_simulate,
+        warehouse_code,
+        consumption_warehouse,
+        df_stock_raw,
+        df_consumo_raw,
+        df_oc_raw,
+        simulation_days,
+        lead_time_days,
+        service_level_z,
+        demand_model=demand_model,
+        n_paths=n_paths,
+        block_days=block_days,
+        random_seed=random_seed,
+        granularity=granularity,
+        index=predicate_index.get_data_index(df_stock_raw, df_consumo_raw, df_oc_raw, data_version)
+            if data_version is not None else None
+    )
+    if data_version is None:
+        return compute()
+    return cache_manager.get_or_compute('simulaciones', key, compute, data_version=data_version)
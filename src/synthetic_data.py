@@ -0,0 +1,230 @@
+# --- ARCHIVO: src/synthetic_data.py ---
+# (NUEVO ARCHIVO: datos sintéticos con el esquema de Stock/OPOR/ST_OWTR/Residencial para benchmarks)
+
+import os
+
+import numpy as np
+import pandas as pd
+
+FAMILIAS = ['EQUIPOS PRINCIPALES', 'MATERIALES', 'ESTRUCTURAS', 'CABLES', 'HERRAMIENTAS']
+BODEGAS_STOCK = {
+    'BF0001': 'Bodega Central',
+    'BF0002': 'Bodega Norte',
+    'BF0003': 'Bodega Sur',
+    'BF0004': 'Bodega Tránsito',
+}
+BODEGAS_CONSUMO = ['Bodega de Proyectos RE', 'Bodega de Proyectos CI', 'Bodega Mantención', 'Bodega Servicio Técnico']
+PROVEEDORES = [f'Proveedor {i:03d} SpA' for i in range(1, 61)]
+COMPRADORES = ['mgonzalez', 'jperez', 'csilva', 'arojas', 'fmunoz', 'pcontreras', 'lsoto', 'dmorales']
+SOLICITANTES = [f'tecnico{i:02d}' for i in range(1, 41)]
+EJECUTIVOS = [f'Ejecutivo {i:02d}' for i in range(1, 26)]
+REGIONES = ['Metropolitana', 'Valparaíso', "O'Higgins", 'Maule', 'Biobío', 'Coquimbo', 'Araucanía', 'Los Lagos']
+ESTADOS_LINEA = ['Abierto', 'Cerrado']
+ESTADOS_PROYECTO = ['Ganado', 'En instalación', 'Terminado', 'Facturado']
+
+# Límite de filas de una hoja Excel (incluye la fila de encabezados)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Columnas de cantidad que en los Excel exportados traen celdas vacías
+COLUMNAS_CANTIDAD = {
+    'stock': ['StockActual', 'DisponibleParaPrometer'],
+    'oc': ['Cantidad', 'Cantidad abierta restante'],
+    'consumo': ['CantidadSolicitada'],
+}
+
+
+def _pick(rng, values, n, p=None):
+    """Muestra 'n' valores de una lista pequeña usando códigos enteros + take (sin bucles)."""
+    values = np.asarray(values, dtype=object)
+    return values.take(rng.choice(len(values), size=n, p=p))
+
+
+def _random_dates(rng, start: pd.Timestamp, end: pd.Timestamp, n: int) -> pd.DatetimeIndex:
+    """'n' fechas (día) uniformes entre 'start' y 'end'."""
+    days = max(1, (end - start).days)
+    return start.floor('D') + pd.to_timedelta(rng.integers(0, days + 1, size=n), unit='D')
+
+
+def _sku_popularity(n_skus: int) -> np.ndarray:
+    """Probabilidad de consumo por SKU con cola larga (tipo Zipf): pocos SKUs concentran la demanda."""
+    weights = 1.0 / np.arange(1, n_skus + 1) ** 0.9
+    return weights / weights.sum()
+
+
+def _blank_quantities(rng, df: pd.DataFrame, columns: list, fraction: float):
+    """Deja vacías (NaN) una fracción 'fraction' de las celdas de cada columna de cantidad."""
+    for col in columns:
+        df.loc[rng.random(len(df)) < fraction, col] = np.nan
+
+
+def generate_synthetic_data(
+    n_skus: int = 2_000,
+    n_consumption_lines: int = 50_000,
+    n_oc_lines: int = 10_000,
+    n_residential: int = 3_000,
+    seed: int = 42,
+    today: pd.Timestamp | None = None,
+    blank_fraction: float = 0.02
+):
+    """
+    Genera DataFrames con las mismas columnas y tipos que los Excel reales
+    (Stock, OPOR, ST_OWTR y BD_Master_Residencial) a la escala indicada.
+
+    - Los SKUs tienen familia, 1-3 bodegas de stock y demanda con cola larga.
+    - Las fechas cubren los últimos meses respecto de 'today', de modo que
+      los filtros de 'data_loader' (OC 5 meses, consumo 3 meses) conservan
+      la mayoría de las filas.
+    - 'blank_fraction' de las cantidades (COLUMNAS_CANTIDAD) quedan vacías,
+      como en los archivos reales: al compactar, esas columnas pasan a enteros
+      nullable. Con 0 no hay vacíos; el resto de los datos no cambia.
+
+    Retorna:
+    - tupla(pd.DataFrame): (df_stock, df_oc, df_consumo, df_residencial)
+    """
+    rng = np.random.default_rng(seed)
+    today = (pd.Timestamp.now() if today is None else pd.Timestamp(today)).floor('D')
+
+    # --- Maestro de artículos ---
+    skus = np.array([f'EXI-{i:06d}' for i in range(1, n_skus + 1)], dtype=object)
+    familia_sku = _pick(rng, FAMILIAS, n_skus, p=[0.15, 0.35, 0.2, 0.2, 0.1])
+    nombre_sku = np.char.add(np.char.add(familia_sku.astype(str), ' ITEM '), np.arange(1, n_skus + 1).astype(str)).astype(object)
+    costo_sku = np.round(rng.lognormal(mean=3.5, sigma=1.2, size=n_skus), 2)
+    popularidad = _sku_popularity(n_skus)
+    rng.shuffle(popularidad)
+
+    # --- Stock: cada SKU en 1 a 3 bodegas distintas (la primera siempre es BF0001) ---
+    n_bodegas = rng.integers(1, 4, size=n_skus)
+    sku_idx = np.repeat(np.arange(n_skus), n_bodegas)
+    codigos_bodega = np.array(list(BODEGAS_STOCK), dtype=object)
+    pos_en_sku = np.arange(len(sku_idx)) - np.repeat(np.cumsum(n_bodegas) - n_bodegas, n_bodegas)
+    bodega_idx = (pos_en_sku + rng.integers(0, len(codigos_bodega) - 2, size=n_skus)[sku_idx] * (pos_en_sku > 0)) % len(codigos_bodega)
+    bodega_stock = codigos_bodega.take(bodega_idx)
+    n_stock = len(sku_idx)
+
+    stock_actual = rng.poisson(lam=np.maximum(popularidad[sku_idx] * n_consumption_lines * 0.5, 1)).astype(float)
+    comprometido = np.floor(stock_actual * rng.uniform(0, 0.3, size=n_stock))
+    en_pedido = rng.poisson(lam=2, size=n_stock).astype(float) * (rng.random(n_stock) < 0.3)
+    disponible = stock_actual - comprometido + en_pedido
+    nivel_minimo = np.floor(stock_actual * 0.2)
+
+    df_stock = pd.DataFrame({
+        'CodigoArticulo': skus.take(sku_idx),
+        'NombreArticulo': nombre_sku.take(sku_idx),
+        'GrupoArticulo': familia_sku.take(sku_idx),
+        'CodigoBodega': bodega_stock,
+        'NombreBodega': pd.Series(bodega_stock).map(BODEGAS_STOCK).to_numpy(dtype=object),
+        'Familia': familia_sku.take(sku_idx),
+        'StockActual': stock_actual,
+        'Comprometido': comprometido,
+        'EnPedido_a_Proveedor': en_pedido,
+        'DisponibleParaPrometer': disponible,
+        'CostoUnitario': costo_sku.take(sku_idx),
+        'ValorTotalInventario': np.round(stock_actual * costo_sku.take(sku_idx), 2),
+        'NivelMinimo': nivel_minimo,
+        'NivelMaximo': nivel_minimo * 3 + 1,
+        'EstadoStock': np.where(disponible <= nivel_minimo, 'Bajo Mínimo', 'Normal').astype(object),
+        'FechaUltimaCompra': _random_dates(rng, today - pd.DateOffset(years=2), today, n_stock),
+        'FechaCreacionArticulo': _random_dates(rng, today - pd.DateOffset(years=8), today - pd.DateOffset(years=2), n_stock),
+    })
+
+    # --- ST_OWTR (consumo): SKUs según popularidad, últimos ~3 meses ---
+    cons_sku = rng.choice(n_skus, size=n_consumption_lines, p=popularidad)
+    proyecto = rng.integers(1, max(2, n_consumption_lines // 20), size=n_consumption_lines)
+    codigo_proyecto = np.char.add('PRY-', proyecto.astype(str)).astype(object)
+    df_consumo = pd.DataFrame({
+        'CodigoArticulo': skus.take(cons_sku),
+        'BodegaDestino_Requerida': _pick(rng, BODEGAS_CONSUMO, n_consumption_lines, p=[0.55, 0.2, 0.15, 0.1]),
+        'FechaSolicitud': _random_dates(rng, (today - pd.DateOffset(months=3)).replace(day=1), today, n_consumption_lines),
+        'CantidadSolicitada': rng.geometric(p=0.35, size=n_consumption_lines).astype(float),
+        'SolicitadoPor': _pick(rng, SOLICITANTES, n_consumption_lines),
+        'CodigoProyecto': codigo_proyecto,
+        'NombreProyecto': np.char.add('Proyecto ', proyecto.astype(str)).astype(object),
+        'CodigoUnidadNegocio': _pick(rng, ['RE', 'CI', 'SSTT'], n_consumption_lines, p=[0.6, 0.3, 0.1]),
+        'CeCo': np.char.add('CC', (proyecto % 900 + 100).astype(str)).astype(object),
+    })
+
+    # --- OPOR (órdenes de compra): ~4 líneas por documento ---
+    oc_sku = rng.choice(n_skus, size=n_oc_lines, p=popularidad)
+    n_docs = max(1, n_oc_lines // 4)
+    doc = np.sort(rng.integers(0, n_docs, size=n_oc_lines))
+    doc_fecha = _random_dates(rng, (today - pd.DateOffset(months=5)).replace(day=1), today, n_docs)
+    doc_entrega = doc_fecha + pd.to_timedelta(rng.integers(7, 150, size=n_docs), unit='D')
+    cantidad = rng.geometric(p=0.1, size=n_oc_lines).astype(float)
+    precio = np.round(costo_sku.take(oc_sku) * rng.uniform(0.9, 1.1, size=n_oc_lines), 2)
+    abierta = np.where(rng.random(n_oc_lines) < 0.6, cantidad, 0.0)
+    linea = np.arange(n_oc_lines) - np.searchsorted(doc, doc)
+    df_oc = pd.DataFrame({
+        'Número de documento': 4_500_000 + doc,
+        'Fecha de contabilización': doc_fecha.take(doc),
+        'Nombre de cliente/proveedor': _pick(rng, PROVEEDORES, n_docs).take(doc),
+        'Número de artículo': skus.take(oc_sku),
+        'Descripción artículo/serv.': nombre_sku.take(oc_sku),
+        'Familia_Articulo': familia_sku.take(oc_sku),
+        'Cantidad': cantidad,
+        'Precio_Unitario': precio,
+        'Total_Linea': np.round(cantidad * precio, 2),
+        'Cantidad abierta restante': abierta,
+        'Total_Pendiente': np.round(abierta * precio, 2),
+        'Fecha de entrega de la línea': doc_entrega.take(doc),
+        'Status de la línea': np.where(abierta > 0, ESTADOS_LINEA[0], ESTADOS_LINEA[1]).astype(object),
+        'Creador': _pick(rng, COMPRADORES, n_docs).take(doc),
+        'Comentarios': np.where(rng.random(n_oc_lines) < 0.2, 'PROA Reposición', 'Compra regular').astype(object),
+        'Numerador': _pick(rng, ['Primario', 'Importación'], n_docs, p=[0.85, 0.15]).take(doc),
+        'Número de línea': linea,
+        'Columna1': np.nan,
+    })
+
+    # --- BD_Master_Residencial (columnas usadas por la página) ---
+    ganado = _random_dates(rng, today - pd.DateOffset(years=3), today, n_residential)
+    inicio = ganado + pd.to_timedelta(rng.gamma(shape=2.0, scale=25.0, size=n_residential).astype(int), unit='D')
+    termino = inicio + pd.to_timedelta(rng.integers(1, 20, size=n_residential), unit='D')
+    iniciado = (inicio <= today) & (rng.random(n_residential) < 0.9)
+    terminado = iniciado & (termino <= today) & (rng.random(n_residential) < 0.9)
+    kwp = np.round(rng.lognormal(mean=1.6, sigma=0.5, size=n_residential), 2)
+    df_residencial = pd.DataFrame({
+        'CeCo': np.char.add('RES-', np.arange(1, n_residential + 1).astype(str)).astype(object),
+        'Doc venta': 7_000_000 + np.arange(n_residential),
+        'Estado Proyecto': _pick(rng, ESTADOS_PROYECTO, n_residential),
+        'Tipo proyecto': _pick(rng, ['On-Grid', 'Híbrido', 'Off-Grid'], n_residential, p=[0.7, 0.2, 0.1]),
+        'kWp': kwp,
+        'kWac': np.round(kwp * 0.85, 2),
+        'Ejecutivo': _pick(rng, EJECUTIVOS, n_residential),
+        'Región': _pick(rng, REGIONES, n_residential),
+        'Fecha de ganado': ganado,
+        'Fecha de inicio de instalación real': inicio.where(iniciado),
+        'Fecha de término de instalación real': termino.where(terminado),
+    })
+
+    if blank_fraction > 0:
+        # Generador aparte: los valores no vacíos son los mismos para cualquier fracción
+        rng_vacios = np.random.default_rng([seed, 1])
+        for nombre, df in (('stock', df_stock), ('oc', df_oc), ('consumo', df_consumo)):
+            _blank_quantities(rng_vacios, df, COLUMNAS_CANTIDAD[nombre], blank_fraction)
+
+    return df_stock, df_oc, df_consumo, df_residencial
+
+
+def write_synthetic_data(data_dir: str, **kwargs) -> dict:
+    """
+    Genera los datos y los escribe en 'data_dir' con los nombres que espera
+    'data_loader.DATASETS' (Stock.xlsx, OPOR.xlsx, ST_OWTR.xlsx,
+    BD_Master_Residencial.xlsx). Retorna las filas escritas por archivo.
+
+    Lanza:
+    - ValueError: Si algún archivo supera el límite de filas de Excel.
+    """
+    df_stock, df_oc, df_consumo, df_residencial = generate_synthetic_data(**kwargs)
+    archivos = {
+        'Stock.xlsx': df_stock,
+        'OPOR.xlsx': df_oc,
+        'ST_OWTR.xlsx': df_consumo,
+        'BD_Master_Residencial.xlsx': df_residencial,
+    }
+    for nombre, df in archivos.items():
+        if len(df) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(f"'{nombre}' tendría {len(df):,} filas; Excel admite a lo más {EXCEL_MAX_ROWS - 1:,}.")
+
+    os.makedirs(data_dir, exist_ok=True)
+    for nombre, df in archivos.items():
+        df.to_excel(os.path.join(data_dir, nombre), index=False)
+    return {nombre: len(df) for nombre, df in archivos.items()}
@@ -8,6 +8,9 @@ import matplotlib.dates as mdates
 import locale
 import config   # Importa config.py desde la misma carpeta 'src'
 import analysis # Importa analysis.py desde la misma carpeta 'src'
+import downsample # Reducción de puntos para gráficos
+import cache_manager # Cache del proceso por versión de datos
+import exports # Descargas CSV / Excel / Parquet generadas al hacer clic
 import altair as alt
 
 
@@ -28,21 +31,133 @@ def create_sku_options(all_skus, df_stock):
     """
     mapa_nombres = df_stock.drop_duplicates(subset=['CodigoArticulo']).set_index('CodigoArticulo')['NombreArticulo'].to_dict()
     
-    opciones_selector_sku = []
-    for sku in all_skus:
-        nombre = mapa_nombres.get(sku, "Nombre no encontrado")
-        opciones_selector_sku.append(f"{sku} | {nombre}")
+    skus = pd.Series(list(all_skus), dtype=object)
+    nombres = skus.map(mapa_nombres).where(skus.isin(mapa_nombres.keys()), "Nombre no encontrado")
+    opciones_selector_sku = (skus.map(str) + " | " + nombres.map(str)).tolist()
         
     # Buscar el índice del SKU por defecto
     default_sku = 'EXI-009231'
-    default_index = 0
-    for i, option in enumerate(opciones_selector_sku):
-        if option.startswith(default_sku):
-            default_index = i
-            break
+    coincidencias = skus.astype(str).str.startswith(default_sku).to_numpy().nonzero()[0]
+    default_index = int(coincidencias[0]) if len(coincidencias) else 0
             
     return opciones_selector_sku, mapa_nombres, default_index
 
+@cache_manager.cached('derivados')
+def get_selector_options(_df_stock, _df_consumo, data_version):
+    """
+    Opciones de los selectores (SKU y bodegas) calculadas UNA vez por versión de
+    datos y compartidas entre páginas y sesiones. Las páginas solo leen el
+    resultado: NO modificar las listas ni el diccionario retornados.
+    """
+    all_skus = sorted(set(_df_stock['CodigoArticulo'].dropna().unique()) | set(_df_consumo['CodigoArticulo'].dropna().unique()))
+    opciones_selector_sku, mapa_nombres, default_index = create_sku_options(all_skus, _df_stock)
+    return {
+        "sku_options": opciones_selector_sku,
+        "mapa_nombres": mapa_nombres,
+        "default_index": default_index,
+        "bodegas_stock": sorted(_df_stock['CodigoBodega'].dropna().unique()),
+        "bodegas_consumo": sorted(_df_consumo['BodegaDestino_Requerida'].dropna().unique()),
+    }
+
+def _sorted_positions(series, ascending):
+    """
+    Posiciones de fila ordenadas por 'series' (tipo nativo: números, fechas, texto).
+    Orden estable y nulos al final. Si la columna mezcla tipos, ordena como texto.
+    """
+    series = series.reset_index(drop=True)
+    try:
+        ordered = series.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:
+        ordered = series.astype(str).sort_values(ascending=ascending, kind='stable')
+    return ordered.index.to_numpy()
+
+def _format_page(df_page, formatters):
+    """Aplica los formatos de texto solo a las filas de la página visible."""
+    if not formatters:
+        return df_page
+    df_page = df_page.copy()
+    for col, fmt in formatters.items():
+        if col in df_page.columns:
+            df_page[col] = [fmt.format(v) if pd.notna(v) else "" for v in df_page[col]]
+    return df_page
+
+def display_paginated_table(df, key, column_config=None, default_sort=None, ascending=False,
+                            formatters=None, hide_index=True):
+    """
+    Muestra un DataFrame grande paginado en el servidor.
+
+    El orden se calcula sobre las columnas con su tipo real (no sobre texto
+    formateado) y al navegador solo se envía la página visible. 'formatters'
+    ({columna: "{:,.0f}"} o "{:%Y-%m-%d}") se aplica únicamente a esas filas.
+    'key' debe ser único por tabla dentro de la página (identifica sus controles).
+    """
+    total_rows = len(df)
+    if total_rows == 0:
+        st.info("No hay filas para mostrar.")
+        return
+
+    columns = list(df.columns)
+    sort_index = columns.index(default_sort) if default_sort in columns else None
+
+    col_sort, col_dir, col_size, col_page = st.columns([3, 2, 2, 2])
+    sort_col = col_sort.selectbox(
+        "Ordenar por", options=columns, index=sort_index,
+        placeholder="Orden original", key=f"{key}_sort"
+    )
+    descending = col_dir.toggle("Descendente", value=not ascending, key=f"{key}_desc")
+    page_size = col_size.selectbox(
+        "Filas por página", options=config.TABLE_PAGE_SIZES,
+        index=config.TABLE_PAGE_SIZES.index(config.TABLE_DEFAULT_PAGE_SIZE), key=f"{key}_size"
+    )
+
+    n_pages = max(1, -(-total_rows // page_size))
+    page_key = f"{key}_page"
+    # Si los filtros redujeron el número de páginas, volver a una página válida
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    page = col_page.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total_rows)
+    if sort_col is None:
+        df_page = df.iloc[start:stop]
+    else:
+        df_page = df.iloc[_sorted_positions(df[sort_col], ascending=not descending)[start:stop]]
+
+    st.dataframe(
+        _format_page(df_page, formatters),
+        width='stretch',
+        column_config=column_config,
+        hide_index=hide_index
+    )
+    st.caption(f"Mostrando filas {start + 1:,}–{stop:,} de {total_rows:,}")
+
+def download_export(df, file_stem, key, label="📥 Descargar", sheet_name="Datos", number_formats=None, width='content'):
+    """
+    Selector de formato (CSV, Excel o Parquet) y botón de descarga de 'df'.
+
+    El archivo NO se genera en cada ejecución: Streamlit llama a la función
+    recién cuando el usuario hace clic (en otro hilo), y se escribe por tramos
+    (ver exports.build_export). Nada queda guardado en st.session_state.
+    'key' debe ser único por descarga dentro de la página.
+    """
+    formats = exports.available_formats()
+    fmt = st.radio(
+        "Formato", formats, horizontal=True, key=f"{key}_formato",
+        format_func=lambda f: exports.FORMATS[f][0], label_visibility="collapsed"
+    )
+    options = {'sheet_name': sheet_name, 'number_formats': number_formats} if fmt == 'xlsx' else {}
+    st.download_button(
+        label=f"{label} (.{fmt})",
+        data=lambda: exports.build_export(df, fmt, **options),
+        file_name=f"{file_stem}.{fmt}",
+        mime=exports.FORMATS[fmt][1],
+        key=f"{key}_descarga",
+        on_click='ignore', # Descargar no vuelve a ejecutar la página
+        width=width
+    )
+
+
 def display_metrics(metrics, lead_time_days, service_level_z):
     """Muestra todas las métricas en la app de Streamlit."""
     
@@ -102,6 +217,14 @@ def display_metrics(metrics, lead_time_days, service_level_z):
     col2.metric("Safety Stock (SS)", f"{metrics['safety_stock']:,.0f}", f"Nivel Servicio {service_level_z}Z")
     col3.metric("Punto de Reorden (ROP)", f"{metrics['reorder_point']:,.0f}")
 
+    # Solo el modelo bootstrap entrega una probabilidad de quiebre
+    if metrics.get('stockout_probability') is not None:
+        st.metric(
+            "Probabilidad de Quiebre (en el horizonte)",
+            f"{metrics['stockout_probability']:.0%}",
+            help="Fracción de trayectorias bootstrap en que el inventario cae bajo cero."
+        )
+
 def generate_simulation_plot(df_sim, metrics, llegadas_map, sku_name, simulation_days):
     """
     Genera un gráfico interactivo de Altair.
@@ -112,6 +235,15 @@ def generate_simulation_plot(df_sim, metrics, llegadas_map, sku_name, simulation
     df_plot = df_sim.reset_index()
     df_plot['ROP'] = metrics['reorder_point']
     df_plot['SafetyStock'] = metrics['safety_stock']
+
+    # Las llegadas se cruzan con la serie completa (su nivel exacto ese día)
+    df_llegadas = pd.DataFrame(list(llegadas_map.items()), columns=['Fecha', 'CantidadLlegada'])
+    df_llegadas = pd.merge(df_llegadas, df_plot, on='Fecha', how='left')
+    df_llegadas['Leyenda'] = 'Llegada de OC' 
+
+    # Reducción de puntos (config.CHART_MAX_POINTS) antes de armar el gráfico
+    serie_cols = [c for c in ['NivelInventario', 'NivelInventario_P05', 'NivelInventario_P95'] if c in df_plot.columns]
+    df_plot = downsample.downsample_series(df_plot, 'Fecha', serie_cols)
     
     df_lines = df_plot.melt(
         id_vars=['Fecha'],
@@ -119,10 +251,6 @@ def generate_simulation_plot(df_sim, metrics, llegadas_map, sku_name, simulation
         var_name='Leyenda', 
         value_name='Valor'
     )
-    
-    df_llegadas = pd.DataFrame(list(llegadas_map.items()), columns=['Fecha', 'CantidadLlegada'])
-    df_llegadas = pd.merge(df_llegadas, df_plot, on='Fecha', how='left')
-    df_llegadas['Leyenda'] = 'Llegada de OC' 
 
     df_zero_line = pd.DataFrame({'y': [0]})
 
@@ -180,23 +308,46 @@ def generate_simulation_plot(df_sim, metrics, llegadas_map, sku_name, simulation
         tooltip=alt.value("Stock Cero") 
     )
 
+    layers = inventory_line + reference_lines + arrival_points + zero_line
+
+    # Capa 5 (opcional): Banda P05-P95 del modelo bootstrap
+    if 'NivelInventario_P05' in df_plot.columns:
+        band = alt.Chart(df_plot).mark_area(
+            opacity=0.2, color=range_colors[0], interpolate='step-after'
+        ).encode(
+            x=alt.X('Fecha:T'),
+            y=alt.Y('NivelInventario_P05:Q'),
+            y2=alt.Y2('NivelInventario_P95:Q'),
+            tooltip=[
+                alt.Tooltip('Fecha:T', format="%Y-%m-%d"),
+                alt.Tooltip('NivelInventario_P05:Q', title='P05', format=',.0f'),
+                alt.Tooltip('NivelInventario_P95:Q', title='P95', format=',.0f')
+            ]
+        )
+        layers = band + layers
+
     # --- 3. COMBINAR Y RENDERIZAR ---
     
-    final_chart = (inventory_line + reference_lines + arrival_points + zero_line).properties(
+    final_chart = layers.properties(
         title=f'Proyección de Inventario para {sku_name} ({simulation_days} días)'
     ).interactive() 
     
     return final_chart
 
 
-def prepare_end_of_month_table(df_sim):
+def prepare_end_of_month_table(month_end_levels):
     """
-    Toma el DataFrame de simulación diaria y lo resume a fin de mes (Req. 3).
-    (El contenido de esta función no cambia)
+    Tabla de stock a fin de mes (Req. 3) a partir de metrics['month_end_levels']
+    del simulador: el cierre del último día de cada mes, tomado de la serie
+    diaria (las filas de df_sim semanal o mensual son inicios de período).
+    Si el horizonte termina a mitad de mes, ese mes muestra el cierre del
+    último día simulado y se marca como parcial.
     """
-    df_fin_de_mes = df_sim['NivelInventario'].resample('ME').last().reset_index()
+    df_fin_de_mes = month_end_levels.rename_axis('Fecha').reset_index()
     
     df_fin_de_mes['Mes'] = df_fin_de_mes['Fecha'].dt.strftime('%Y-%m (%B)')
+    parcial = df_fin_de_mes['FechaCierre'] < df_fin_de_mes['Fecha']
+    df_fin_de_mes.loc[parcial, 'Mes'] += ' - parcial, al ' + df_fin_de_mes.loc[parcial, 'FechaCierre'].dt.strftime('%d-%m')
     df_fin_de_mes['Stock al Cierre'] = df_fin_de_mes['NivelInventario'].apply(lambda x: f"{x:,.0f}")
     
     return df_fin_de_mes[['Mes', 'Stock al Cierre']]
@@ -205,13 +356,17 @@ def prepare_end_of_month_table(df_sim):
 def display_order_recommendation(metrics, llegadas_map, df_sim, lead_time_days):
     """
     Muestra la recomendación de pedido (UI).
-    La lógica de cálculo ahora está en 'analysis.py' y usa la proyección.
+    La lógica de cálculo está en 'analysis.py'; el simulador ya la entrega
+    calculada sobre la serie diaria (metrics['order_recommendation']), que es
+    la que se usa aunque df_sim sea semanal o mensual.
     """
     
-    # --- 1. Llamar a la función de análisis ---
-    reco = analysis.calculate_order_recommendation(
-        metrics, llegadas_map, df_sim, lead_time_days
-    )
+    # --- 1. Recomendación calculada por el simulador (o sobre df_sim, si es diario) ---
+    reco = metrics.get('order_recommendation')
+    if reco is None:
+        reco = analysis.calculate_order_recommendation(
+            metrics, llegadas_map, df_sim, lead_time_days
+        )
 
     # --- 2. Mostrar en la UI ---
     st.subheader("Recomendación de Abastecimiento 💡")
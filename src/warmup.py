@@ -0,0 +1,128 @@
+# --- ARCHIVO: src/warmup.py ---
+# (NUEVO ARCHIVO: precalentamiento en segundo plano de los caches después de cada carga de datos)
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+import perf
+import kpi_cube
+import residential_agg
+import ui_helpers
+import radar_engine
+import predicate_index
+
+_env = os.environ.get('FLUX_WARMUP', '').strip().lower()
+_enabled = config.WARMUP_ENABLED and _env not in ('0', 'false')
+
+_executor = None
+_lock = threading.Lock()
+_version = None # Versión de datos del último precalentamiento programado
+_tasks = []     # Estado de sus tareas (ver 'status')
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def radar_default_params(df_stock: pd.DataFrame, df_consumo: pd.DataFrame) -> dict:
+    """Los mismos valores iniciales que muestran los controles de la página Radar."""
+    bodegas_stock = sorted(df_stock['CodigoBodega'].dropna().unique())
+    bodegas_consumo = sorted(df_consumo['BodegaDestino_Requerida'].dropna().unique())
+    return {
+        'bodega_stock_sel': config.RADAR_DEFAULT_BODEGA_STOCK if config.RADAR_DEFAULT_BODEGA_STOCK in bodegas_stock
+            else (bodegas_stock[0] if bodegas_stock else None),
+        'bodega_consumo_sel': config.RADAR_DEFAULT_BODEGA_CONSUMO if config.RADAR_DEFAULT_BODEGA_CONSUMO in bodegas_consumo
+            else (bodegas_consumo[0] if bodegas_consumo else None),
+        'lead_time_days': config.RADAR_DEFAULT_LEAD_TIME,
+        'service_level_z': config.Z_SCORE_MAP[config.RADAR_DEFAULT_SERVICE_LEVEL],
+    }
+
+
+def _top_families(df_stock: pd.DataFrame, bodega: str, limit: int) -> list:
+    """Familias con más SKUs en la bodega por defecto (las que más se consultan en el Radar)."""
+    df = df_stock[df_stock['CodigoBodega'] == bodega]
+    counts = df.groupby('Familia')['CodigoArticulo'].nunique().sort_values(ascending=False, kind='stable')
+    return [str(f) for f in counts.index[:limit]]
+
+
+def build_tasks(frames: tuple, version: str) -> list:
+    """
+    Lista de (nombre, función sin argumentos). Cada función llama a la MISMA
+    función cacheada que usa la página, con los mismos argumentos que la página
+    usa por defecto: el resultado queda en el cache normal (misma clave).
+    """
+    df_stock, df_oc, df_consumo, df_residencial = frames
+
+    def residential():
+        df_ventas, df_iniciados, df_terminados, _ = residential_agg.get_residential_data(df_residencial, version)
+        residential_agg.get_chart_aggregates(df_ventas, df_iniciados, df_terminados, version)
+
+    tasks = [
+        ('indices', lambda: predicate_index.get_data_index(df_stock, df_consumo, df_oc, version)),
+        ('selectores', lambda: ui_helpers.get_selector_options(df_stock, df_consumo, version)),
+        ('kpis_compradores', lambda: kpi_cube.get_kpi_cube(df_oc, version)),
+        ('residencial', residential),
+    ]
+
+    params = radar_default_params(df_stock, df_consumo)
+    if params['bodega_stock_sel'] is not None and 'Familia' in df_stock.columns:
+        for familia in _top_families(df_stock, params['bodega_stock_sel'], config.WARMUP_RADAR_MAX_FAMILIES):
+            tasks.append((f'radar/{familia}', lambda familia=familia: radar_engine.compute_radar(
+                df_stock, df_consumo, df_oc, familia,
+                params['bodega_stock_sel'], params['bodega_consumo_sel'],
+                params['lead_time_days'], params['service_level_z'],
+                data_version=version
+            )))
+    return tasks
+
+
+def _run(task: dict, fn, version: str):
+    if version != _version:
+        task['state'] = 'descartada' # Llegó otra versión de datos antes de empezar
+        return
+    task['state'] = 'calculando'
+    start = time.perf_counter()
+    try:
+        with perf.span(f"warmup.{task['tarea']}"):
+            fn()
+        task['state'] = 'lista'
+    except Exception as e:  # Un artefacto que falla no detiene a los demás; la página mostrará el error
+        task['state'] = 'error'
+        task['error'] = f"{type(e).__name__}: {e}"
+    task['ms'] = (time.perf_counter() - start) * 1000
+
+
+def schedule(frames: tuple, version: str):
+    """
+    Programa el precalentamiento para una versión de datos recién publicada.
+    Las tareas pendientes de una versión anterior se cancelan.
+    """
+    global _executor, _version, _tasks
+    if not _enabled:
+        return
+    tasks = build_tasks(frames, version)
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.WARMUP_WORKERS, thread_name_prefix='flux-warmup')
+        for task in _tasks:
+            future = task.pop('future', None)
+            if future is not None and future.cancel():
+                task['state'] = 'descartada'
+        _version = version
+        _tasks = []
+        for name, fn in tasks:
+            task = {'tarea': name, 'version': version, 'state': 'pendiente', 'ms': None, 'error': None}
+            task['future'] = _executor.submit(_run, task, fn, version)
+            _tasks.append(task)
+
+
+def status() -> pd.DataFrame:
+    """Estado de las tareas del último precalentamiento (para la página de Rendimiento)."""
+    with _lock:
+        rows = [{k: v for k, v in task.items() if k != 'future'} for task in _tasks]
+    return pd.DataFrame(rows, columns=['tarea', 'version', 'state', 'ms', 'error'])
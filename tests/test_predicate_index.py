@@ -0,0 +1,91 @@
+# --- ARCHIVO: tests/test_predicate_index.py ---
+# (NUEVO ARCHIVO: regresión del índice de predicados sobre DataFrames compactados con cantidades vacías)
+#
+# Uso (desde la raíz del repositorio):
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import data_loader  # noqa: E402
+import predicate_index  # noqa: E402
+
+
+def _frames_con_vacios(n=400, seed=7):
+    """Stock, consumo y OPOR con ~10% de cantidades vacías (lo normal en los Excel exportados)."""
+    rng = np.random.default_rng(seed)
+    hoy = pd.Timestamp.now().floor('D')
+    skus = [f'SKU-{i:03d}' for i in rng.integers(0, 40, n)]
+
+    def cantidades():
+        valores = rng.integers(-2, 20, n).astype(float)
+        valores[rng.random(n) < 0.1] = np.nan
+        return valores
+
+    df_stock = pd.DataFrame({
+        'CodigoArticulo': skus,
+        'CodigoBodega': rng.choice(['BF0001', 'BF0002', 'BF0003'], n),
+        'Familia': rng.choice(['CABLES', 'MATERIALES'], n),
+        'DisponibleParaPrometer': cantidades(),
+    })
+    df_consumo = pd.DataFrame({
+        'CodigoArticulo': skus,
+        'BodegaDestino_Requerida': rng.choice(['Bodega A', 'Bodega B'], n),
+        'FechaSolicitud': hoy - pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'CantidadSolicitada': cantidades(),
+    })
+    df_oc = pd.DataFrame({
+        'Número de artículo': skus,
+        'Fecha de entrega de la línea': hoy + pd.to_timedelta(rng.integers(-30, 60, n), unit='D'),
+        'Cantidad': cantidades(),
+    })
+    return {
+        'stock': data_loader._compact_dataset('stock', df_stock)[0],
+        'consumo': data_loader._compact_dataset('consumo', df_consumo)[0],
+        'oc': data_loader._compact_dataset('oc', df_oc)[0],
+    }
+
+
+def _posiciones(mask) -> np.ndarray:
+    return np.flatnonzero(mask.fillna(False).to_numpy(dtype=bool))
+
+
+def test_flags_con_cantidades_vacias():
+    frames = _frames_con_vacios()
+    # La compactación deja las cantidades como enteros nullable: la máscara '> 0' tiene vacíos
+    assert frames['oc']['Cantidad'].dtype == 'Int32'
+    assert frames['stock']['DisponibleParaPrometer'].dtype == 'Int32'
+
+    index = predicate_index.get_data_index(frames['stock'], frames['consumo'], frames['oc'], data_version=None)
+    np.testing.assert_array_equal(index.oc.flag('cantidad_positiva'), _posiciones(frames['oc']['Cantidad'] > 0))
+    np.testing.assert_array_equal(index.stock.flag('con_stock'), _posiciones(frames['stock']['DisponibleParaPrometer'] > 0))
+
+
+def test_filtros_combinados_igual_que_mascaras():
+    frames = _frames_con_vacios()
+    df_oc = frames['oc']
+    index = predicate_index.get_table_index(df_oc, 'oc', data_version=None)
+    hoy = pd.Timestamp.now().floor('D')
+
+    for sku in ['SKU-001', 'SKU-017', 'NO-EXISTE']:
+        filas = index.intersect(
+            index.equals('Número de artículo', sku),
+            index.flag('cantidad_positiva'),
+            index.since('Fecha de entrega de la línea', hoy),
+        )
+        esperado = _posiciones(
+            (df_oc['Número de artículo'] == sku) & (df_oc['Cantidad'] > 0) & (df_oc['Fecha de entrega de la línea'] >= hoy)
+        )
+        np.testing.assert_array_equal(filas, esperado)
+
+    df_stock = frames['stock']
+    stock = predicate_index.get_table_index(df_stock, 'stock', data_version=None)
+    filas = stock.intersect(stock.isin('CodigoBodega', ['BF0001', 'BF0003']), stock.equals('Familia', 'CABLES'))
+    esperado = _posiciones(df_stock['CodigoBodega'].isin(['BF0001', 'BF0003']) & (df_stock['Familia'] == 'CABLES'))
+    np.testing.assert_array_equal(filas, esperado)